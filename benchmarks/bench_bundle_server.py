@@ -0,0 +1,110 @@
+"""Bundle server latency: first request, warm repeats, and concurrent clients.
+
+Run from the repository root with: python -m benchmarks.bench_bundle_server
+
+The server runs on a background thread of this process and is queried over
+localhost with the fetch() client, the way an editor plugin or script would.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import generate_tree
+from utils.bundle_server import BundleServer, fetch, percentile
+
+TREE_FILES = 10_000
+REPEATS = 20
+CLIENTS = 8
+REQUESTS_PER_CLIENT = 10
+TOKEN = "benchmark"
+
+
+def start_server(root):
+    """Run a BundleServer on a free port in a daemon thread; return (port, stop)."""
+    server = BundleServer(root, token=TOKEN)
+    started = threading.Event()
+    state = {}
+
+    def ready(port):
+        state["port"] = port
+        started.set()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        state["loop"] = loop
+        state["task"] = loop.create_task(server.serve(port=0, ready=ready))
+        try:
+            loop.run_until_complete(state["task"])
+        except asyncio.CancelledError:
+            pass
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["task"].cancel)
+
+    return state["port"], stop
+
+
+def timed_fetch(port, **params):
+    start = time.perf_counter()
+    size = len(fetch(port=port, token=TOKEN, **params))
+    return time.perf_counter() - start, size
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    print(
+        f"{label:>28} {len(latencies):>6} "
+        + " ".join(f"{percentile(latencies, f) * 1000:>9.1f}" for f in (0.5, 0.9, 0.99))
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, files=TREE_FILES)
+        port, stop = start_server(root)
+        print(
+            f"{'requests':>28} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}"
+        )
+
+        elapsed, size = timed_fetch(port, ext=".py")
+        report(f"first (.py, {size:,} chars)", [elapsed])
+        report(
+            "warm repeats", [timed_fetch(port, ext=".py")[0] for _ in range(REPEATS)]
+        )
+
+        # An edited file is the only one read again
+        some_file = os.path.join(
+            root, fetch(port=port, token=TOKEN, ext=".py").split("\n", 1)[0][2:]
+        )
+        with open(some_file, "a") as f:
+            f.write("# edited\n")
+        report("after one edit", [timed_fetch(port, ext=".py")[0]])
+
+        report(
+            "budget 20k tokens",
+            [timed_fetch(port, ext=".py", budget=20_000)[0] for _ in range(REPEATS)],
+        )
+
+        with ThreadPoolExecutor(CLIENTS) as pool:
+            latencies = list(
+                pool.map(
+                    lambda _: timed_fetch(port, ext=".py")[0],
+                    range(CLIENTS * REQUESTS_PER_CLIENT),
+                )
+            )
+        report(f"{CLIENTS} concurrent clients", latencies)
+
+        print()
+        print("server /stats:", fetch("/stats", port=port, token=TOKEN))
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Check propagation cost on a 50k-leaf trie: leaf toggles, folder toggles and select-all reads.
+
+Run from the repository root with: python -m benchmarks.bench_check_propagation
+"""
+
+import random
+import time
+
+from utils.path_trie import CHECKED, UNCHECKED, PathTrie
+
+LEAVES = 50_000
+FANOUT = 10
+DEPTH = 4
+
+
+def build_trie(leaves=LEAVES, fanout=FANOUT, depth=DEPTH, seed=0):
+    rng = random.Random(seed)
+    trie = PathTrie()
+    for i in range(leaves):
+        folders = "/".join(f"d{rng.randrange(fanout)}" for _ in range(depth))
+        trie.insert(f"{folders}/file_{i}.py")
+    return trie
+
+
+def timed(label, func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{label:<32} {per_call * 1e6:>12.1f} us")
+
+
+def main():
+    trie = build_trie()
+    files = list(trie.iter_files())
+    top_folder = trie.root.children[0]
+    rng = random.Random(1)
+    print(f"{trie.file_count} leaves, {len(trie.root.children)} top-level folders")
+
+    def toggle_leaf():
+        node = rng.choice(files)
+        trie.set_state(node, UNCHECKED if node.checked else CHECKED)
+
+    def toggle_top_folder():
+        trie.set_state(top_folder, UNCHECKED if top_folder.checked else CHECKED)
+
+    def toggle_everything():
+        trie.set_state(trie.root, UNCHECKED if trie.root.checked else CHECKED)
+
+    def read_select_all():
+        return trie.root.state
+
+    timed("toggle random leaf", toggle_leaf, 10_000)
+    timed("toggle top-level folder", toggle_top_folder, 100)
+    timed("toggle whole tree", toggle_everything, 20)
+    timed("read select-all state", read_select_all, 100_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Walk time of find_python_files versus tree size and .gitignore length.
+
+Run from the repository root with: python -m benchmarks.bench_gitignore
+"""
+
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_ignore_patterns, generate_tree
+from utils.file_helpers import find_python_files
+
+TREE_SIZES = (1_000, 10_000, 50_000)
+PATTERN_COUNTS = (10, 100, 300)
+
+
+def bench(files, pattern_count, repeat=3):
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(
+            root,
+            files=files,
+            ignored_files=files,  # As many files again inside ignored directories
+            patterns=generate_ignore_patterns(pattern_count),
+        )
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = find_python_files(root)
+            best = min(best, time.perf_counter() - start)
+        return best, len(found)
+
+
+def main():
+    print(f"{'files':>8} {'patterns':>9} {'walk (s)':>10} {'found':>8}")
+    for files in TREE_SIZES:
+        for pattern_count in PATTERN_COUNTS:
+            elapsed, found = bench(files, pattern_count)
+            print(f"{files:>8} {pattern_count:>9} {elapsed:>10.3f} {found:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Bundling a few very large files: time and peak memory of each way out.
+
+Run from the repository root with: python -m benchmarks.bench_large_files
+
+Each case runs in a fresh process so its peak RSS is its own. Writing to a
+file takes large files straight from a memory map; the clipboard needs one
+string, so that case decodes every file. Peak RSS is read from getrusage,
+which Windows lacks.
+"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from utils.bundle import build_bundle, iter_bundle, write_bundle
+
+LARGE_FILES = 4
+LARGE_SIZE = 64_000_000
+
+
+def write_files(root, count, size):
+    """Write log-like files with blank lines around them, as generated output often has."""
+    line = "2024-01-01 12:00:00 INFO request handled in 12 ms, user=é\n"
+    # Written a block at a time: a forked or spawned child starts from this
+    # process's peak RSS, which would hide the cases' own
+    block = line * (1_000_000 // len(line))
+    paths = []
+    for i in range(count):
+        path = f"large_{i}.log"
+        with open(os.path.join(root, path), "w", encoding="utf-8") as f:
+            f.write("\n\n")
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write("\n\n")
+        paths.append(path)
+    return paths
+
+
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def to_clipboard_string(paths, root):
+    bundle, stats = build_bundle(paths, root)
+    return stats.size
+
+
+def to_file_decoded(paths, root):
+    stats = {}
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        for chunk in iter_bundle(paths, root, stats=stats):
+            out.write(chunk)
+    return stats["size"]
+
+
+def to_file_mapped(paths, root):
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        return write_bundle(paths, out, root).size
+
+
+CASES = {
+    "clipboard string": to_clipboard_string,
+    "file, decoded": to_file_decoded,
+    "file, memory-mapped": to_file_mapped,
+}
+
+
+def run_case(name, paths, root):
+    """Run one case in this (fresh) process; return (seconds, characters, RSS before, peak RSS)."""
+    before = peak_rss()
+    start = time.perf_counter()
+    size = CASES[name](paths, root)
+    return time.perf_counter() - start, size, before, peak_rss()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_files(root, LARGE_FILES, LARGE_SIZE)
+        total = sum(os.path.getsize(os.path.join(root, p)) for p in paths)
+        print(f"{LARGE_FILES} files, {total / 1e6:.0f} MB in all")
+        print(
+            f"{'case':<22} {'s':>7} {'MB/s':>8} {'peak RSS MB':>12} {'over start':>11}"
+        )
+        for name in CASES:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                elapsed, size, before, peak = pool.submit(
+                    run_case, name, paths, root
+                ).result()
+            print(
+                f"{name:<22} {elapsed:>7.2f} {total / elapsed / 1e6:>8.0f}"
+                f" {peak / 1e6:>12.0f} {(peak - before) / 1e6:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Outlining real Python code: size reduction, serial versus process pool, and a warm cache.
+
+Run from the repository root with: python -m benchmarks.bench_outline
+
+The standard library of the running interpreter serves as a large project.
+The pool pays off with the number of cores; a warm Outliner only hashes.
+"""
+
+import ast
+import os
+import time
+
+from utils.outline import Outliner
+
+MAX_FILES = 2_000
+
+
+def stdlib_files(limit=MAX_FILES):
+    root = os.path.dirname(ast.__file__)
+    files = []
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in ("site-packages", "test", "tests"))
+        for name in sorted(names):
+            if name.endswith(".py"):
+                path = os.path.join(folder, name)
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    files.append((os.path.relpath(path, root), f.read().strip()))
+                if len(files) >= limit:
+                    return files
+    return files
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    files = stdlib_files()
+    size = sum(len(content) for _, content in files)
+    print(f"{len(files):,} files, {size / 1e6:.1f} MB, {os.cpu_count()} cores")
+
+    serial = Outliner(workers=1)
+    elapsed, outlines = timed(lambda: serial.outline_many(files))
+    outline_size = sum(map(len, outlines))
+    print(
+        f"outlines are {outline_size / 1e6:.1f} MB, {outline_size / size:.0%} of the files"
+    )
+    print(f"{'case':>22} {'s':>8}")
+    print(f"{'serial, cold':>22} {elapsed:>8.2f}")
+
+    pool = Outliner()
+    try:
+        elapsed, _ = timed(lambda: pool.outline_many(files))
+        print(f"{f'{pool.workers} processes, cold':>22} {elapsed:>8.2f}")
+        elapsed, _ = timed(lambda: pool.outline_many(files))
+        print(f"{'warm':>22} {elapsed:>8.2f}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
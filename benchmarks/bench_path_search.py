@@ -0,0 +1,69 @@
+"""Search box latency over 500k paths: fresh queries, extended queries and fuzzy fallbacks.
+
+Run from the repository root with: python -m benchmarks.bench_path_search
+"""
+
+import random
+import time
+
+from utils.path_search import PathSearch
+
+PATHS = 500_000
+WORDS = (
+    "core api models views utils tests config parser render cache store "
+    "client server handler widget layout scanner token bundle index"
+).split()
+EXTENSIONS = (".py", ".js", ".ts", ".md", ".json", ".txt")
+
+QUERIES = (
+    ("rare substring", "file_123456"),
+    ("common substring", "test"),
+    ("two words", "parser .ts"),
+    ("no match", "zzzz"),
+    ("fuzzy", "scnrwdgt"),
+)
+
+
+def generate_paths(count=PATHS, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        folders = "/".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+        paths.append(f"{folders}/{rng.choice(WORDS)}_file_{i}{rng.choice(EXTENSIONS)}")
+    return paths
+
+
+def fresh_search(search, query):
+    search.reset()  # Time a scan, not a narrowing of the previous query
+    return search.search(query)
+
+
+def timed(func, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    paths = generate_paths()
+    elapsed, search = timed(lambda: PathSearch(paths), repeat=1)
+    print(f"built over {len(search):,} paths in {elapsed * 1000:.1f} ms")
+    print(f"{'query':>32} {'ms':>8} {'matches':>8}")
+
+    for label, query in QUERIES:
+        elapsed, (found, complete) = timed(lambda: fresh_search(search, query))
+        count = f"{len(found)}" + ("" if complete else "+")
+        print(f"{label + ' ' + repr(query):>32} {elapsed * 1000:>8.2f} {count:>8}")
+
+    # Typing "file_12345" one key at a time: each search narrows the previous one
+    search.reset()
+    start = time.perf_counter()
+    for end in range(1, len("file_12345") + 1):
+        found, complete = search.search("file_12345"[:end])
+    typed = (time.perf_counter() - start) / len("file_12345")
+    print(f"{'typing file_12345, per key':>32} {typed * 1000:>8.2f} {len(found):>8}")
+
+
+if __name__ == "__main__":
+    main()
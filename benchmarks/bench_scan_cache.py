@@ -0,0 +1,80 @@
+"""Cold versus warm startup scans with the persistent scan cache.
+
+Run from the repository root with: python -m benchmarks.bench_scan_cache
+
+"no cache" lists every folder; "cold" does the same and also writes the
+cache; "warm" only stats folders and reuses their cached listings. The
+synthetic tree sits in the page cache, so the no-cache scan is much faster
+here than a first scan of a real repository on disk, and the gap to the warm
+scan grows accordingly.
+"""
+
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_ignore_patterns, generate_tree
+from utils.scan_cache import ScanCache
+from utils.scanner import scan_project
+
+TREE_FILES = 100_000
+WORKER_COUNTS = (1, 16)
+
+
+def timed_scan(root, workers, cache_path=None):
+    start = time.perf_counter()
+    cache = ScanCache(root, cache_path) if cache_path else None
+    index = scan_project(root, workers=workers, cache=cache)
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        cache.close()
+    return elapsed, len(index), cache
+
+
+def report(label, workers, elapsed, files, cache):
+    listed = cache.misses if cache is not None else "all"
+    print(f"{label:>24} {workers:>8} {elapsed:>10.3f} {files:>8} {listed:>8}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as db:
+        generate_tree(
+            root,
+            files=TREE_FILES,
+            ignored_files=TREE_FILES // 10,
+            patterns=generate_ignore_patterns(50),
+        )
+        print(
+            f"{'scan':>24} {'workers':>8} {'time (s)':>10} {'files':>8} {'listed':>8}"
+        )
+        for workers in WORKER_COUNTS:
+            cache_path = os.path.join(db, f"cache_{workers}.sqlite3")
+            runs = [
+                ("no cache", None),
+                ("cold", cache_path),
+                ("warm", cache_path),
+            ]
+            for label, path in runs:
+                report(label, workers, *timed_scan(root, workers, path))
+
+            # One new file relists one folder; an ignore file change relists everything
+            with open(os.path.join(root, "new_file.py"), "w") as f:
+                f.write("x = 1\n")
+            report(
+                "warm, one folder changed",
+                workers,
+                *timed_scan(root, workers, cache_path),
+            )
+            os.remove(os.path.join(root, "new_file.py"))
+
+            with open(os.path.join(root, ".gitignore"), "a") as f:
+                f.write("\n*.tmp\n")
+            report(
+                "warm, .gitignore changed",
+                workers,
+                *timed_scan(root, workers, cache_path),
+            )
+
+
+if __name__ == "__main__":
+    main()
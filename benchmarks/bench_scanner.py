@@ -0,0 +1,40 @@
+"""Scanner throughput (files/sec) for 1, 4 and 16 worker threads on a synthetic tree.
+
+Run from the repository root with: python -m benchmarks.bench_scanner
+"""
+
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_ignore_patterns, generate_tree
+from utils.scanner import scan_project
+
+TREE_FILES = 50_000
+WORKER_COUNTS = (1, 4, 16)
+
+
+def bench(root, workers, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index = scan_project(root, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best, len(index)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(
+            root,
+            files=TREE_FILES,
+            ignored_files=TREE_FILES // 5,
+            patterns=generate_ignore_patterns(50),
+        )
+        print(f"{'workers':>8} {'scan (s)':>10} {'files':>8} {'files/sec':>12}")
+        for workers in WORKER_COUNTS:
+            elapsed, files = bench(root, workers)
+            print(f"{workers:>8} {elapsed:>10.3f} {files:>8} {files / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Scanning a workspace of several roots: one root after another vs. scan_workspace.
+
+Run from the repository root with: python -m benchmarks.bench_workspace
+"""
+
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_ignore_patterns, generate_tree
+from utils.scanner import scan_project, scan_workspace
+from utils.workspace import Workspace
+
+ROOT_COUNTS = (2, 4, 8)
+FILES_PER_ROOT = 10_000
+
+
+def best_of(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as parent:
+        folders = []
+        for i in range(max(ROOT_COUNTS)):
+            folder = os.path.join(parent, f"service_{i}")
+            generate_tree(
+                folder,
+                files=FILES_PER_ROOT,
+                ignored_files=FILES_PER_ROOT // 5,
+                patterns=generate_ignore_patterns(50),
+                seed=i,
+            )
+            folders.append(folder)
+
+        print(f"{'roots':>6} {'one by one (s)':>15} {'workspace (s)':>14} {'files':>8}")
+        for count in ROOT_COUNTS:
+            workspace = Workspace(folders[:count])
+            serial, _ = best_of(
+                lambda: [scan_project(folder) for folder in workspace.roots.values()]
+            )
+            merged, index = best_of(lambda: scan_workspace(workspace))
+            print(f"{count:>6} {serial:>15.3f} {merged:>14.3f} {len(index):>8}")
+
+
+if __name__ == "__main__":
+    main()
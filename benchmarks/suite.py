@@ -0,0 +1,277 @@
+"""The benchmark suite: every stage timed on one synthetic project, compared with a baseline.
+
+Times scanning, tree population and check toggling (on an offscreen Qt
+platform, skipped without PySide6), state load/save and bundle assembly,
+writes the results as JSON and compares them with a stored baseline. Cases
+more than --tolerance slower than the baseline are reported and make the
+run exit with status 1, so a regression fails loudly in CI.
+
+Run from the repository root with: python -m benchmarks.suite
+Record a baseline for this machine with: python -m benchmarks.suite --save-baseline
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_ignore_patterns, generate_tree
+from utils.bundle import build_bundle
+from utils.content_cache import ContentCache
+from utils.file_helpers import collect_file_data
+from utils.scan_cache import ScanCache
+from utils.path_trie import CHECKED, UNCHECKED
+from utils.scanner import ProjectIndex, scan_project
+from utils.state_store import StateStore
+from utils.token_budget import build_budget_bundle
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# A case is a regression when it takes this much longer than in the baseline
+DEFAULT_TOLERANCE = 0.5
+
+# Cases faster than this in the baseline are too noisy to fail a run
+MIN_COMPARED_SECONDS = 0.005
+
+
+def calibrate(repeat=5):
+    """Time a fixed pure-Python workload, to tell a slower machine or a busy one from slower code."""
+    data = [(i * 7919) % 10007 for i in range(200_000)]
+    return best_of(lambda: sorted(str(x) for x in data), repeat)
+
+
+def best_of(function, repeat):
+    """Return the fastest of repeat runs of function, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scan(root, repeat):
+    results = {"scan": best_of(lambda: scan_project(root), repeat)}
+    with tempfile.TemporaryDirectory() as folder:
+        cache = ScanCache(root, os.path.join(folder, "scan_cache.sqlite3"))
+        try:
+            scan_project(root, cache=cache)
+            results["scan cached"] = best_of(
+                lambda: scan_project(root, cache=cache), repeat
+            )
+        finally:
+            cache.close()
+    return results
+
+
+def bench_state(root, paths, repeat):
+    with tempfile.TemporaryDirectory() as folder:
+        store = StateStore(os.path.join(folder, "state.sqlite3"))
+        try:
+            # Alternate between two selections so every save changes rows
+            selections = itertools.cycle([set(paths), set(paths[::2])])
+            results = {
+                "state save": best_of(
+                    lambda: store.save(root, next(selections), False, ".py"), repeat
+                ),
+                "state load": best_of(lambda: store.load(root), repeat),
+            }
+        finally:
+            store.close()
+    return results
+
+
+def bench_bundle(root, paths, repeat):
+    full_paths = [os.path.join(root, path) for path in paths]
+    cache = ContentCache()
+    build_bundle(paths, root, cache=cache)
+    return {
+        "bundle": best_of(lambda: build_bundle(paths, root), repeat),
+        "bundle cached": best_of(
+            lambda: build_bundle(paths, root, cache=cache), repeat
+        ),
+        "collect file data": best_of(lambda: collect_file_data(full_paths), repeat),
+        "budget bundle": best_of(
+            lambda: build_budget_bundle(paths, root, budget=50_000, cache=cache),
+            repeat,
+        ),
+    }
+
+
+def bench_tree(index, repeat):
+    """Tree population and check toggling in a FileTreeView, on an offscreen Qt platform."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtWidgets import QApplication
+    except ImportError:
+        print("PySide6 is not installed, skipping the tree cases", file=sys.stderr)
+        return {}
+    from ui.file_tree_view import FileTreeView
+
+    app = QApplication.instance() or QApplication([])
+    view = FileTreeView(index, ".py", set())
+    entries = [e for e in index.entries() if e.path.endswith(".py")]
+    batches = [entries[i : i + 2000] for i in range(0, len(entries), 2000)]
+
+    def stream():
+        # As during a scan: empty tree, batches as they arrive, one sort at the end
+        view.selected_files = set()
+        view.file_index = ProjectIndex(index.root)
+        view.populate_tree()
+        for batch in batches:
+            view.add_files(batch)
+        view.sort_tree()
+
+    model = view.tree_model
+    results = {"tree stream": best_of(stream, repeat)}
+    view.file_index = index
+    results["tree populate"] = best_of(view.populate_tree, repeat)
+    results["check all"] = best_of(
+        lambda: model.set_all_checked(not model.trie.root.checked), repeat
+    )
+    top_folder = model.trie.root.children[0]
+    results["check folder"] = best_of(
+        lambda: model.set_check_state(
+            top_folder, UNCHECKED if top_folder.checked else CHECKED
+        ),
+        repeat,
+    )
+    results["expand all"] = best_of(
+        lambda: (view.expandAll(), view.collapseAll()), repeat
+    )
+    view.deleteLater()
+    app.processEvents()
+    return results
+
+
+def run_suite(args):
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(
+            root,
+            files=args.files,
+            fanout=args.fanout,
+            depth=args.depth,
+            ignored_files=args.files // 5,
+            patterns=generate_ignore_patterns(args.patterns),
+            file_size=args.file_size,
+            nested_ignores=args.nested_ignores,
+        )
+        index = scan_project(root)
+        paths = sorted(path for path in index.by_suffix.get(".py", ()))
+        results = {}
+        results.update(bench_scan(root, args.repeat))
+        results.update(bench_state(root, paths, args.repeat))
+        results.update(bench_bundle(root, paths, args.repeat))
+        results.update(bench_tree(index, args.repeat))
+    calibration = (calibration + calibrate()) / 2  # Before and after the cases
+    return {
+        "config": {
+            "files": args.files,
+            "fanout": args.fanout,
+            "depth": args.depth,
+            "file_size": args.file_size,
+            "patterns": args.patterns,
+            "nested_ignores": args.nested_ignores,
+        },
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "calibration": calibration,
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance, speed=1.0):
+    """Print each case next to its baseline and return the names of the regressions.
+
+    speed is how much longer the calibration workload took than in the
+    baseline; changes are measured after scaling the baseline by it.
+    """
+    regressions = []
+    print(f"{'case':<20} {'seconds':>10} {'baseline':>10} {'change':>8}")
+    for name, seconds in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<20} {seconds:>10.4f} {'-':>10} {'new':>8}")
+            continue
+        change = seconds / (old * speed) - 1 if old else 0.0
+        flag = ""
+        if change > tolerance and old >= MIN_COMPARED_SECONDS:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<20} {seconds:>10.4f} {old:>10.4f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument(
+        "--file-size", type=int, default=2000, help="average file size in bytes"
+    )
+    parser.add_argument(
+        "--patterns", type=int, default=50, help="lines in the root .gitignore"
+    )
+    parser.add_argument(
+        "--nested-ignores",
+        type=int,
+        default=20,
+        help="folders with a .gitignore of their own",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as the new baseline instead of comparing",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {"results": {}, "config": report["config"]}
+        print(f"No baseline at {args.baseline}, run with --save-baseline to store one")
+    if baseline["config"] != report["config"]:
+        print(f"The baseline was taken with {baseline['config']}, not comparing")
+        baseline["results"] = {}
+    speed = report["calibration"] / baseline.get("calibration", report["calibration"])
+    print(
+        f"Calibration: {speed:.2f}x the baseline machine's time, changes are scaled by it"
+    )
+    regressions = compare(report["results"], baseline["results"], args.tolerance, speed)
+    if regressions:
+        print(
+            f"{len(regressions)} regressions over {args.tolerance:.0%}: "
+            + ", ".join(regressions),
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
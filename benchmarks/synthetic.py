@@ -0,0 +1,99 @@
+import os
+import random
+
+EXTENSIONS = (".py", ".js", ".ts", ".md", ".json", ".txt")
+IGNORED_DIRS = ("node_modules", "venv", "build", "__pycache__")
+
+
+def generate_ignore_patterns(count, seed=0):
+    """Return count plausible .gitignore lines mixing globs, anchors, negations and dir-only rules."""
+    rng = random.Random(seed)
+    base = [f"{d}/" for d in IGNORED_DIRS] + [
+        "*.log",
+        "!important.log",
+        "/dist",
+        "**/tmp/**",
+    ]
+    patterns = base[:count]
+    while len(patterns) < count:
+        kind = rng.randrange(5)
+        n = len(patterns)
+        if kind == 0:
+            patterns.append(f"*.ext{n}")
+        elif kind == 1:
+            patterns.append(f"/generated_{n}/")
+        elif kind == 2:
+            patterns.append(f"src/**/cache_{n}")
+        elif kind == 3:
+            patterns.append(f"file_{n}?.bak")
+        else:
+            patterns.append(f"!keep_{n}.txt")
+    return patterns
+
+
+def generate_tree(
+    root,
+    files=1000,
+    fanout=8,
+    depth=4,
+    ignored_files=0,
+    patterns=(),
+    seed=0,
+    file_size=0,
+    nested_ignores=0,
+):
+    """Create a synthetic project under root and return the number of files written.
+
+    Files are spread over a directory tree of the given fanout and depth; ignored_files
+    extra files are placed in directories the default patterns ignore. With
+    file_size, files are padded with code-like lines to between half and one
+    and a half times that many bytes. nested_ignores folders get a .gitignore
+    of their own with a few of the patterns.
+    """
+    rng = random.Random(seed)
+    dirs = [""]
+    frontier = [""]
+    for _ in range(depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(fanout):
+                child = f"{parent}/d{i}" if parent else f"d{i}"
+                dirs.append(child)
+                next_frontier.append(child)
+                if len(dirs) * 4 > files:
+                    break
+            if len(dirs) * 4 > files:
+                break
+        frontier = next_frontier
+        if len(dirs) * 4 > files:
+            break
+
+    for d in dirs:
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    def write(rel_path):
+        with open(os.path.join(root, rel_path), "w") as f:
+            f.write(f"# {rel_path}\n")
+            if file_size:
+                size = rng.randint(file_size // 2, file_size * 3 // 2)
+                line = f"value_{rng.randrange(1000)} = compute(value, {size})\n"
+                f.write(line * (size // len(line)))
+
+    for i in range(files):
+        d = rng.choice(dirs)
+        name = f"file_{i}{rng.choice(EXTENSIONS)}"
+        write(f"{d}/{name}" if d else name)
+
+    for i in range(ignored_files):
+        d = f"{rng.choice(dirs)}/{rng.choice(IGNORED_DIRS)}".lstrip("/")
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+        write(f"{d}/dep_{i}.js")
+
+    if patterns:
+        with open(os.path.join(root, ".gitignore"), "w") as f:
+            f.write("\n".join(patterns) + "\n")
+        for d in rng.sample(dirs[1:], min(nested_ignores, len(dirs) - 1)):
+            nested = rng.sample(list(patterns), min(5, len(patterns)))
+            with open(os.path.join(root, d, ".gitignore"), "w") as f:
+                f.write("\n".join(nested) + "\n")
+    return files + ignored_files
@@ -0,0 +1,334 @@
+"""Headless bundling: scan a project and write the bundle without starting the GUI.
+
+Nothing here imports Qt, so a bundle can be produced in CI jobs and scripts
+without a display. Run as: python main.py [root ...] [options]
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from utils.bundle import write_bundle
+from utils.bundle_server import DEFAULT_PORT, serve
+from utils.diff_bundle import iter_changed_bundle, iter_git_diff_bundle
+from utils.export import part_path, split_bundle
+from utils.file_filter import FileFilter, select_paths
+from utils.file_helpers import (
+    copy_to_clipboard,
+    load_app_state,
+    load_submitted_files,
+)
+from utils.git_objects import GitError
+from utils.outline import iter_outline_bundle
+from utils.profiling import format_summary, profiling_session, span
+from utils.scan_cache import open_scan_cache
+from utils.scanner import scan_workspace
+from utils.token_budget import PRIORITIES, iter_budget_bundle
+from utils.tokens import format_token_count
+from utils.workspace import workspace_root
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Bundle project files into one text, like the Submit button, without the GUI.",
+    )
+    parser.add_argument(
+        "roots",
+        nargs="*",
+        metavar="root",
+        help="project folder (default: .); with several, paths are prefixed by folder name",
+    )
+    parser.add_argument(
+        "-e",
+        "--ext",
+        action="append",
+        default=[],
+        help="include files with this extension, e.g. .py (repeatable)",
+    )
+    parser.add_argument(
+        "-g",
+        "--glob",
+        action="append",
+        default=[],
+        help='include files matching a .gitignore-style pattern, e.g. "src/**/*.py" (repeatable)',
+    )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        help='include files passing a filter as typed in the GUI, e.g. ".py,.pyi,.toml"',
+    )
+    parser.add_argument(
+        "-s",
+        "--selection",
+        action="store_true",
+        help="include the files last submitted from the GUI for this project",
+    )
+    sink = parser.add_mutually_exclusive_group()
+    sink.add_argument(
+        "-o", "--output", help="write the bundle to this file instead of stdout"
+    )
+    sink.add_argument(
+        "-c",
+        "--clipboard",
+        action="store_true",
+        help="copy the bundle to the clipboard",
+    )
+    parser.add_argument(
+        "--max-size", type=int, help="stop the bundle after this many characters"
+    )
+    parts = parser.add_mutually_exclusive_group()
+    parts.add_argument(
+        "--part-size",
+        type=int,
+        metavar="CHARS",
+        help="split the bundle into parts of at most CHARS characters, "
+        "copied one at a time with -c or written to numbered files with -o",
+    )
+    parts.add_argument(
+        "--part-tokens",
+        type=int,
+        metavar="TOKENS",
+        help="like --part-size, in tokens",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--budget", type=int, help="fit the bundle into this many tokens")
+    mode.add_argument(
+        "--changed",
+        action="store_true",
+        help="only include files changed since the last submit from the GUI",
+    )
+    mode.add_argument(
+        "--diff",
+        metavar="REV",
+        help="unified diffs against a git revision, e.g. HEAD or main",
+    )
+    mode.add_argument(
+        "--outline",
+        action="store_true",
+        help="outline every file but the --focus ones: classes, signatures and docstrings",
+    )
+    parser.add_argument(
+        "--focus",
+        metavar="FILTER",
+        help='files kept whole by --outline and --budget, as a filter, e.g. "src/core/ *.toml"',
+    )
+    parser.add_argument(
+        "--priority",
+        choices=sorted(PRIORITIES),
+        default="order",
+        help="which files get the token budget first (default: order)",
+    )
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="write files with identical contents out in full instead of referencing the first",
+    )
+    parser.add_argument(
+        "-l", "--list", action="store_true", help="only print the selected paths"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="don't use or update the scan cache"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="keep running and serve bundles over HTTP on localhost (see utils/bundle_server.py)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"port for --serve (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--token",
+        help="token clients of --serve must send (default: a random one, printed at startup)",
+    )
+    parser.add_argument(
+        "--gui",
+        action="store_true",
+        help="open the GUI on the given folders instead of bundling",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="time each stage, print the totals and write the spans to FILE as a Chrome trace",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="run cProfile and write its stats to FILE, for pstats or snakeviz",
+    )
+    return parser
+
+
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    root = workspace_root(args.roots)
+    if args.gui:
+        from main import run_gui
+
+        return run_gui(root, args.trace, args.profile)
+    with profiling_session(args.trace, args.profile) as profiler:
+        status = _run(args, root)
+    if profiler is not None:
+        print(format_summary(profiler.summary()), file=sys.stderr)
+    return status
+
+
+def _run(args, root):
+    if args.serve:
+        serve(root, port=args.port, token=args.token)
+        return 0
+    start = time.perf_counter()
+
+    selection, filter_text = None, args.filter
+    if args.selection or not (args.ext or args.glob or args.filter):
+        state = load_app_state(root)
+        if args.selection:
+            selection = state["selected_files"]
+        else:
+            filter_text = state["file_extension"]  # Same default as the GUI
+    try:
+        file_filter = FileFilter(filter_text) if filter_text is not None else None
+    except ValueError as e:
+        build_parser().error(f"bad filter: {e}")
+    try:
+        focus = FileFilter(args.focus).matches if args.focus else None
+    except ValueError as e:
+        build_parser().error(f"bad focus: {e}")
+
+    index = scan_workspace(root, open_cache=None if args.no_cache else open_scan_cache)
+    with span("select"):
+        paths = select_paths(index, args.ext, args.glob, selection, file_filter)
+
+    if args.list:
+        sys.stdout.write("".join(f"{path}\n" for path in paths))
+        return 0
+
+    split = args.part_size or args.part_tokens
+    if split and not (args.clipboard or args.output):
+        build_parser().error("--part-size and --part-tokens need -c or -o")
+    if args.clipboard or split:
+        out = io.StringIO()
+    elif args.output:
+        out = open(args.output, "w", encoding="utf-8")
+    else:
+        out = sys.stdout
+    with span("bundle"):
+        try:
+            if args.changed:
+                stats = {}
+                previous = load_submitted_files(root)
+                for chunk in iter_changed_bundle(
+                    paths, root, previous, args.max_size, stats
+                ):
+                    out.write(chunk)
+                summary = (
+                    f"{stats['files'] - stats['deleted']:,} changed files"
+                    f", {stats['deleted']:,} deleted, {stats['unchanged']:,} unchanged"
+                )
+                errors = stats["errors"]
+            elif args.diff is not None:
+                stats = {}
+                try:
+                    for chunk in iter_git_diff_bundle(
+                        paths, root, args.diff, args.max_size, stats
+                    ):
+                        out.write(chunk)
+                except GitError as e:
+                    print(f"error: {e}", file=sys.stderr)
+                    return 1
+                summary = (
+                    f"{stats['files']:,} files differing from {args.diff}"
+                    f", {stats['unchanged']:,} unchanged"
+                )
+                errors = stats["errors"]
+            elif args.outline:
+                stats = {}
+                for chunk in iter_outline_bundle(
+                    paths, root, focus, max_size=args.max_size, stats=stats
+                ):
+                    out.write(chunk)
+                summary = (
+                    f"{stats['outlined']:,} outlines, {stats['files'] - stats['outlined']:,} whole files"
+                    f", {stats['size']:,} characters ({stats['saved']:,} left out)"
+                )
+                errors = stats["errors"]
+            elif args.budget is not None:
+                stats = {}
+                for chunk in iter_budget_bundle(
+                    paths,
+                    root,
+                    args.budget,
+                    args.priority,
+                    stats=stats,
+                    dedupe=not args.keep_duplicates,
+                    focus=focus,
+                ):
+                    out.write(chunk)
+                summary = (
+                    f"{stats['files']:,} files, ~{format_token_count(stats['tokens'])} tokens"
+                    f", {len(stats['left_out']):,} left out"
+                )
+                if stats["duplicates"]:
+                    summary += (
+                        f", {stats['duplicates']:,} duplicates"
+                        f" (~{format_token_count(stats['saved_tokens'])} tokens saved)"
+                    )
+                errors = stats["errors"]
+            else:
+                stats = write_bundle(
+                    paths, out, root, args.max_size, dedupe=not args.keep_duplicates
+                )
+                summary = f"{stats.files:,} files, {stats.size:,} characters"
+                if stats.duplicates:
+                    summary += f", {stats.duplicates:,} duplicates ({stats.saved:,} characters saved)"
+                if stats.truncated:
+                    summary += f", cut off at {args.max_size:,}"
+                errors = stats.errors
+
+            if split:
+                summary += f", {_send_parts(args, out.getvalue()):,} parts"
+            elif args.clipboard:
+                copy_to_clipboard(out.getvalue())
+        finally:
+            if args.output and not split:
+                out.close()
+
+    for path, reason in errors:
+        print(f"skipped {path}: {reason}", file=sys.stderr)
+    print(
+        f"{summary} from {len(index):,} scanned in {time.perf_counter() - start:.2f}s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _send_parts(args, text):
+    """Split text as --part-size or --part-tokens say, copy or write the parts and return their number."""
+    if args.part_tokens:
+        parts = split_bundle(text, args.part_tokens, "tokens")
+    else:
+        parts = split_bundle(text, args.part_size, "chars")
+    for number, part in enumerate(parts, 1):
+        if args.output:
+            path = part_path(args.output, number) if len(parts) > 1 else args.output
+            with open(path, "w", encoding="utf-8") as out:
+                out.write(part)
+            continue
+        if number > 1:
+            print(
+                f"Press Enter to copy part {number} of {len(parts)}",
+                end="",
+                file=sys.stderr,
+            )
+            try:
+                input()
+            except EOFError:
+                print(file=sys.stderr)
+                break
+        copy_to_clipboard(part)
+    return len(parts)
@@ -1,22 +1,43 @@
-from PySide6.QtWidgets import QApplication
-from ui.file_selector_ui import FileSelectorUI
-from utils.file_helpers import (
-    find_python_files,
-    load_app_state,
-)  # Import the correct function
+import multiprocessing
+import sys
 
 
-def main():
-    app = QApplication([])
+def run_gui(root=".", trace_path=None, profile_path=None):
+    """Open the window on a project folder or a Workspace of several.
 
-    python_files = find_python_files()
-    app_state = load_app_state()  # Load the full app state
+    With trace_path the time spent in each stage is recorded and written
+    there on exit; with profile_path the GUI thread runs under cProfile.
+    """
+    # Qt is imported here so the headless path never loads it
+    from PySide6.QtWidgets import QApplication
+    from ui.file_selector_ui import FileSelectorUI
+    from utils.file_helpers import load_app_state
+    from utils.profiling import profiling_session
 
-    window = FileSelectorUI(python_files, app_state)  # Pass app_state to the window
-    window.show()
+    with profiling_session(trace_path, profile_path):
+        app = QApplication([])
 
-    app.exec()
+        app_state = load_app_state(root)  # Load the state saved for this project
+
+        window = FileSelectorUI(root, app_state)  # Pass app_state to the window
+        window.show()
+        window.start_scan()  # Fill the tree in the background once the window is up
+
+        return app.exec()
+
+
+def main(argv=None):
+    """Start the GUI, or bundle headlessly when command-line arguments are given."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from cli import run
+
+        return run(argv)
+    return run_gui()
 
 
 if __name__ == "__main__":
-    main()
+    # Outline workers are spawned processes; in a frozen build they re-run this
+    # file and must be handed over to multiprocessing before main() sees them
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""split_bundle: parts stay within their limit and join back into the bundle."""
+
+import re
+
+import pytest
+
+from utils.export import PART_HEADER, split_bundle
+from utils.tokens import HeuristicTokenizer, TokenCounter
+
+HEADER = re.compile(r"\[Part (\d+) of (\d+)\]\n\n")
+
+
+def make_bundle():
+    files = []
+    for number in range(40):
+        body = "\n".join(
+            f"    value_{number}_{line} = {line} * {'x' * (line % 13)!r}"
+            for line in range(number * 3)
+        )
+        files.append(f"# pkg/module_{number}.py\n{body}\n\n\n")
+    # A blank line inside a file, one long line, and surrounding whitespace
+    files.append("# notes.md\n\n\nfirst\n\n# not a file header\n" + "y" * 5000 + "\n")
+    return "\n\n".join(files) + "  \n"
+
+
+def unpack(parts):
+    """Check the part headers and return the parts without them."""
+    bodies = []
+    for number, part in enumerate(parts, 1):
+        match = HEADER.match(part)
+        assert match is not None
+        assert (int(match.group(1)), int(match.group(2))) == (number, len(parts))
+        bodies.append(part[match.end() :])
+    return bodies
+
+
+@pytest.mark.parametrize("limit", [200, 1000, 4096, 20000])
+def test_character_parts_join_back(limit):
+    bundle = make_bundle()
+    parts = split_bundle(bundle, limit)
+    assert len(parts) > 1
+    assert all(len(part) <= limit for part in parts)
+    assert "".join(unpack(parts)) == bundle
+
+
+@pytest.mark.parametrize("limit", [100, 800])
+def test_token_parts_join_back(limit):
+    bundle = make_bundle()
+    counter = TokenCounter(HeuristicTokenizer())
+    parts = split_bundle(bundle, limit, "tokens", counter)
+    assert len(parts) > 1
+    assert all(counter.count(part) <= limit for part in parts)
+    assert "".join(unpack(parts)) == bundle
+
+
+def test_parts_break_between_files_when_they_fit():
+    bundle = make_bundle()
+    for body in unpack(split_bundle(bundle, 20000))[1:]:
+        assert body.startswith("# ")
+
+
+def test_small_bundles_stay_whole():
+    bundle = make_bundle()
+    assert split_bundle(bundle, len(bundle)) == [bundle]
+    assert split_bundle(bundle, 0) == [bundle]
+    assert split_bundle("", 10) == [""]
+    assert PART_HEADER.format(number=1, total=1) not in split_bundle("short", 10)[0]
@@ -0,0 +1,97 @@
+"""GitRepository against git itself: every object of a packed repository must read back as git cat-file shows it."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from utils.git_objects import OFS_DELTA, REF_DELTA, GitRepository
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+def make_history(repo):
+    """Commit a growing file many times over, so packing stores most versions as deltas."""
+    git(repo, "init", "-q")
+    lines = [f"line {i}: {'x' * (i % 17)}\n" for i in range(400)]
+    for version in range(12):
+        lines[version * 7] = f"changed in version {version}\n"
+        lines.append(f"added in version {version}\n")
+        (repo / "module.py").write_text("".join(lines), encoding="utf-8")
+        (repo / "sub").mkdir(exist_ok=True)
+        (repo / "sub" / "notes.txt").write_text(
+            "notes\n" * (50 + version), encoding="utf-8"
+        )
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", f"version {version}")
+    git(repo, "tag", "-a", "-m", "annotated", "v1")
+
+
+def all_objects(repo):
+    """Return {object name: type name} for every object git has."""
+    listing = git(repo, "cat-file", "--batch-all-objects", "--batch-check").decode()
+    return {
+        name: kind for name, kind, _ in (line.split() for line in listing.splitlines())
+    }
+
+
+def pack_entry_types(repo):
+    """Return the set of pack entry types (as in the pack headers) in the repository's pack."""
+    pack = next((repo / ".git" / "objects" / "pack").glob("*.pack"))
+    data = pack.read_bytes()
+    listing = git(repo, "verify-pack", "-v", str(pack.with_suffix(".idx"))).decode()
+    types = set()
+    for line in listing.splitlines():
+        fields = line.split()
+        if len(fields) >= 5 and len(fields[0]) == 40:
+            types.add((data[int(fields[4])] >> 4) & 7)
+    return types
+
+
+def check_objects(repo):
+    repository = GitRepository(str(repo))
+    for name, kind in all_objects(repo).items():
+        assert repository.read_object(name) == (kind, git(repo, "cat-file", kind, name))
+
+
+@pytest.mark.parametrize(
+    "delta_type, option",
+    [(OFS_DELTA, "true"), (REF_DELTA, "false")],
+    ids=["ofs-delta", "ref-delta"],
+)
+def test_packed_objects_match_cat_file(tmp_path, delta_type, option):
+    make_history(tmp_path)
+    git(tmp_path, "-c", f"repack.useDeltaBaseOffset={option}", "repack", "-adfq")
+    assert delta_type in pack_entry_types(tmp_path)
+    check_objects(tmp_path)
+
+
+def test_loose_objects_match_cat_file(tmp_path):
+    make_history(tmp_path)
+    check_objects(tmp_path)
+
+
+def test_blob_ids_follow_revisions(tmp_path):
+    make_history(tmp_path)
+    git(tmp_path, "repack", "-adq")
+    repository = GitRepository(str(tmp_path))
+    for revision in ("HEAD", "HEAD~3", "v1", "HEAD~1^"):
+        commit = repository.resolve(revision)
+        assert (
+            commit
+            == git(tmp_path, "rev-parse", f"{revision}^{{commit}}").decode().strip()
+        )
+        expected = {
+            path: git(tmp_path, "rev-parse", f"{commit}:{path}").decode().strip()
+            for path in ("module.py", "sub/notes.txt")
+        }
+        assert repository.blob_ids(commit, [*expected, "missing.py"]) == expected
@@ -0,0 +1,131 @@
+"""GitIgnore against git itself: each path must be ignored exactly when git check-ignore says so."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from utils.gitignore import GitIgnore
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+RULES = {
+    ".gitignore": [
+        "# comments and blank lines are skipped",
+        "",
+        "*.log",
+        "!keep.log",
+        "/root_only.txt",
+        "build/",
+        "docs/**/*.tmp",
+        "**/cache",
+        "a/**/b",
+        "data/*",
+        "!data/wanted/",
+        "tmp?",
+        "[Ss]ecret*",
+        r"\#literal",
+        "trailing\\ ",
+        "dir_only_file/",
+    ],
+    "src/.gitignore": [
+        "generated.py",
+        "/local_only.py",
+        "!important.log",
+        "nested/",
+    ],
+}
+
+FILES = [
+    "app.log",
+    "keep.log",
+    "sub/keep.log",
+    "sub/other.log",
+    "root_only.txt",
+    "sub/root_only.txt",
+    "build/out.o",
+    "sub/build/out.o",
+    "build.txt",
+    "docs/x.tmp",
+    "docs/a/b/c.tmp",
+    "docs/a/c.txt",
+    "cache/x",
+    "deep/er/cache/y",
+    "cachefile",
+    "a/b",
+    "a/x/b",
+    "a/x/y/b/z",
+    "data/unwanted/f",
+    "data/wanted/f",
+    "data/top.txt",
+    "tmp1",
+    "tmp12",
+    "secret.txt",
+    "Secret.txt",
+    "#literal",
+    "trailing ",
+    "dir_only_file",
+    "src/generated.py",
+    "src/deeper/generated.py",
+    "src/local_only.py",
+    "src/deeper/local_only.py",
+    "src/important.log",
+    "src/nested/f.py",
+    "src/nested.py",
+    "plain.py",
+]
+
+
+def git(repo, *args, **kwargs):
+    return subprocess.run(
+        ["git", *args], cwd=repo, capture_output=True, text=True, **kwargs
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q", check=True)
+    for name, lines in RULES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    for name in FILES:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x\n", encoding="utf-8")
+    return tmp_path
+
+
+def git_ignored(repo, paths):
+    """Return the paths git check-ignore reports as ignored."""
+    result = git(repo, "check-ignore", "--stdin", input="\n".join(paths) + "\n")
+    assert result.returncode in (0, 1), result.stderr
+    return set(result.stdout.splitlines())
+
+
+def test_single_paths_match_check_ignore(repo):
+    ignore = GitIgnore(str(repo))
+    expected = git_ignored(repo, FILES)
+    assert {path for path in FILES if ignore.is_path_ignored(path)} == expected
+
+
+def test_directories_match_check_ignore(repo):
+    # git tells the folders from files by looking at the work tree
+    folders = sorted({path.rpartition("/")[0] for path in FILES} - {""})
+    ignore = GitIgnore(str(repo))
+    expected = git_ignored(repo, folders)
+    assert {
+        path for path in folders if ignore.is_path_ignored(path, is_dir=True)
+    } == expected
+
+
+def test_walk_lists_what_git_would_add(repo):
+    ignore = GitIgnore(str(repo))
+    walked = {
+        f"{rel_dir}/{name}" if rel_dir else name
+        for rel_dir, _, files in ignore.walk()
+        for name in files
+    }
+    untracked = git(repo, "ls-files", "--others", "--exclude-standard", check=True)
+    assert walked == set(untracked.stdout.splitlines())
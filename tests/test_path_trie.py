@@ -0,0 +1,129 @@
+"""PathTrie counters: every folder's checked and total must equal a recount of the files below it."""
+
+import random
+
+from utils.path_trie import CHECKED, PARTIALLY_CHECKED, UNCHECKED, PathTrie
+
+PATHS = [
+    "main.py",
+    "README.md",
+    "ui/window.py",
+    "ui/tree.py",
+    "ui/widgets/button.py",
+    "ui/widgets/label.md",
+    "utils/a.py",
+    "utils/b.md",
+    "utils/deep/er/c.py",
+    "utils/deep/er/d.py",
+    "utils/deep/e.md",
+]
+
+
+def build(paths, checked=()):
+    trie = PathTrie()
+    for path in paths:
+        trie.insert(path, CHECKED if path in checked else UNCHECKED)
+    return trie
+
+
+def folders(trie):
+    stack, found = [trie.root], []
+    while stack:
+        node = stack.pop()
+        if node.children is not None:
+            found.append(node)
+            stack.extend(node.children)
+    return found
+
+
+def assert_counts(trie):
+    for folder in folders(trie):
+        files = list(trie.iter_files(folder))
+        assert folder.total == len(files), folder.path()
+        assert folder.checked == sum(f.checked for f in files), folder.path()
+    assert trie.file_count == trie.root.total
+
+
+def checked_paths(trie):
+    return {node.path() for node in trie.iter_checked_files()}
+
+
+def test_insert_counts_files_and_checked_files():
+    trie = build(PATHS, checked={"ui/tree.py", "utils/deep/er/c.py"})
+    assert_counts(trie)
+    assert trie.root.total == len(PATHS)
+    assert checked_paths(trie) == {"ui/tree.py", "utils/deep/er/c.py"}
+    assert trie.find("ui").state == PARTIALLY_CHECKED
+    assert trie.find("ui/widgets").state == UNCHECKED
+
+
+def test_folder_toggles_update_subtree_and_ancestors():
+    trie = build(PATHS)
+    trie.set_state(trie.find("utils/deep"), CHECKED)
+    assert_counts(trie)
+    assert checked_paths(trie) == {
+        "utils/deep/er/c.py",
+        "utils/deep/er/d.py",
+        "utils/deep/e.md",
+    }
+    assert trie.find("utils").state == PARTIALLY_CHECKED
+
+    trie.set_state(trie.find("utils/deep/er/c.py"), UNCHECKED)
+    assert_counts(trie)
+    assert trie.find("utils/deep/er").state == PARTIALLY_CHECKED
+
+    trie.set_state(trie.root, CHECKED)
+    assert_counts(trie)
+    assert trie.root.checked == trie.root.total == len(PATHS)
+
+    trie.set_state(trie.find("ui"), UNCHECKED)
+    trie.set_state(trie.root, UNCHECKED)
+    assert_counts(trie)
+    assert trie.root.checked == 0 and not checked_paths(trie)
+
+
+def test_set_state_reports_folders_whose_state_changed():
+    trie = build(PATHS)
+    changed = trie.set_state(trie.find("utils/deep/er/c.py"), CHECKED)
+    assert [node.path() for node in changed] == ["utils/deep/er", "utils/deep", "utils"]
+    # Checking the second file only completes its own folder
+    changed = trie.set_state(trie.find("utils/deep/er/d.py"), CHECKED)
+    assert [node.path() for node in changed] == ["utils/deep/er"]
+    assert trie.set_state(trie.find("utils/deep/er/d.py"), CHECKED) == []
+
+
+def test_filter_changes_keep_the_checked_files_that_remain():
+    # Changing the filter rebuilds the tree from the matching files,
+    # carrying over which of them were checked
+    trie = build(PATHS)
+    trie.set_state(trie.find("utils"), CHECKED)
+    trie.set_state(trie.find("ui/widgets/button.py"), CHECKED)
+    checked = checked_paths(trie)
+
+    only_python = [path for path in PATHS if path.endswith(".py")]
+    trie = build(only_python, checked)
+    assert_counts(trie)
+    assert checked_paths(trie) == {path for path in checked if path.endswith(".py")}
+    assert trie.find("utils").state == CHECKED
+    assert trie.find("ui/widgets").state == CHECKED
+    assert trie.find("ui").state == PARTIALLY_CHECKED
+
+    trie = build(PATHS, checked_paths(trie))
+    assert_counts(trie)
+    assert trie.find("utils").state == PARTIALLY_CHECKED
+    assert trie.find("ui/widgets").state == PARTIALLY_CHECKED
+
+
+def test_random_toggles_keep_counts_consistent():
+    rng = random.Random(5)
+    paths = [
+        "/".join(f"d{rng.randrange(4)}" for _ in range(rng.randrange(4))) + f"/f{i}"
+        for i in range(300)
+    ]
+    paths = [path.lstrip("/") for path in paths]
+    trie = build(paths)
+    nodes = folders(trie) + list(trie.iter_files())
+    for _ in range(500):
+        trie.set_state(rng.choice(nodes), rng.choice((CHECKED, UNCHECKED)))
+        assert trie.root.checked == len(checked_paths(trie))
+    assert_counts(trie)
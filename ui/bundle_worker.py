@@ -0,0 +1,29 @@
+from PySide6.QtCore import QThread, Signal
+
+
+class BundleWorker(QThread):
+    """Runs a bundling job off the GUI thread: formatting, and copying or writing the result.
+
+    The job is called with should_stop, for waits that have to end when the
+    window closes, and its return value is emitted with job_finished.
+    """
+
+    job_finished = Signal(object)
+    job_failed = Signal(str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+
+    def run(self):
+        try:
+            result = self.job(self.isInterruptionRequested)
+        except Exception as e:
+            # Shown in the status bar instead of being lost with the thread
+            self.job_failed.emit(str(e) or type(e).__name__)
+        else:
+            self.job_finished.emit(result)
+
+    def cancel(self):
+        """Ask the job to stop waiting; formatting already under way runs to the end."""
+        self.requestInterruption()
@@ -12,8 +12,8 @@ class FileExtensionInput:
         # Vertical layout for the label and input components
         self.layout = QVBoxLayout()
 
-        # Label for file extension input
-        self.label = QLabel("File extension:")
+        # Label for file filter input
+        self.label = QLabel("File filter:")
         self.layout.addWidget(self.label)
 
         # Horizontal layout for the lock icon and input
@@ -25,9 +25,13 @@ class FileExtensionInput:
         self.lock_button.clicked.connect(self.toggle_lock)
         input_layout.addWidget(self.lock_button)
 
-        # File extension input
+        # File filter input: extensions, .gitignore-style patterns or re: expressions
         self.input = QLineEdit(self.extension)
-        self.input.setFixedWidth(100)  # Adjust width to accommodate more characters
+        self.input.setFixedWidth(220)  # Adjust width to accommodate more characters
+        self.input.setToolTip(
+            "Extensions and patterns separated by commas, e.g. .py,.pyi,.toml\n"
+            "or src/**/*.ts !*.d.ts; re:<expression> matches the path"
+        )
         self.input.setAlignment(Qt.AlignLeft)  # Align the input to the left
         self.input.returnPressed.connect(self.handle_enter_press)  # Lock on Enter press
         self.set_input_locked_appearance()  # Set appearance based on lock state
@@ -82,5 +86,5 @@ class FileExtensionInput:
             self.on_update_callback()  # Apply filter when locking
 
     def get_extension(self):
-        """Return the current file extension."""
+        """Return the current filter text, e.g. ".py" or ".py,.toml"."""
         return self.input.text().strip()
@@ -5,21 +5,59 @@ from PySide6.QtWidgets import (
     QPushButton,
     QHBoxLayout,
     QCheckBox,
+    QLineEdit,
+    QComboBox,
+    QLabel,
+    QSpinBox,
+    QFileDialog,
 )
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
+from ui.bundle_worker import BundleWorker
 from ui.file_extension_input import FileExtensionInput
 from ui.file_tree_view import FileTreeView
+from ui.file_watcher import FileWatcher
+from ui.profile_panel import ProfilePanel
+from ui.scan_worker import ScanWorker
+from utils.bundle import CLIPBOARD_MAX_SIZE, build_bundle
+from utils.content_cache import ContentCache
+from utils.diff_bundle import (
+    DIFF_MODES,
+    iter_changed_bundle,
+    iter_git_diff_bundle,
+    snapshot_files,
+)
+from utils.export import (
+    PART_UNITS,
+    SINKS,
+    split_bundle,
+    write_temporary,
+    write_text,
+)
 from utils.file_helpers import (
+    load_submitted_files,
     save_app_state,
-    collect_file_data,
+    save_submitted_files,
     copy_to_clipboard,
 )
-from utils.ui_helpers import toggle_all_tree_items
+from utils.file_filter import FileFilter
+from utils.git_objects import GitError
+from utils.outline import Outliner, build_outline_bundle
+from utils.path_search import SEARCH_DELAY
+from utils.profiling import profiled, span
+from utils.scanner import ProjectIndex
+from utils.token_budget import FULL, PRIORITIES, build_budget_bundle
+from utils.tokens import TokenCounter, format_token_count
+from utils.watcher import project_folders, rescan_folders
+from utils.workspace import ignore_rules
+from utils.ui_helpers import create_submit_button, toggle_all_tree_items
+
+# Default size of each part for "Clipboard in parts", in the unit chosen
+DEFAULT_PART_SIZE = 100_000
 
 
 class FileSelectorUI(QMainWindow):
-    def __init__(self, python_files, app_state):
+    def __init__(self, root, app_state):
         super().__init__()
         self.setWindowTitle("Spoon App")
         self.setWindowIcon(QIcon("resources/spoon.png"))
@@ -32,6 +70,27 @@ class FileSelectorUI(QMainWindow):
         self.select_all_state = app_state["select_all_state"]
         self.file_extension = app_state["file_extension"]
 
+        # Filled in the background by start_scan
+        self.file_index = ProjectIndex(root)
+        self.scan_worker = None
+
+        # Keeps the index and tree in step with the disk once a scan is done
+        self.file_watcher = FileWatcher(root, self)
+        self.file_watcher.folders_changed.connect(self.on_folders_changed)
+        self.watched_folders = set()
+        self.ignore = None
+
+        # Keeps file contents between submits so only edited files are re-read
+        self.content_cache = ContentCache()
+        self.token_counter = TokenCounter()
+        self.outliner = Outliner()  # Keeps outlines of unchanged files, and its workers
+
+        # Formats and sends the bundle off the GUI thread, one submit at a time
+        self.bundle_worker = None
+        self.parts = []  # Parts of the last bundle split for the clipboard
+        self.next_part = 0
+        self.parts_submitted = None  # (root, records) to save once every part is copied
+
         # Main layout
         main_layout = QVBoxLayout()
 
@@ -44,9 +103,19 @@ class FileSelectorUI(QMainWindow):
         self.select_all_checkbox.stateChanged.connect(self.toggle_select_all_files)
 
         self.tree_view = FileTreeView(
-            python_files, self.file_extension, self.selected_files
+            self.file_index, self.file_extension, self.selected_files
         )
-        self.tree_view.itemChanged.connect(self.tree_view.on_item_changed)
+
+        # Search box: runs once typing pauses, opening only the folders with matches
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search files…")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(int(SEARCH_DELAY * 1000))
+        self.search_timer.timeout.connect(self.update_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.update_search)
 
         # Buttons for expanding and collapsing the tree
         button_layout = QHBoxLayout()
@@ -59,19 +128,190 @@ class FileSelectorUI(QMainWindow):
         button_layout.addWidget(collapse_button)
         main_layout.addLayout(button_layout)
 
+        # Token budget for Submit; 0 copies the selection whole
+        budget_layout = QHBoxLayout()
+        self.budget_input = QSpinBox()
+        self.budget_input.setRange(0, 10_000_000)
+        self.budget_input.setSingleStep(1000)
+        self.budget_input.setSpecialValueText("No limit")
+        self.priority_input = QComboBox()
+        for key, label in PRIORITIES.items():
+            self.priority_input.addItem(label, key)
+        budget_layout.addWidget(QLabel("Token budget:"))
+        budget_layout.addWidget(self.budget_input)
+        budget_layout.addWidget(self.priority_input)
+
+        # Whole files, or only what changed since the last submit or a git revision
+        diff_layout = QHBoxLayout()
+        self.diff_mode_input = QComboBox()
+        for key, label in DIFF_MODES.items():
+            self.diff_mode_input.addItem(label, key)
+        self.revision_input = QLineEdit("HEAD")
+        self.revision_input.setFixedWidth(100)
+        self.revision_input.setToolTip("Branch, tag or commit, e.g. HEAD~1 or main")
+        self.revision_input.setEnabled(False)
+        self.diff_mode_input.currentIndexChanged.connect(
+            lambda: self.revision_input.setEnabled(
+                self.diff_mode_input.currentData() == "git"
+            )
+        )
+        # Files that stay whole when the rest is outlined or squeezed into the budget
+        self.focus_input = QLineEdit()
+        self.focus_input.setPlaceholderText("Focus files, e.g. src/core/")
+        self.focus_input.setToolTip(
+            "Files kept whole by outlines and the token budget, in filter syntax"
+        )
+        diff_layout.addWidget(QLabel("Copy:"))
+        diff_layout.addWidget(self.diff_mode_input)
+        diff_layout.addWidget(self.revision_input)
+        diff_layout.addWidget(self.focus_input)
+
+        # Where the bundle goes; big ones can be copied in parts or written to a file
+        export_layout = QHBoxLayout()
+        self.sink_input = QComboBox()
+        for key, label in SINKS.items():
+            self.sink_input.addItem(label, key)
+        self.part_size_input = QSpinBox()
+        self.part_size_input.setRange(1000, 100_000_000)
+        self.part_size_input.setSingleStep(10_000)
+        self.part_size_input.setValue(DEFAULT_PART_SIZE)
+        self.part_size_input.setToolTip("Largest part to copy at a time")
+        self.part_unit_input = QComboBox()
+        for key, label in PART_UNITS.items():
+            self.part_unit_input.addItem(label, key)
+        self.next_part_button = QPushButton("Next Part")
+        self.next_part_button.setShortcut("Ctrl+N")
+        self.next_part_button.setToolTip(
+            "Copy the next part of the last bundle (Ctrl+N)"
+        )
+        self.next_part_button.setEnabled(False)
+        self.next_part_button.clicked.connect(self.copy_next_part)
+        self.sink_input.currentIndexChanged.connect(self.update_part_inputs)
+        self.update_part_inputs()
+        export_layout.addWidget(QLabel("Send to:"))
+        export_layout.addWidget(self.sink_input)
+        export_layout.addWidget(self.part_size_input)
+        export_layout.addWidget(self.part_unit_input)
+        export_layout.addWidget(self.next_part_button)
+
         # Setup the layout with all widgets
         main_layout.addLayout(self.file_extension_input.layout)
         main_layout.addWidget(self.select_all_checkbox)
+        main_layout.addWidget(self.search_input)
         main_layout.addWidget(self.tree_view)
+        main_layout.addLayout(budget_layout)
+        main_layout.addLayout(diff_layout)
+        main_layout.addLayout(export_layout)
+        self.submit_button = create_submit_button(self.on_submit)
+        main_layout.addWidget(self.submit_button)
+
+        # Running estimate of the selection's size in tokens
+        self.token_label = QLabel()
+        self.statusBar().addPermanentWidget(self.token_label)
+        self.tree_view.tree_model.selection_changed.connect(self.update_token_label)
 
         container = QWidget()
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
-        # Ensure the initial state is reflected in the UI
-        self.toggle_select_all_files(initial=True)
+        # Time spent per stage, for tracking down slowness; F12 shows it
+        self.profile_panel = ProfilePanel(self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.profile_panel)
+        self.profile_panel.hide()
+        toggle_panel = self.profile_panel.toggleViewAction()
+        toggle_panel.setShortcut("F12")
+        self.addAction(toggle_panel)
+
+        self.update_token_label()
+
+    def start_scan(self, root=None):
+        """Scan the project in the background, adding files to the tree as they are found."""
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()  # Batches still in flight are dropped in on_files_found
+        self.file_watcher.stop()
+
+        self.file_index = ProjectIndex(root or self.file_index.root)
+        self.tree_view.file_index = self.file_index
+        self.tree_view.populate_tree()
+
+        self.scan_worker = ScanWorker(self.file_index.root, self)
+        self.scan_worker.files_found.connect(self.on_files_found)
+        self.scan_worker.scan_finished.connect(self.on_scan_finished)
+        self.scan_worker.finished.connect(self.scan_worker.deleteLater)
+        self.statusBar().showMessage("Scanning…")
+        self.scan_worker.start()
+
+    def on_files_found(self, entries):
+        """Add a batch of scanned files to the index and the tree."""
+        if self.sender() is not self.scan_worker:
+            return  # From a scan that has since been cancelled
+
+        self.file_index.add(entries)
+        self.tree_view.add_files(
+            entries, checked=self.select_all_checkbox.checkState() == Qt.Checked
+        )
+        self.statusBar().showMessage(f"Scanning… {len(self.file_index):,} files found")
+
+    def on_scan_finished(self, file_count):
+        """Show the final count and settle the tree once the scan is complete."""
+        if self.sender() is not self.scan_worker:
+            return
+
+        self.scan_worker = None
+        self.tree_view.sort_tree()
+        self.update_select_all_checkbox()
+        self.statusBar().showMessage(f"{file_count:,} files")
+
+        # Watch every folder holding a file; empty folders are picked up when they fill
+        root = self.file_index.root
+        self.ignore = ignore_rules(root)
+        self.watched_folders = project_folders(self.file_index)
+        self.file_watcher.start(root, self.watched_folders)
+
+    def on_folders_changed(self, folders):
+        """Apply files added, modified or removed on disk to the index and the tree."""
+        if self.scan_worker is not None:
+            return  # The running scan will see the changes
+
+        changes = rescan_folders(
+            self.file_index, folders, self.watched_folders, self.ignore
+        )
+        if changes.rescan:
+            self.start_scan()  # An ignore file changed, so what is visible may differ anywhere
+            return
+
+        self.file_index.remove(changes.removed)
+        self.file_index.add(changes.added)
+        self.watched_folders -= changes.gone_folders
+        self.watched_folders |= changes.new_folders
+        self.file_watcher.unwatch(changes.gone_folders)
+        self.file_watcher.watch(changes.new_folders)
+
+        self.tree_view.apply_changes(
+            changes.added,
+            changes.removed,
+            checked=self.select_all_checkbox.checkState() == Qt.Checked,
+        )
         self.update_select_all_checkbox()
+        if changes.added or changes.removed:
+            self.statusBar().showMessage(
+                f"{len(self.file_index):,} files "
+                f"({len(changes.added):,} added or changed, {len(changes.removed):,} removed)"
+            )
 
+    def closeEvent(self, event):
+        """Stop a running scan and the file watcher before the window goes away."""
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            self.scan_worker.wait()
+        self.file_watcher.stop()
+        if self.bundle_worker is not None:
+            self.bundle_worker.cancel()  # Stops waiting for a pipe to be read
+            self.bundle_worker.wait()
+        self.outliner.close()
+        super().closeEvent(event)
+
+    @profiled("expand all")
     def expand_all(self):
         """Expand all items in the tree view."""
         self.tree_view.expandAll()
@@ -80,46 +320,388 @@ class FileSelectorUI(QMainWindow):
         """Collapse all items in the tree view."""
         self.tree_view.collapseAll()
 
+    def update_part_inputs(self):
+        """Enable the part size only when the bundle is copied in parts."""
+        parts = self.sink_input.currentData() == "parts"
+        self.part_size_input.setEnabled(parts)
+        self.part_unit_input.setEnabled(parts)
+
+    @profiled("submit")
     def on_submit(self):
         """Handle submit button click."""
+        if self.bundle_worker is not None:
+            return  # The last submit is still being formatted or sent
+
         # Collect the selected files
-        self.selected_files = self.tree_view.get_selected_files()
+        self.selected_files = set(self.tree_view.get_selected_paths())
+        self.tree_view.selected_files = self.selected_files
 
         if self.selected_files:
-            # Save the application state, including selected files, "Select All" checkbox state, and file extension
+            # Save the application state, including selected files, "Select All" checkbox state, and the filter in use
             save_app_state(
+                self.file_index.root,
                 self.selected_files,
-                self.select_all_checkbox.isChecked(),
-                self.file_extension_input.get_extension(),
+                self.select_all_checkbox.checkState() == Qt.Checked,
+                self.tree_view.file_filter.text,
             )
 
-            # Collect data from the selected files
-            full_paths = {
-                os.path.join(folder, filename)
-                for folder, filename in self.selected_files
-            }
-            collected_data = collect_file_data(full_paths)
-
-            # Format the collected data and copy to clipboard
-            formatted_data = "\n\n".join(
-                f"# {file_path}\n{content}"
-                for file_path, content in collected_data.items()
+            # Everything the job needs is read from the widgets here, on the GUI thread
+            root = self.file_index.root
+            paths = list(self.tree_view.get_selected_paths())
+            previous = load_submitted_files(root)
+            try:
+                format_bundle = self.bundle_formatter(paths, previous)
+            except ValueError as e:
+                self.statusBar().showMessage(f"Nothing sent, invalid focus: {e}")
+                return
+            sink = self.sink_input.currentData()
+            target = None
+            if sink == "file":
+                target, _ = QFileDialog.getSaveFileName(
+                    self,
+                    "Send Bundle",
+                    "bundle.txt",
+                    "Text files (*.txt);;All files (*)",
+                )
+                if not target:
+                    return
+            elif sink == "parts":
+                target = (
+                    self.part_size_input.value(),
+                    self.part_unit_input.currentData(),
+                )
+
+            def job(should_stop):
+                with span("bundle"):
+                    result = format_bundle()
+                sent = False
+                if result["bundle"] is not None:
+                    with span("send"):
+                        result["message"], result["parts"], sent = self.send_bundle(
+                            result["bundle"],
+                            result["message"],
+                            sink,
+                            target,
+                            should_stop,
+                        )
+                # Remember what went out whole for the next "changed" submit;
+                # diffs, outlines and budgets leave the last records in place
+                if not sent:
+                    result["submitted"] = None
+                result["root"] = root
+                return result
+
+            self.statusBar().showMessage(f"Formatting {len(paths):,} files…")
+            self.start_bundle_job(job, self.on_bundle_sent)
+
+    def bundle_formatter(self, paths, previous):
+        """Return a function formatting paths as the Copy inputs say, for the worker thread to call.
+
+        The inputs are read now. The function returns a dict with the
+        "bundle" (None if there is none) and a "message" describing it, plus
+        the new "submitted" records, when every file went out whole, or real
+        "token_counts", when the mode produces them. Raises ValueError for an invalid focus.
+        """
+        mode = self.diff_mode_input.currentData()
+        if mode == "submit":
+            return lambda: self.format_changed_bundle(paths, previous)
+        if mode == "git":
+            revision = self.revision_input.text().strip() or "HEAD"
+            return lambda: self.format_git_diff_bundle(paths, revision)
+        focus = self.focus()
+        if mode == "outline":
+            return lambda: self.format_outline_bundle(paths, focus)
+        budget = self.budget_input.value()
+        if budget:
+            priority = self.priority_input.currentData()
+            return lambda: self.format_budget_bundle(paths, budget, priority, focus)
+        return lambda: self.format_bundle(paths, previous)
+
+    def send_bundle(self, bundle, description, sink, target, should_stop):
+        """Send a formatted bundle to sink; return a status message, the parts if split, and whether it was sent.
+
+        Runs on the worker thread: the clipboard can take a while with large
+        text, and a named pipe blocks until something reads it.
+        """
+        if sink == "file":
+            if not write_text(target, bundle, should_stop):
+                return f"Nothing sent, no reader opened {target}", None, False
+            return f"Wrote {description} to {target}", None, True
+        if sink == "temp":
+            path = write_temporary(bundle)
+            copy_to_clipboard(path)
+            return f"Wrote {description} to {path} (path copied)", None, True
+        if sink == "parts":
+            size, unit = target
+            parts = split_bundle(bundle, size, unit, counter=self.token_counter)
+            copy_to_clipboard(parts[0])
+            if len(parts) == 1:
+                return f"Copied {description}", None, True
+            message = (
+                f"Split {description} into {len(parts)} parts and copied part 1"
+                ", Next Part copies part 2"
+            )
+            return message, parts, True
+        copy_to_clipboard(bundle)
+        return f"Copied {description}", None, True
+
+    def start_bundle_job(self, job, on_finished):
+        """Run job(should_stop) on a BundleWorker, keeping Submit and Next Part disabled meanwhile."""
+        self.bundle_worker = BundleWorker(job, self)
+        self.bundle_worker.job_finished.connect(on_finished)
+        self.bundle_worker.job_failed.connect(self.on_bundle_failed)
+        self.bundle_worker.finished.connect(self.bundle_worker.deleteLater)
+        self.submit_button.setEnabled(False)
+        self.next_part_button.setEnabled(False)
+        self.bundle_worker.start()
+
+    def finish_bundle_job(self):
+        self.bundle_worker = None
+        self.submit_button.setEnabled(True)
+        self.next_part_button.setEnabled(self.next_part < len(self.parts))
+
+    def on_bundle_sent(self, result):
+        """Show how the submit went and remember it, back on the GUI thread."""
+        if result.get("token_counts"):
+            # The files have been read now, so show real counts instead of estimates
+            self.tree_view.tree_model.set_token_counts(result["token_counts"])
+        if result["bundle"] is not None:
+            self.parts = result.get("parts") or []
+            self.next_part = 1
+            self.parts_submitted = None
+        if result.get("submitted") is not None:
+            if self.parts:
+                # Recorded once the last part has been copied too
+                self.parts_submitted = (result["root"], result["submitted"])
+            else:
+                save_submitted_files(result["root"], result["submitted"])
+        self.finish_bundle_job()
+        self.statusBar().showMessage(result["message"])
+
+        cache_stats = self.content_cache.stats()
+        self.statusBar().setToolTip(
+            f"Content cache: {cache_stats['hits']:,} hits, "
+            f"{cache_stats['misses']:,} misses, "
+            f"{cache_stats['evictions']:,} evictions, "
+            f"{cache_stats['bytes'] / 1e6:.1f} MB"
+        )
+
+    def on_bundle_failed(self, error):
+        self.finish_bundle_job()
+        self.statusBar().showMessage(f"Failed to send the bundle: {error}")
+
+    def copy_next_part(self):
+        """Copy the next part of the last bundle split into parts."""
+        if self.bundle_worker is not None or self.next_part >= len(self.parts):
+            return
+        part, number, total = (
+            self.parts[self.next_part],
+            self.next_part + 1,
+            len(self.parts),
+        )
+        self.next_part += 1
+
+        def job(should_stop):
+            copy_to_clipboard(part)
+            if number < total:
+                return f"Copied part {number} of {total}, Next Part copies part {number + 1}"
+            return f"Copied part {number} of {total}, the last one"
+
+        self.start_bundle_job(job, self.on_part_copied)
+
+    def on_part_copied(self, message):
+        if self.next_part >= len(self.parts) and self.parts_submitted is not None:
+            save_submitted_files(*self.parts_submitted)
+            self.parts_submitted = None
+        self.finish_bundle_job()
+        self.statusBar().showMessage(message)
+
+    def format_bundle(self, paths, previous):
+        """Format the whole selection, with the submit records of the files in it."""
+        # Hashed first: a file saved while the bundle is read or sent is then
+        # recorded as it was before, and goes out again with the next "changed"
+        # submit instead of being missed
+        submitted = snapshot_files(
+            paths, self.file_index.root, previous, self.content_cache
+        )
+        # Stream the selected files into one bundle, capped so a huge selection
+        # can't exhaust memory
+        bundle, stats = build_bundle(
+            paths,
+            self.file_index.root,
+            max_size=CLIPBOARD_MAX_SIZE,
+            cache=self.content_cache,
+        )
+
+        message = f"{stats.files:,} files ({stats.size:,} characters)"
+        if stats.duplicates:
+            message += f", {stats.duplicates:,} duplicates referenced ({stats.saved:,} characters saved)"
+        if stats.truncated:
+            message += f", cut off at {CLIPBOARD_MAX_SIZE:,} characters"
+        if stats.errors:
+            message += f", skipped {len(stats.errors):,} unreadable or binary"
+        return {
+            "bundle": bundle,
+            "message": message,
+            "submitted": None if stats.truncated else submitted,
+        }
+
+    def format_changed_bundle(self, paths, previous):
+        """Format the files changed since the last submit, along with the new submit records."""
+        stats = {}
+        bundle = "".join(
+            iter_changed_bundle(
+                paths,
+                self.file_index.root,
+                previous,
+                max_size=CLIPBOARD_MAX_SIZE,
+                stats=stats,
+                cache=self.content_cache,
+            )
+        )
+
+        changed = stats["files"] - stats["deleted"]
+        message = f"{changed:,} changed files ({stats['size']:,} characters)"
+        message += f", {stats['unchanged']:,} unchanged"
+        if stats["deleted"]:
+            message += f", {stats['deleted']:,} deleted"
+        if stats["truncated"]:
+            message += f", cut off at {CLIPBOARD_MAX_SIZE:,} characters"
+        if stats["errors"]:
+            message += f", skipped {len(stats['errors']):,} unreadable or binary"
+        return {"bundle": bundle, "message": message, "submitted": stats["submitted"]}
+
+    def format_git_diff_bundle(self, paths, revision):
+        """Format diffs against a git revision."""
+        stats = {}
+        try:
+            bundle = "".join(
+                iter_git_diff_bundle(
+                    paths,
+                    self.file_index.root,
+                    revision,
+                    max_size=CLIPBOARD_MAX_SIZE,
+                    stats=stats,
+                    cache=self.content_cache,
+                )
+            )
+        except (GitError, OSError) as e:
+            return {"bundle": None, "message": f"Nothing sent: {e}"}
+
+        message = (
+            f"{stats['files']:,} files differing from {revision} "
+            f"({stats['size']:,} characters), {stats['unchanged']:,} unchanged"
+        )
+        if stats["truncated"]:
+            message += f", cut off at {CLIPBOARD_MAX_SIZE:,} characters"
+        if stats["errors"]:
+            message += f", skipped {len(stats['errors']):,} unreadable or binary"
+        return {"bundle": bundle, "message": message}
+
+    def focus(self):
+        """Return a predicate for the focus files, or None if there are none; raises ValueError."""
+        text = self.focus_input.text().strip()
+        return FileFilter(text).matches if text else None
+
+    def format_outline_bundle(self, paths, focus):
+        """Format the focus files whole and outlines of the rest."""
+        bundle, stats = build_outline_bundle(
+            paths,
+            self.file_index.root,
+            focus=focus,
+            outliner=self.outliner,
+            max_size=CLIPBOARD_MAX_SIZE,
+            cache=self.content_cache,
+        )
+
+        whole = stats["files"] - stats["outlined"]
+        message = (
+            f"{stats['outlined']:,} outlines and {whole:,} whole files "
+            f"({stats['size']:,} characters, {stats['saved']:,} left out)"
+        )
+        if stats["truncated"]:
+            message += f", cut off at {CLIPBOARD_MAX_SIZE:,} characters"
+        if stats["errors"]:
+            message += f", skipped {len(stats['errors']):,} unreadable or binary"
+        return {"bundle": bundle, "message": message}
+
+    def format_budget_bundle(self, paths, budget, priority, focus):
+        """Format as much of the selection as fits the token budget, with the token counts taken."""
+        bundle, stats = build_budget_bundle(
+            paths,
+            self.file_index.root,
+            budget=budget,
+            priority=priority,
+            counter=self.token_counter,
+            cache=self.content_cache,
+            outliner=self.outliner,
+            focus=focus,
+        )
+
+        message = (
+            f"{stats['files']:,} files (~{format_token_count(stats['tokens'])} tokens)"
+        )
+        reduced = [
+            f"{count:,} {mode}"
+            for mode, count in stats["modes"].items()
+            if count and mode != FULL
+        ]
+        if reduced:
+            message += ", " + ", ".join(reduced)
+        if stats["duplicates"]:
+            message += (
+                f", {stats['duplicates']:,} duplicates referenced"
+                f" (~{format_token_count(stats['saved_tokens'])} tokens saved)"
             )
-            copy_to_clipboard(formatted_data)
+        if stats["left_out"]:
+            message += f", {len(stats['left_out']):,} left out"
+        if stats["errors"]:
+            message += f", skipped {len(stats['errors']):,} unreadable or binary"
+        return {
+            "bundle": bundle,
+            "message": message,
+            "token_counts": stats["token_counts"],
+        }
+
+    def update_token_label(self):
+        """Show the estimated token count of the checked files in the status bar."""
+        tokens = self.tree_view.selected_tokens()
+        self.token_label.setText(f"~{format_token_count(tokens)} tokens selected")
 
     def update_file_filter(self):
-        """Update the tree view based on the file extension input."""
-        extension = self.file_extension_input.get_extension()
-        self.tree_view.update_extension(extension)
-        self.update_select_all_checkbox()
+        """Update the tree view based on the file filter input."""
+        filter_text = self.file_extension_input.get_extension()
+        select_all = self.select_all_checkbox.checkState() == Qt.Checked
+        try:
+            self.tree_view.update_filter(filter_text)
+        except ValueError as e:
+            self.statusBar().showMessage(f"Invalid filter: {e}")
+            return
+        self.select_all_checkbox.setText(f"Select all {filter_text} files")
 
-        # Ensure all items are selected if the "Select All" checkbox is checked
-        if self.select_all_checkbox.isChecked():
+        # Files the new filter shows are checked too if everything was checked
+        # (isChecked() is also true for a partial selection, so compare the state)
+        if select_all:
             self.toggle_select_all_files()
+        else:
+            self.update_select_all_checkbox()
+        if self.search_input.text().strip():
+            self.update_search()  # Search the files the new filter shows
+
+    def update_search(self):
+        """Show the files matching the search box in the tree."""
+        self.search_timer.stop()
+        query = self.search_input.text()
+        count, complete = self.tree_view.search(query)
+        if query.strip():
+            more = "" if complete else "+"
+            self.statusBar().showMessage(
+                f"{count:,}{more} matches for {query.strip()!r}"
+            )
 
-    def toggle_select_all_files(self, initial=False):
+    def toggle_select_all_files(self):
         """Select/deselect all files in the tree view and focus the tree."""
-        select_all = initial or self.select_all_checkbox.isChecked()
+        select_all = self.select_all_checkbox.isChecked()
         toggle_all_tree_items(self.tree_view, select_all)
         self.tree_view.setFocus()
         self.update_select_all_checkbox()
@@ -0,0 +1,329 @@
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, Signal
+from PySide6.QtGui import QFont, QIcon
+from utils.path_trie import CHECKED, UNCHECKED, PathTrie
+from utils.profiling import count, profiled
+from utils.tokens import format_token_count
+
+QT_CHECK_STATES = (Qt.Unchecked, Qt.PartiallyChecked, Qt.Checked)
+
+NAME_COLUMN, TOKENS_COLUMN = 0, 1
+
+# Views ask for flags on every row they lay out, and combining enum members
+# in Python costs more than the rest of the call
+TOKENS_FLAGS = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+NAME_FLAGS = TOKENS_FLAGS | Qt.ItemIsUserCheckable
+
+
+def _to_state(value):
+    """Convert a Qt.CheckState (or its int value) to a trie state."""
+    return value.value if hasattr(value, "value") else int(value)
+
+
+class FileTreeModel(QAbstractItemModel):
+    """Checkable file tree over a PathTrie; folder rows are exposed only when a view fetches them."""
+
+    # Emitted once per check toggle or content change, not per row
+    selection_changed = Signal()
+
+    def __init__(self, icons, parent=None):
+        super().__init__(parent)
+        self.trie = PathTrie()
+        self.folder_icon, self.expanded_folder_icon, self.file_icon = icons
+        self._expanded = set()  # Folder nodes currently expanded in the view
+        self._highlighted = set()  # File nodes shown in bold, e.g. search matches
+        self.highlight_font = QFont()
+        self.highlight_font.setBold(True)
+
+    def node_from_index(self, index):
+        return index.internalPointer() if index.isValid() else self.trie.root
+
+    def index_for_node(self, node, column=NAME_COLUMN):
+        if node is None or node is self.trie.root:
+            return QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    # QAbstractItemModel interface
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if column not in (NAME_COLUMN, TOKENS_COLUMN) or not 0 <= row < node.fetched:
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_for_node(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self.node_from_index(parent).fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def hasChildren(self, parent=QModelIndex()):
+        return bool(self.node_from_index(parent).children)
+
+    def canFetchMore(self, parent):
+        node = self.node_from_index(parent)
+        return node.children is not None and node.fetched < len(node.children)
+
+    def fetchMore(self, parent):
+        """Expose the remaining children of a folder, typically when it is first expanded."""
+        node = self.node_from_index(parent)
+        if node.children is None or node.fetched >= len(node.children):
+            return
+        self.beginInsertRows(parent, node.fetched, len(node.children) - 1)
+        node.fetched = len(node.children)
+        self.endInsertRows()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return TOKENS_FLAGS if index.column() == TOKENS_COLUMN else NAME_FLAGS
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if index.column() == TOKENS_COLUMN:
+            if role == Qt.DisplayRole:
+                return format_token_count(node.tokens)
+            if role == Qt.TextAlignmentRole:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            if role == Qt.ToolTipRole:
+                return f"~{node.tokens:,} tokens, {node.checked_tokens:,} selected"
+            return None
+
+        if role == Qt.CheckStateRole:
+            return QT_CHECK_STATES[node.state]
+        if role == Qt.FontRole:
+            return self.highlight_font if node in self._highlighted else None
+
+        if node.children is None:
+            icon = self.file_icon
+        elif node in self._expanded:
+            icon = self.expanded_folder_icon
+        else:
+            icon = self.folder_icon
+        if role == Qt.DisplayRole:
+            return node.name if isinstance(icon, QIcon) else f"{icon} {node.name}"
+        if role == Qt.DecorationRole and isinstance(icon, QIcon):
+            return icon
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        if index.column() != NAME_COLUMN:
+            return False
+        self.set_check_state(index.internalPointer(), _to_state(value))
+        return True
+
+    def sort(self, column=0, order=Qt.AscendingOrder):
+        """Sort folders before files, each by name, keeping expanded rows expanded."""
+        self.sort_folders(None)
+
+    def sort_folders(self, folders):
+        """Sort only the children of the given folder nodes (all folders if None)."""
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        nodes = [self.node_from_index(index) for index in old_indexes]
+        self.trie.sort(folders=folders)
+        self.changePersistentIndexList(
+            old_indexes,
+            [
+                self.index_for_node(node, index.column())
+                for node, index in zip(nodes, old_indexes)
+            ],
+        )
+        self.layoutChanged.emit()
+
+    # Tree contents
+
+    def set_files(self, files, state=UNCHECKED, checked=()):
+        """Replace the tree with the given (relative path, token estimate) pairs.
+
+        Files whose path is in checked start out checked, the rest get state.
+        """
+        self.beginResetModel()
+        self.trie = PathTrie()
+        self._expanded.clear()
+        self._highlighted.clear()
+        for path, tokens in files:
+            self.trie.insert(path, CHECKED if path in checked else state, tokens=tokens)
+        # Top-level rows are always shown, so expose them without waiting for a fetch
+        self.trie.root.fetched = len(self.trie.root.children)
+        self.endResetModel()
+        self.selection_changed.emit()
+
+    def add_files(self, files, state=UNCHECKED, checked=(), keep_sorted=False):
+        """Insert (path, tokens) pairs into the live tree, notifying views only about fetched folders.
+
+        With keep_sorted the folders that gained children are re-sorted;
+        otherwise new rows are appended until the next sort().
+        """
+        grown = {}
+        new_files = [
+            self.trie.insert(path, CHECKED if path in checked else state, grown, tokens)
+            for path, tokens in files
+        ]
+        if not new_files:
+            return
+
+        for folder, old_count in grown.items():
+            # Unfetched folders pick up their new children lazily in fetchMore
+            if folder is not self.trie.root and folder.fetched == 0:
+                continue
+            if folder.fetched != old_count:
+                continue
+            self.beginInsertRows(
+                self.index_for_node(folder), old_count, len(folder.children) - 1
+            )
+            folder.fetched = len(folder.children)
+            self.endInsertRows()
+
+        # New files change the counters, and possibly the state, of every folder above them
+        affected = set()
+        for folder in grown:
+            while folder is not self.trie.root and folder not in affected:
+                affected.add(folder)
+                folder = folder.parent
+        self._emit_state_changed(affected)
+        self._emit_tokens_changed(affected)
+        if keep_sorted:
+            self.sort_folders(grown)
+        self.selection_changed.emit()
+
+    def remove_files(self, paths):
+        """Remove files by relative path, dropping folders they leave empty, row ranges at a time."""
+        removed = self.trie.remove(paths)
+        if not removed:
+            return
+
+        def depth(node):
+            count = 0
+            while node.parent is not None:
+                count, node = count + 1, node.parent
+            return count
+
+        # Deepest folders first, so a folder's rows are settled before it is removed itself
+        for folder in sorted(removed, key=depth, reverse=True):
+            rows = sorted((child.row for child in removed[folder]), reverse=True)
+            i = 0
+            while i < len(rows):
+                # Peel off the highest contiguous run of rows
+                last = first = rows[i]
+                i += 1
+                while i < len(rows) and rows[i] == first - 1:
+                    first = rows[i]
+                    i += 1
+                shown = min(last, folder.fetched - 1)
+                if first <= shown:
+                    self.beginRemoveRows(self.index_for_node(folder), first, shown)
+                del folder.children[first : last + 1]
+                folder.fetched -= max(0, shown - first + 1)
+                for row in range(first, len(folder.children)):
+                    folder.children[row].row = row
+                if first <= shown:
+                    self.endRemoveRows()
+            self._expanded.difference_update(removed[folder])
+            self._highlighted.difference_update(removed[folder])
+
+        # Surviving folders above the removed files have new counters
+        affected = set()
+        for folder in removed:
+            while folder.parent is not None and folder.total and folder not in affected:
+                affected.add(folder)
+                folder = folder.parent
+        self._emit_state_changed(affected)
+        self._emit_tokens_changed(affected)
+        self.selection_changed.emit()
+
+    def set_token_counts(self, token_counts):
+        """Replace size-based estimates with real counts, given {relative path: tokens}."""
+        affected = set()
+        for path, tokens in token_counts.items():
+            node = self.trie.find(path)
+            if node is None or node.children is not None or node.tokens == tokens:
+                continue
+            self.trie.set_tokens(node, tokens)
+            while node is not self.trie.root and node not in affected:
+                affected.add(node)
+                node = node.parent
+        self._emit_tokens_changed(affected)
+        self.selection_changed.emit()
+
+    def set_expanded(self, index, expanded):
+        """Track folder expansion so the folder icon can follow it."""
+        node = self.node_from_index(index)
+        if expanded:
+            self._expanded.add(node)
+        else:
+            self._expanded.discard(node)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.DecorationRole])
+
+    def set_highlighted(self, nodes):
+        """Show exactly the given file nodes in bold."""
+        nodes = set(nodes)
+        changed = self._highlighted.symmetric_difference(nodes)
+        self._highlighted = nodes
+        self._emit_rows_changed(changed, NAME_COLUMN, Qt.FontRole)
+
+    # Check states
+
+    @profiled("check")
+    def set_check_state(self, node, state):
+        """Check or uncheck a node with its whole subtree and update its ancestors."""
+        count(files=node.total)
+        changed_ancestors = self.trie.set_state(node, state)
+        index = self.index_for_node(node)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        self._emit_subtree_changed(node)
+        self._emit_state_changed(changed_ancestors)
+        self.selection_changed.emit()
+
+    @profiled("check")
+    def set_all_checked(self, checked):
+        """Check or uncheck every node in the tree."""
+        count(files=self.trie.root.total)
+        self.trie.set_state(self.trie.root, CHECKED if checked else UNCHECKED)
+        self._emit_subtree_changed(self.trie.root)
+        self.selection_changed.emit()
+
+    def _emit_subtree_changed(self, node):
+        """Emit dataChanged for the check state of every fetched row below node."""
+        stack = [node]
+        while stack:
+            folder = stack.pop()
+            if not folder.fetched:
+                continue
+            first = self.createIndex(0, 0, folder.children[0])
+            last = self.createIndex(
+                folder.fetched - 1, 0, folder.children[folder.fetched - 1]
+            )
+            self.dataChanged.emit(first, last, [Qt.CheckStateRole])
+            stack.extend(c for c in folder.children if c.children is not None)
+
+    def _emit_state_changed(self, nodes):
+        self._emit_rows_changed(nodes, NAME_COLUMN, Qt.CheckStateRole)
+
+    def _emit_tokens_changed(self, nodes):
+        self._emit_rows_changed(nodes, TOKENS_COLUMN, Qt.DisplayRole)
+
+    def _emit_rows_changed(self, nodes, column, role):
+        for node in nodes:
+            if node.parent.fetched > node.row:  # Only rows a view has been shown
+                index = self.index_for_node(node, column)
+                self.dataChanged.emit(index, index, [role])
+
+    def root_state(self):
+        """Return the combined state of the whole tree from the root counters."""
+        root = self.trie.root
+        return root.state if root.total else CHECKED
+
+    def checked_files(self):
+        """Return the relative paths of all checked files."""
+        return [node.path() for node in self.trie.iter_checked_files()]
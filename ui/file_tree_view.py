@@ -1,27 +1,27 @@
-from PySide6.QtWidgets import QTreeWidget, QTreeWidgetItem
+from PySide6.QtWidgets import QHeaderView, QTreeView
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Qt
-from pathlib import Path
+from ui.file_tree_model import NAME_COLUMN, TOKENS_COLUMN, FileTreeModel
+from utils.file_filter import FileFilter
+from utils.path_search import PathSearch
+from utils.path_trie import CHECKED, UNCHECKED
+from utils.profiling import count, profiled
+from utils.tokens import estimate_tokens_for_size
+from utils.watcher import parent_folders
+from utils.workspace import full_path
 import os
+import subprocess
+import sys
 
 
-class CheckableTreeWidgetItem(QTreeWidgetItem):
-    def __init__(self, texts, parent=None):
-        super().__init__(parent)
-        self.setText(0, texts[0])  # Set text for the first column
-        self.setFlags(self.flags() | Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-        self.setCheckState(0, Qt.Unchecked)
-        for i, text in enumerate(texts[1:], start=1):
-            self.setText(i, text)
-
-
-class FileTreeView(QTreeWidget):
-    def __init__(self, python_files, extension, selected_files):
+class FileTreeView(QTreeView):
+    def __init__(self, file_index, filter_text, selected_files):
         super().__init__()
         self.setHeaderHidden(True)
-        self.python_files = python_files
-        self.extension = extension
-        self.selected_files = selected_files
+        self.setUniformRowHeights(True)  # Lets the view skip measuring every row
+        self.file_index = file_index
+        self.file_filter = FileFilter(filter_text)
+        self.selected_files = selected_files  # Relative paths to check as they appear
+        self.path_search = None  # Built on the first search after the files change
 
         # Load icons or fall back to emojis
         self.folder_icon = self._load_icon("resources/folder_icon.png") or "📁"
@@ -30,190 +30,219 @@ class FileTreeView(QTreeWidget):
         )
         self.file_icon = self._load_icon("resources/file_icon.png") or "📄"
 
+        self.tree_model = FileTreeModel(
+            (self.folder_icon, self.expanded_folder_icon, self.file_icon), self
+        )
+        self.setModel(self.tree_model)
+
+        # Token estimates sit in a narrow right-hand column
+        header = self.header()
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(NAME_COLUMN, QHeaderView.Stretch)
+        header.setSectionResizeMode(TOKENS_COLUMN, QHeaderView.Fixed)
+        header.resizeSection(TOKENS_COLUMN, 60)
+
         # Connect signals
-        self.itemExpanded.connect(self.handle_item_expanded)
-        self.itemCollapsed.connect(self.handle_item_collapsed)
-        self.itemDoubleClicked.connect(self.handle_item_double_clicked)
+        self.expanded.connect(self.handle_item_expanded)
+        self.collapsed.connect(self.handle_item_collapsed)
+        self.doubleClicked.connect(self.handle_item_double_clicked)
 
         self.populate_tree()
-        self.expandAll()
 
     def _load_icon(self, path):
         return QIcon(path) if os.path.exists(path) else None
 
-    def update_extension(self, extension):
-        """Update the file extension filter and repopulate the tree."""
-        self.extension = extension
-        self.populate_tree()
-        self.expandAll()
+    @profiled("filter")
+    def update_filter(self, filter_text):
+        """Switch to a new filter, hiding and showing rows rather than rebuilding the tree.
+
+        Raises ValueError for a filter that doesn't parse and leaves the tree as it was.
+        """
+        file_filter = FileFilter(filter_text)
+        self.file_filter = file_filter
+        self.path_search = None
+        wanted = {e.path: e for e in file_filter.select(self.file_index)}
+        shown = {node.path(): node for node in self.tree_model.trie.iter_files()}
+
+        # Hidden files keep their check state for when a later filter shows them again
+        hidden = []
+        for path, node in shown.items():
+            if node.checked:
+                self.selected_files.add(path)
+            else:
+                self.selected_files.discard(path)
+            if path not in wanted:
+                hidden.append(path)
+        new_files = [
+            (path, estimate_tokens_for_size(e.size))
+            for path, e in wanted.items()
+            if path not in shown
+        ]
+
+        if len(hidden) + len(new_files) > len(wanted):
+            # Mostly different files: one reset is cheaper than many row changes
+            self.populate_tree()
+            return
+        self.tree_model.remove_files(hidden)
+        self.tree_model.add_files(
+            new_files, UNCHECKED, self.selected_files, keep_sorted=True
+        )
 
+    @profiled("tree build")
     def populate_tree(self):
-        """Populate the tree widget with files matching the selected extension."""
-        self.clear()
-        path_map = {}
-
-        for file_path in self.python_files:
-            if file_path.suffix == self.extension:
-                self._add_file_to_tree(file_path, path_map)
-
-    def _add_file_to_tree(self, file_path, path_map):
-        parts = file_path.parts
-        current_path = Path(parts[0])
-        parent_item = self._create_or_get_parent_item(
-            parts[:-1], current_path, path_map
+        """Populate the tree with the files passing the current filter."""
+        self.path_search = None
+        # Suffix terms are lookups in the index buckets rather than a filter
+        self.tree_model.set_files(
+            (
+                (entry.path, estimate_tokens_for_size(entry.size))
+                for entry in self.file_filter.select(self.file_index)
+            ),
+            checked=self.selected_files,
         )
-
-        file_item = CheckableTreeWidgetItem([parts[-1]], parent_item)
-        if isinstance(self.file_icon, QIcon):
-            file_item.setIcon(0, self.file_icon)
-        else:
-            file_item.setText(0, f"{self.file_icon} {parts[-1]}")
-
-        (
-            parent_item.addChild(file_item)
-            if parent_item
-            else self.addTopLevelItem(file_item)
+        count(files=self.tree_model.trie.root.total)
+        self.sort_tree()
+        self.expand_top_level()
+
+    @profiled("tree add")
+    def add_files(self, entries, checked=False):
+        """Insert newly scanned files passing the current filter into the existing tree."""
+        self.path_search = None
+        top_level_rows = self.tree_model.rowCount()
+        files_before = self.tree_model.trie.root.total
+        self.tree_model.add_files(
+            [
+                (e.path, estimate_tokens_for_size(e.size))
+                for e in entries
+                if self.file_filter.matches(e.path)
+            ],
+            CHECKED if checked else UNCHECKED,
+            self.selected_files,
         )
-
-    def _create_or_get_parent_item(self, parts, current_path, path_map):
-        parent_item = None
-        for part in parts:
-            if current_path not in path_map:
-                parent_item = self._create_folder_item(part, parent_item)
-                path_map[current_path] = parent_item
+        count(files=self.tree_model.trie.root.total - files_before)
+        self.expand_top_level(start=top_level_rows)
+
+    def apply_changes(self, added, removed, checked=False):
+        """Patch the tree with files found new, modified or removed on disk."""
+        self.path_search = None
+        self.tree_model.remove_files(
+            [path for path in removed if self.file_filter.matches(path)]
+        )
+        new_files, token_counts = [], {}
+        for e in added:
+            if not self.file_filter.matches(e.path):
+                continue
+            tokens = estimate_tokens_for_size(e.size)
+            if self.tree_model.trie.find(e.path) is None:
+                new_files.append((e.path, tokens))
             else:
-                parent_item = path_map[current_path]
-            current_path = current_path / part
-        return parent_item
-
-    def _create_folder_item(self, part, parent_item):
-        folder_item = CheckableTreeWidgetItem([part], parent_item)
-        if isinstance(self.folder_icon, QIcon):
-            folder_item.setIcon(0, self.folder_icon)
-        else:
-            folder_item.setText(0, f"{self.folder_icon} {part}")
-
-        (
-            parent_item.addChild(folder_item)
-            if parent_item
-            else self.addTopLevelItem(folder_item)
+                token_counts[e.path] = tokens  # Modified: refresh the estimate
+        self.tree_model.add_files(
+            new_files,
+            CHECKED if checked else UNCHECKED,
+            self.selected_files,
+            keep_sorted=True,
         )
-        return folder_item
+        if token_counts:
+            self.tree_model.set_token_counts(token_counts)
+
+    @profiled("search")
+    def search(self, query):
+        """Open the folders holding the files matching query and show those files in bold.
+
+        Returns (number of matches shown, whether that is all of them); an
+        empty query goes back to showing the top-level folders.
+        """
+        self.collapseAll()
+        if not query.strip():
+            self.tree_model.set_highlighted(())
+            self.expand_top_level()
+            return 0, True
+        if self.path_search is None:
+            self.path_search = PathSearch(
+                e.path for e in self.file_filter.select(self.file_index)
+            )
+        matches, complete = self.path_search.search(query)
+
+        # Expose the rows first, while nearly everything is collapsed and cheap to update
+        trie = self.tree_model.trie
+        folders = [
+            self._fetched_index(trie.find(folder))
+            for folder in sorted(parent_folders(matches) - {""})
+        ]
+        nodes = [node for node in map(trie.find, matches) if node is not None]
+        files = [self._fetched_index(node) for node in nodes]
+
+        # Only the matches' ancestors are opened. With a layout pending, expand()
+        # just records the folder instead of laying out the tree again each time
+        self.scheduleDelayedItemsLayout()
+        for index in folders:
+            if index is not None:
+                self.expand(index)
+
+        # Bold rows cost nothing to show, where selecting every match is slow
+        self.tree_model.set_highlighted(nodes)
+        if files:
+            self.setCurrentIndex(files[0])
+            self.scrollTo(files[0])
+        return len(matches), complete
+
+    def _fetched_index(self, node):
+        """Return the model index of a trie node, exposing its row in the parent first."""
+        if node is None:
+            return None
+        parent = self.tree_model.index_for_node(node.parent)
+        if self.tree_model.canFetchMore(parent):
+            self.tree_model.fetchMore(parent)
+        return self.tree_model.index_for_node(node)
+
+    @profiled("tree sort")
+    def sort_tree(self):
+        """Sort folders before files, each alphabetically."""
+        self.tree_model.sort()
+
+    def expand_top_level(self, start=0):
+        """Expand the top-level folders; deeper folders are fetched when the user opens them."""
+        for row in range(start, self.tree_model.rowCount()):
+            self.expand(self.tree_model.index(row, 0))
+
+    def set_all_checked(self, checked):
+        """Check or uncheck every file and folder."""
+        self.tree_model.set_all_checked(checked)
+
+    def selected_tokens(self):
+        """Return the estimated token count of the checked files."""
+        return self.tree_model.trie.root.checked_tokens
+
+    def get_selected_paths(self):
+        """Return the checked files as paths relative to the scan root."""
+        return self.tree_model.checked_files()
 
     def are_all_items_checked(self):
         """Check if all items in the tree are checked."""
-        root = self.invisibleRootItem()
-        return self._are_all_children_checked(root)
-
-    def _are_all_children_checked(self, item):
-        """Recursively check if all children of an item are checked."""
-        for i in range(item.childCount()):
-            child = item.child(i)
-            if child.checkState(0) != Qt.Checked:
-                return False
-            if not self._are_all_children_checked(child):
-                return False
-        return True
+        root = self.tree_model.trie.root
+        return root.checked == root.total
 
     def are_all_items_unchecked(self):
         """Check if all items in the tree are unchecked."""
-        root = self.invisibleRootItem()
-        return self._are_all_children_unchecked(root)
-
-    def _are_all_children_unchecked(self, item):
-        """Recursively check if all children of an item are unchecked."""
-        for i in range(item.childCount()):
-            child = item.child(i)
-            if child.checkState(0) != Qt.Unchecked:
-                return False
-            if not self._are_all_children_unchecked(child):
-                return False
-        return True
-
-    def handle_item_expanded(self, item):
+        return self.tree_model.trie.root.checked == 0
+
+    def handle_item_expanded(self, index):
         """Handle the folder being expanded to toggle the icon."""
-        if item.childCount() > 0:  # It's a folder
-            if isinstance(self.expanded_folder_icon, QIcon):
-                item.setIcon(0, self.expanded_folder_icon)
-            else:
-                item.setText(
-                    0, f"📂 {item.text(0)[2:]}"
-                )  # Replace the first two chars (emoji + space)
+        self.tree_model.set_expanded(index, True)
 
-    def handle_item_collapsed(self, item):
+    def handle_item_collapsed(self, index):
         """Handle the folder being collapsed to toggle the icon."""
-        if item.childCount() > 0:  # It's a folder
-            if isinstance(self.folder_icon, QIcon):
-                item.setIcon(0, self.folder_icon)
-            else:
-                item.setText(
-                    0, f"📁 {item.text(0)[2:]}"
-                )  # Replace the first two chars (emoji + space)
-
-    def select_folder_children(self, item):
-        """Select or deselect all children when a folder is selected or deselected."""
-        select = item.checkState(0) == Qt.Checked
-        self.blockSignals(True)  # Block signals to prevent recursion
-        self._select_all_recursive(item, select)
-        self.blockSignals(False)  # Unblock signals after update
-
-    def _select_all_recursive(self, item, select):
-        """Recursively select or deselect all children of an item."""
-        for i in range(item.childCount()):
-            child = item.child(i)
-            child.setCheckState(0, Qt.Checked if select else Qt.Unchecked)
-            self._select_all_recursive(child, select)
-
-    def update_parent_check_state(self, item):
-        """Recursively update the state of parent items based on the state of their children."""
-        parent = item.parent()
-        if parent is None:
-            return
+        self.tree_model.set_expanded(index, False)
 
-        all_checked = True
-        all_unchecked = True
-
-        for i in range(parent.childCount()):
-            child = parent.child(i)
-            if child.checkState(0) != Qt.Checked:
-                all_checked = False
-            if child.checkState(0) != Qt.Unchecked:
-                all_unchecked = False
-
-        self.blockSignals(True)  # Block signals to prevent recursion
-        if all_checked:
-            parent.setCheckState(0, Qt.Checked)
-        elif all_unchecked:
-            parent.setCheckState(0, Qt.Unchecked)
-        else:
-            parent.setCheckState(0, Qt.PartiallyChecked)
-        self.blockSignals(False)  # Unblock signals after update
-
-        # Recursively update the parent's state
-        self.update_parent_check_state(parent)
-
-    def on_item_changed(self, item):
-        """Handle item state change and update parent and children."""
-        if item.childCount() > 0:
-            # Update all children based on the folder's state (checked or unchecked)
-            self.select_folder_children(item)
-        self.update_parent_check_state(item)
-
-    def handle_item_double_clicked(self, item, column):
+    def handle_item_double_clicked(self, index):
         """Open the file in the default editor when double-clicked."""
-        if item.childCount() == 0:  # Only open if it's a file (no children)
-            file_path = self._get_full_path(item)
+        node = self.tree_model.node_from_index(index)
+        if not node.is_folder:  # Only open if it's a file
+            file_path = full_path(self.file_index.root, node.path())
             if os.path.isfile(file_path):
                 self.open_file_in_default_editor(file_path)
 
-    def _get_full_path(self, item):
-        """Reconstruct the full file path from the tree hierarchy."""
-        parts = []
-        while item is not None:
-            parts.append(item.text(0).split(" ", 1)[-1])  # Strip out emoji if present
-            item = item.parent()
-        return os.path.join(*reversed(parts))
-
     def open_file_in_default_editor(self, file_path):
         """Open the specified file in the default system editor."""
         try:
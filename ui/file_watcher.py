@@ -0,0 +1,110 @@
+import os
+import time
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+from utils.watcher import (
+    DEBOUNCE_DELAY,
+    MAX_DEBOUNCE_DELAY,
+    POLL_INTERVAL,
+    FolderPoller,
+)
+from utils.workspace import full_path
+
+
+class FileWatcher(QObject):
+    """Watches project folders and reports the changed ones in debounced batches.
+
+    Folders are watched natively (inotify, FSEvents, ReadDirectoryChangesW)
+    through QFileSystemWatcher; the ones it refuses, e.g. past the inotify
+    watch limit, are polled by mtime instead. A burst of changes such as a
+    git checkout is delivered as one folders_changed signal once it settles.
+    """
+
+    # Relative "/"-separated folders whose entries changed
+    folders_changed = Signal(set)
+
+    def __init__(self, root=".", parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.poller = FolderPoller(root)
+        self._watched = {}  # absolute path -> relative folder
+        self._dirty = set()
+        self._first_change = None
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.flush)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(int(POLL_INTERVAL * 1000))
+        self.poll_timer.timeout.connect(self.poll)
+
+    def _path(self, folder):
+        # normpath so the root folder "" isn't registered with a trailing separator
+        return os.path.normpath(full_path(self.root, folder))
+
+    def start(self, root, folders):
+        """Forget what was watched before and watch the given folders of root."""
+        self.stop()
+        self.root = self.poller.root = root
+        self.watch(folders)
+
+    def watch(self, folders):
+        """Start watching relative folders, falling back to polling where needed."""
+        paths = {self._path(folder): folder for folder in folders}
+        paths = {path: f for path, f in paths.items() if path not in self._watched}
+        if not paths:
+            return
+        self._watched.update(paths)
+        failed = self.watcher.addPaths(list(paths))
+        if failed:
+            self.poller.track(paths[path] for path in failed)
+            if not self.poll_timer.isActive():
+                self.poll_timer.start()
+
+    def unwatch(self, folders):
+        """Stop watching relative folders, e.g. because they were deleted."""
+        paths = [self._path(folder) for folder in folders]
+        paths = [path for path in paths if self._watched.pop(path, None) is not None]
+        if paths:
+            self.watcher.removePaths(paths)
+        self.poller.untrack(folders)
+
+    def stop(self):
+        """Stop watching everything and drop pending changes."""
+        self.debounce_timer.stop()
+        self.poll_timer.stop()
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.poller.untrack(list(self.poller.mtimes))
+        self._watched.clear()
+        self._dirty.clear()
+        self._first_change = None
+
+    def on_directory_changed(self, path):
+        folder = self._watched.get(path)
+        if folder is not None:
+            self.mark_dirty([folder])
+
+    def poll(self):
+        self.mark_dirty(self.poller.poll())
+
+    def mark_dirty(self, folders):
+        """Queue folders for the next batch; the batch goes out after DEBOUNCE_DELAY of quiet."""
+        if not folders:
+            return
+        self._dirty.update(folders)
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        # Keep pushing the batch back while changes arrive, but not forever
+        delay = min(DEBOUNCE_DELAY, MAX_DEBOUNCE_DELAY - (now - self._first_change))
+        self.debounce_timer.start(max(0, int(delay * 1000)))
+
+    def flush(self):
+        dirty, self._dirty = self._dirty, set()
+        self._first_change = None
+        if dirty:
+            self.folders_changed.emit(dirty)
@@ -0,0 +1,105 @@
+import sys
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (
+    QDockWidget,
+    QFileDialog,
+    QHBoxLayout,
+    QPushButton,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+from utils.profiling import active_profiler, disable, enable
+
+# How often the table is refreshed while the panel is open
+REFRESH_INTERVAL = 1.0
+
+
+class ProfilePanel(QDockWidget):
+    """Debug panel with the calls, time and counts of each instrumented stage.
+
+    Opening it starts recording if no trace is being recorded already, and
+    closing it stops again, so the spans cost nothing while it is hidden.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__("Timings", parent)
+        self.profiler = None
+        self.owns_profiler = False
+
+        self.table = QTreeWidget()
+        self.table.setRootIsDecorated(False)
+        self.table.setHeaderLabels(["Stage", "Calls", "Total ms", "Max ms", "Counts"])
+
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        save_button = QPushButton("Save Trace…")
+        save_button.clicked.connect(self.save_trace)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(reset_button)
+        button_layout.addWidget(save_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addLayout(button_layout)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(REFRESH_INTERVAL * 1000))
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        active = active_profiler()
+        self.owns_profiler = active is None
+        self.profiler = active or enable(self.profiler)  # Keeps earlier totals
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        if self.owns_profiler and active_profiler() is self.profiler:
+            disable()
+        super().hideEvent(event)
+
+    def refresh(self):
+        """Show the latest totals."""
+        if self.profiler is None:
+            return
+        self.table.clear()
+        for name, calls, seconds, longest, counts in self.profiler.summary():
+            counted = ", ".join(f"{key} {value:,}" for key, value in counts.items())
+            self.table.addTopLevelItem(
+                QTreeWidgetItem(
+                    [
+                        name,
+                        f"{calls:,}",
+                        f"{seconds * 1000:.1f}",
+                        f"{longest * 1000:.1f}",
+                        counted,
+                    ]
+                )
+            )
+
+    def reset(self):
+        if self.profiler is not None:
+            self.profiler.reset()
+        self.refresh()
+
+    def save_trace(self):
+        """Write the recorded spans to a JSON trace file chosen by the user."""
+        if self.profiler is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Trace", "trace.json", "Trace files (*.json)"
+        )
+        if not path:
+            return
+        try:
+            self.profiler.write_trace(path)
+        except OSError as e:
+            print(f"Failed to write the trace: {e}", file=sys.stderr)
@@ -0,0 +1,30 @@
+from PySide6.QtCore import QThread, Signal
+from utils.scan_cache import open_scan_cache
+from utils.scanner import scan_workspace
+
+
+class ScanWorker(QThread):
+    """Scans a project root or Workspace off the GUI thread, streaming batches of FileEntry records."""
+
+    files_found = Signal(list)
+    scan_finished = Signal(int)
+
+    def __init__(self, root=".", parent=None, use_cache=True):
+        super().__init__(parent)
+        self.root = root
+        self.use_cache = use_cache
+
+    def run(self):
+        # Emitting is thread-safe, so the roots of a Workspace can stream at once
+        index = scan_workspace(
+            self.root,
+            on_batch=self.files_found.emit,
+            should_stop=self.isInterruptionRequested,
+            open_cache=open_scan_cache if self.use_cache else None,
+        )
+        if not self.isInterruptionRequested():
+            self.scan_finished.emit(len(index))
+
+    def cancel(self):
+        """Ask the scan to stop; batches already queued are ignored by the receiver."""
+        self.requestInterruption()
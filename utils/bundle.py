@@ -0,0 +1,200 @@
+import codecs
+import io
+import os
+from collections import namedtuple
+from utils.file_reader import DEFAULT_READ_WORKERS, MappedText, read_files
+from utils.profiling import count
+from utils.tokens import content_hash
+from utils.workspace import full_path
+
+FILE_SEPARATOR = "\n\n"
+
+# Upper bound, in characters, of what Submit puts on the clipboard
+CLIPBOARD_MAX_SIZE = 20_000_000
+
+BundleStats = namedtuple("BundleStats", "files size truncated errors duplicates saved")
+
+
+def content_key(content):
+    """The BLAKE2b digest of a file's contents, for spotting duplicates.
+
+    A file is only replaced by a reference when its key matches, so this
+    has to be a real digest rather than a fingerprint that may collide.
+    Memory-mapped files carry the digest taken when they were mapped, which
+    equals that of the same text read as a string.
+    """
+    if isinstance(content, MappedText):
+        return content.digest
+    return content_hash(content)
+
+
+def duplicate_header(path, first):
+    """The header standing in for a file whose contents already appeared as first."""
+    return f"# {path} (same as {first})"
+
+
+def iter_bundle(
+    paths,
+    root=".",
+    max_size=None,
+    stats=None,
+    workers=DEFAULT_READ_WORKERS,
+    cache=None,
+    mapped=False,
+    dedupe=True,
+):
+    """Yield the bundle for the given relative paths one chunk at a time.
+
+    Files are read concurrently but emitted in order, with only a bounded
+    window of them in memory. With max_size (in characters) the output stops
+    once the cap is reached and no file is read further than the cap. If stats
+    is a dict it is updated with "files", "size", "truncated" and "errors"
+    (a list of (path, reason) pairs for skipped files) as the bundle is produced.
+    A ContentCache lets repeated bundles skip files that have not changed.
+    With dedupe, a file whose contents already appeared is only referenced
+    by a "(same as ...)" header; stats then also gets "duplicates" and
+    "saved", the number of characters this spared. With mapped, files of
+    MMAP_THRESHOLD bytes or more are memory-mapped and come through as UTF-8
+    bytes-like blocks instead of str, for sinks that take bytes (see
+    write_bundle).
+    """
+    paths = list(paths)
+    stats = {} if stats is None else stats
+    stats.update(files=0, size=0, truncated=False, errors=[], duplicates=0, saved=0)
+    first_copies = {}  # content_key() -> path of the first file with those contents
+
+    results = read_files(
+        (full_path(root, path) for path in paths),
+        workers,
+        max_chars=max_size,
+        cache=cache,
+        strip=True,
+        mapped=mapped,
+    )
+    try:
+        for path, result in zip(paths, results):
+            if result.error is not None:
+                stats["errors"].append((path, result.error))
+                continue
+
+            separator = FILE_SEPARATOR if stats["files"] else ""
+            remaining = None if max_size is None else max_size - stats["size"]
+            if remaining is not None and remaining <= len(separator):
+                stats["truncated"] = True
+                return
+
+            # Header and contents go out separately rather than being joined
+            # into one more copy of the file
+            header = f"{separator}# {path}\n"
+            content = result.content
+
+            # A partial read can't be told apart from a shorter file
+            whole = remaining is None or len(result.content) <= remaining
+            key = content_key(content) if dedupe and whole and content else None
+            first = first_copies.get(key)
+            if first is not None:
+                reference = separator + duplicate_header(path, first)
+                if len(reference) < len(header) + len(content):
+                    stats["duplicates"] += 1
+                    stats["saved"] += len(header) + len(content) - len(reference)
+                    if isinstance(content, MappedText):
+                        content.close()
+                    header, content = reference, ""
+            size = len(header) + len(content)
+            if remaining is not None and (
+                size > remaining or len(result.content) > remaining
+            ):
+                size = min(size, remaining)
+                stats["truncated"] = True
+            stats["files"] += 1
+            stats["size"] += size
+            if key is not None and first is None and not stats["truncated"]:
+                first_copies[key] = path
+
+            yield header[:size]
+            left = size - len(header)
+            if isinstance(content, MappedText):
+                try:
+                    if left > 0:
+                        yield from content.blocks(left)
+                finally:
+                    content.close()
+            elif left > 0:
+                yield content[:left]
+            if stats["truncated"]:
+                return
+    finally:
+        results.close()  # Cancel reads still queued
+        count(files=stats["files"], chars=stats["size"])
+
+
+def limit_chunks(chunks, max_size, stats):
+    """Pass chunks through until stats["size"] passes max_size characters, cutting the last one short.
+
+    The chunks generator counts what it yields into stats["size"]; it is closed
+    when the limit is reached.
+    """
+    stats["truncated"] = False
+    try:
+        for chunk in chunks:
+            if max_size is not None and stats["size"] > max_size:
+                stats["truncated"] = True
+                yield chunk[: len(chunk) - (stats["size"] - max_size)]
+                stats["size"] = max_size
+                return
+            yield chunk
+    finally:
+        chunks.close()
+        count(files=stats["files"], chars=stats["size"])
+
+
+def _byte_sink(out):
+    """Return the binary buffer under a UTF-8 text sink, or None if bytes can't go straight to it."""
+    buffer = getattr(out, "buffer", None)
+    if buffer is None or os.linesep != "\n":
+        return None  # Writing bytes would skip newline translation
+    try:
+        return buffer if codecs.lookup(out.encoding).name == "utf-8" else None
+    except (LookupError, TypeError):
+        return None
+
+
+def write_bundle(paths, out, root=".", max_size=None, cache=None, dedupe=True):
+    """Stream the bundle into a writable text sink (open file, sys.stdout, io.StringIO).
+
+    Large files are written to UTF-8 files and stdout straight from a memory
+    map, without being decoded into strings.
+    """
+    stats = {}
+    sink = _byte_sink(out)
+    chunks = iter_bundle(
+        paths,
+        root,
+        max_size,
+        stats,
+        cache=cache,
+        mapped=sink is not None,
+        dedupe=dedupe,
+    )
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            out.write(chunk)
+        else:
+            out.flush()  # Keep the text written so far ahead of the bytes
+            sink.write(chunk)
+    return BundleStats(**stats)
+
+
+def write_bundle_file(
+    paths, file_path, root=".", max_size=None, cache=None, dedupe=True
+):
+    """Write the bundle to file_path without building it in memory."""
+    with open(file_path, "w", encoding="utf-8") as out:
+        return write_bundle(paths, out, root, max_size, cache, dedupe)
+
+
+def build_bundle(paths, root=".", max_size=None, cache=None, dedupe=True):
+    """Return the bundle as one string along with its BundleStats."""
+    buffer = io.StringIO()
+    stats = write_bundle(paths, buffer, root, max_size, cache, dedupe)
+    return buffer.getvalue(), stats
@@ -0,0 +1,349 @@
+"""Local bundle server: keeps a project's index and file contents warm between requests.
+
+GET /bundle streams a bundle (chunked) for the files chosen by the query:
+ext, glob and path (all repeatable), filter as typed in the GUI, selection=1
+for the selection saved by the GUI, and max_size, budget and priority as on
+the command line.
+GET /stats returns request counts, latency percentiles and cache statistics
+as JSON. The server only listens on localhost, and only answers requests
+that carry its token (printed at startup) in an "Authorization: Bearer"
+header or a token parameter and name it as 127.0.0.1 or localhost in their
+Host header, so web pages can't read the project through the browser,
+e.g. by DNS rebinding.
+"""
+
+import asyncio
+import json
+import secrets
+import sys
+import time
+import urllib.parse
+import urllib.request
+from collections import deque
+
+from utils.bundle import iter_bundle
+from utils.content_cache import ContentCache
+from utils.file_filter import FileFilter, select_paths
+from utils.file_helpers import load_app_state
+from utils.outline import Outliner
+from utils.scan_cache import open_scan_cache
+from utils.scanner import scan_workspace
+from utils.token_budget import PRIORITIES, iter_budget_bundle
+from utils.tokens import TokenCounter
+from utils.watcher import FolderPoller, project_folders, rescan_folders
+from utils.workspace import ignore_rules
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Folders are checked for added or removed files at most this often
+REFRESH_INTERVAL = 1.0
+
+# Bundle chunks are gathered off the event loop until this many characters
+# are ready, then written to the socket in one go
+WRITE_SIZE = 64 * 1024
+
+# Latencies of the most recent requests kept for the percentiles
+LATENCY_WINDOW = 10_000
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+# Names a request may use for the server in its Host header, before ":port",
+# which may be left out on port 80
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+class RequestError(Exception):
+    """A bad request, reported to the client with a 400 status."""
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _read_until(chunks, limit):
+    """Pull chunks from a bundle generator until about limit characters are ready."""
+    parts, size = [], 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return "".join(parts)
+
+
+class BundleServer:
+    """Serves bundles of one project or Workspace, reusing its index, content cache, token counts and outlines."""
+
+    def __init__(self, root=".", token=None):
+        self.root = root
+        self.token = token or secrets.token_urlsafe(16)
+        self.port = None  # Set once listening
+        self.index = None
+        self.ignore = None
+        self.content_cache = ContentCache()
+        self.token_counter = TokenCounter()
+        self.outliner = Outliner()
+        self.poller = FolderPoller(root)
+        self.known_folders = set()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._last_refresh = 0.0
+        self._lock = None  # asyncio.Lock, created on the server's event loop
+
+    # Index maintenance, run on worker threads
+
+    def load(self):
+        """Scan the project (through the scan cache) and start tracking its folders."""
+        self.index = scan_workspace(self.root, open_cache=open_scan_cache)
+        self.ignore = ignore_rules(self.root)
+        self.poller.untrack(list(self.poller.mtimes))
+        self.known_folders = project_folders(self.index)
+        self.poller.track(self.known_folders)
+
+    def refresh(self):
+        """Apply files added or removed since the last refresh; edits are caught by the content cache."""
+        changed = self.poller.poll()
+        if not changed:
+            return
+        changes = rescan_folders(self.index, changed, self.known_folders, self.ignore)
+        if changes.rescan:
+            self.load()
+            return
+        self.index.remove(changes.removed)
+        self.index.add(changes.added)
+        self.known_folders -= changes.gone_folders
+        self.known_folders |= changes.new_folders
+        self.poller.untrack(changes.gone_folders)
+        self.poller.track(changes.new_folders)
+
+    # Requests
+
+    async def select(self, query):
+        """Return the relative paths a /bundle query asks for."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if time.monotonic() - self._last_refresh >= REFRESH_INTERVAL:
+                await loop.run_in_executor(None, self.refresh)
+                self._last_refresh = time.monotonic()
+
+            file_filter = None
+            if "filter" in query:
+                try:
+                    file_filter = FileFilter(query["filter"][-1])
+                except ValueError as e:
+                    raise RequestError(f"bad filter: {e}")
+            selection = None
+            if query.get("selection", ["0"])[-1] not in ("0", ""):
+                # Through the state store the process shares, opened once
+                state = await loop.run_in_executor(None, load_app_state, self.root)
+                selection = state["selected_files"]
+            paths = select_paths(
+                self.index,
+                query.get("ext", ()),
+                query.get("glob", ()),
+                selection,
+                file_filter,
+            )
+        if "path" in query:
+            wanted = set(query["path"])
+            paths = [p for p in paths if p in wanted]
+        return paths
+
+    def bundle_chunks(self, query, paths):
+        """Return the chunk generator for a /bundle query."""
+        try:
+            max_size = int(query["max_size"][-1]) if "max_size" in query else None
+            budget = int(query["budget"][-1]) if "budget" in query else None
+        except ValueError as e:
+            raise RequestError(f"bad number: {e}")
+        priority = query.get("priority", ["order"])[-1]
+        if priority not in PRIORITIES:
+            raise RequestError(f"unknown priority {priority!r}")
+
+        if budget is not None:
+            return iter_budget_bundle(
+                paths,
+                self.root,
+                budget,
+                priority,
+                counter=self.token_counter,
+                outliner=self.outliner,
+                cache=self.content_cache,
+            )
+        return iter_bundle(paths, self.root, max_size, cache=self.content_cache)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "files": len(self.index) if self.index is not None else 0,
+            "latency_ms": {
+                name: round(percentile(latencies, fraction) * 1000, 3)
+                for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+            },
+            "content_cache": self.content_cache.stats(),
+        }
+
+    def authorized(self, headers, query):
+        """Return an error status for a request from the wrong Host or without the token, else None."""
+        allowed = {f"{host}:{self.port}" for host in LOCAL_HOSTS}
+        if self.port == 80:
+            allowed.update(LOCAL_HOSTS)
+        if headers.get("host", "").lower() not in allowed:
+            return 403
+        authorization = headers.get("authorization", "")
+        token = query.get("token", [""])[-1]
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer ") :].strip()
+        if not secrets.compare_digest(
+            token.encode("utf-8"), self.token.encode("utf-8")
+        ):
+            return 401
+        return None
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP/1.1 request on a connection, then close it."""
+        start = time.perf_counter()
+        streaming = False
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "GET":
+                await self._respond(writer, 405, "Only GET is supported\n")
+                return
+
+            url = urllib.parse.urlsplit(parts[1])
+            query = urllib.parse.parse_qs(url.query)
+            status = self.authorized(headers, query)
+            if status is not None:
+                self.errors += 1
+                await self._respond(writer, status, f"{_REASONS[status]}\n")
+                return
+            if url.path == "/stats":
+                body = json.dumps(self.stats(), indent=2) + "\n"
+                await self._respond(writer, 200, body, "application/json")
+                return
+            if url.path != "/bundle":
+                await self._respond(writer, 404, "Not found\n")
+                return
+
+            try:
+                paths = await self.select(query)
+                chunks = self.bundle_chunks(query, paths)
+            except RequestError as e:
+                await self._respond(writer, 400, f"{e}\n")
+                return
+            streaming = True
+            await self._stream(writer, chunks)
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.errors += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Failed to serve a request: {e!r}", file=sys.stderr)
+            if not streaming:
+                try:
+                    await self._respond(writer, 500, f"{_REASONS[500]}\n")
+                except ConnectionError:
+                    pass
+            # A stream cut off without its last chunk reads as incomplete
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, body, content_type="text/plain"):
+        data = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _stream(self, writer, chunks):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Files are read on a worker thread so other requests keep being served
+                text = await loop.run_in_executor(None, _read_until, chunks, WRITE_SIZE)
+                if not text:
+                    break
+                data = text.encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()  # Back-pressure from slow clients
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            chunks.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Load the project and serve until cancelled; ready() is called once listening."""
+        self._lock = asyncio.Lock()
+        await asyncio.get_running_loop().run_in_executor(None, self.load)
+        self._last_refresh = time.monotonic()
+        server = await asyncio.start_server(self.handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready(self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.outliner.close()
+
+
+def serve(root=".", host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """Run a BundleServer for root, a folder or a Workspace, until interrupted; token is random by default."""
+    server = BundleServer(root, token)
+
+    def ready(bound_port):
+        print(f"Serving bundles of {root} on http://{host}:{bound_port}/bundle")
+        print(f"Token: {server.token}")
+
+    try:
+        asyncio.run(server.serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+def fetch(endpoint="/bundle", port=DEFAULT_PORT, host=DEFAULT_HOST, token="", **params):
+    """Client for scripts: GET a path from a running server and return the text.
+
+    token is the one the server printed at startup. List values become
+    repeated parameters, e.g. fetch(ext=[".py", ".md"]).
+    """
+    query = urllib.parse.urlencode(params, doseq=True)
+    url = f"http://{host}:{port}{endpoint}" + (f"?{query}" if query else "")
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(request) as response:
+        return response.read().decode("utf-8")
@@ -0,0 +1,118 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from utils.file_reader import FileReadResult, read_text_file
+
+# Total size of the cached strings before the least recently used are evicted
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+
+class CacheEntry:
+    """Stripped contents of one file as of a (mtime, size) signature, plus derived data."""
+
+    __slots__ = ("signature", "content", "error", "nbytes", "derived")
+
+    def __init__(self, signature, content, error):
+        self.signature = signature
+        self.content = content
+        self.error = error
+        self.nbytes = sys.getsizeof(content) if content is not None else 0
+        self.derived = {}  # e.g. token counts, filled in by whoever computes them
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) for path; it changes whenever the file is written."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ContentCache:
+    """Thread-safe LRU cache of decoded, stripped file contents keyed by path and stat signature."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path, signature):
+        """Return the entry for path if it was cached with this signature, else None."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry.signature != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry
+
+    def put(self, path, entry):
+        """Store an entry, evicting the least recently used ones to stay under max_bytes."""
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._entries[path] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def entry(self, path):
+        """Return an up-to-date CacheEntry for path, reading the file only if it changed."""
+        try:
+            signature = file_signature(path)
+        except OSError as e:
+            return CacheEntry(None, None, str(e))
+
+        entry = self.get(path, signature)
+        if entry is None:
+            result = read_text_file(path, strip=True)
+            entry = CacheEntry(signature, result.content, result.error)
+            self.put(path, entry)
+        return entry
+
+    def read(self, path, max_chars=None):
+        """Drop-in for read_text_file that serves unchanged files from the cache."""
+        if max_chars is not None:
+            try:
+                if os.path.getsize(path) > 4 * (max_chars + 1):
+                    # Too big to read whole; stripped like the cached files
+                    return read_text_file(path, max_chars, strip=True)
+            except OSError as e:
+                return FileReadResult(path, None, str(e))
+
+        entry = self.entry(path)
+        content = entry.content
+        if content is not None and max_chars is not None:
+            content = content[: max_chars + 1]
+        return FileReadResult(path, content, entry.error)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current usage, for sizing max_bytes."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
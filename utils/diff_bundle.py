@@ -0,0 +1,230 @@
+"""Bundles of what changed: files edited since the last submit, or diffs against a git revision.
+
+Each submit is remembered as a hash of every file's stripped text together
+with the file's (mtime, size) signature. Files whose signature still
+matches are not read at all, and a file that was only touched (a new
+signature with the same hash) is not reported as changed.
+"""
+
+import difflib
+import hashlib
+import os
+from collections import namedtuple
+
+from utils.bundle import FILE_SEPARATOR, limit_chunks
+from utils.content_cache import ContentCache, file_signature
+from utils.file_reader import DEFAULT_READ_WORKERS, decode_text, read_files
+from utils.git_objects import GitError, GitRepository
+from utils.profiling import count, profiled
+from utils.workspace import Workspace, WorkspaceRepository, full_path
+
+# What Submit copies
+DIFF_MODES = {
+    "full": "Whole files",
+    "submit": "Changed since last submit",
+    "git": "Diff against git revision",
+    "outline": "Outlines, focus files whole",
+}
+
+ADDED, CHANGED, DELETED = "new", "changed", "deleted"
+
+# A file as it was submitted: hash of its stripped text and its file_signature()
+SubmittedFile = namedtuple("SubmittedFile", "hash mtime_ns size")
+
+
+def content_hash(content):
+    """Hash of a file's stripped text, as remembered for the last submit."""
+    return hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+@profiled("snapshot")
+def snapshot_files(paths, root=".", previous=None, cache=None):
+    """Return {path: SubmittedFile} for the readable text files among paths.
+
+    Records in previous whose signature still matches are reused, so only
+    files written since are hashed; their contents come from the cache.
+    """
+    previous = previous or {}
+    cache = ContentCache() if cache is None else cache
+    records = {}
+    for path in paths:
+        file_path = full_path(root, path)
+        try:
+            signature = file_signature(file_path)
+        except OSError:
+            continue
+        record = previous.get(path)
+        if record is not None and (record.mtime_ns, record.size) == signature:
+            records[path] = record
+            continue
+        entry = cache.entry(file_path)
+        if entry.content is not None:
+            records[path] = SubmittedFile(content_hash(entry.content), *signature)
+    count(files=len(records))
+    return records
+
+
+def _chunk(stats, path, note, body):
+    separator = FILE_SEPARATOR if stats["files"] else ""
+    chunk = f"{separator}# {path} ({note})" + (f"\n{body}" if body else "")
+    stats["files"] += 1
+    stats["size"] += len(chunk)
+    return chunk
+
+
+def iter_changed_bundle(
+    paths,
+    root=".",
+    previous=None,
+    max_size=None,
+    stats=None,
+    workers=DEFAULT_READ_WORKERS,
+    cache=None,
+):
+    """Yield a bundle of the files that changed since the submit recorded in previous.
+
+    previous maps relative paths to SubmittedFile records. New and changed
+    files are included whole, noted as such, and recorded files that no
+    longer exist are listed as deleted. If stats is a dict it receives
+    "files", "size", "unchanged", "deleted", "truncated", "errors" and
+    "submitted", the records of the files as they are now, to be saved for
+    the next diff. A file only gets a new record once it has gone out whole;
+    one cut off by max_size, or not reached, keeps its old record.
+    """
+    paths = list(paths)
+    stats = {} if stats is None else stats
+    stats.update(files=0, size=0, unchanged=0, deleted=0, errors=[], submitted={})
+    return limit_chunks(
+        _changed_chunks(paths, root, previous or {}, stats, workers, cache),
+        max_size,
+        stats,
+    )
+
+
+def _changed_chunks(paths, root, previous, stats, workers, cache):
+    submitted = stats["submitted"]
+    candidates = []
+    for path in paths:
+        try:
+            signature = file_signature(full_path(root, path))
+        except OSError as e:
+            stats["errors"].append((path, str(e)))
+            continue
+        record = previous.get(path)
+        if record is not None and (record.mtime_ns, record.size) == signature:
+            submitted[path] = record  # Not even read
+            stats["unchanged"] += 1
+        else:
+            candidates.append((path, signature))
+
+    cache = ContentCache() if cache is None else cache  # Serves stripped contents
+    results = read_files(
+        (full_path(root, path) for path, _ in candidates), workers, cache=cache
+    )
+    try:
+        for (path, signature), result in zip(candidates, results):
+            if result.error is not None:
+                stats["errors"].append((path, result.error))
+                continue
+            digest = content_hash(result.content)
+            record = previous.get(path)
+            if record is not None and record.hash == digest:
+                submitted[path] = SubmittedFile(digest, *signature)
+                stats["unchanged"] += 1
+                continue
+            yield _chunk(
+                stats, path, CHANGED if record is not None else ADDED, result.content
+            )
+            # Only reached if limit_chunks didn't cut the chunk short
+            submitted[path] = SubmittedFile(digest, *signature)
+    finally:
+        results.close()
+        for path, _ in candidates:
+            if path not in submitted and path in previous:
+                submitted[path] = previous[path]
+
+    selected = set(paths)
+    for path in sorted(previous):
+        if path not in selected and not os.path.exists(full_path(root, path)):
+            stats["deleted"] += 1
+            yield _chunk(stats, path, DELETED, "")
+
+
+def iter_git_diff_bundle(
+    paths,
+    root=".",
+    revision="HEAD",
+    max_size=None,
+    stats=None,
+    context=3,
+    workers=DEFAULT_READ_WORKERS,
+    cache=None,
+    repository=None,
+):
+    """Yield unified diffs of the files that differ from their version in a git revision.
+
+    The revision is read straight from the repository holding root (see
+    utils/git_objects.py), or from that of each root of a Workspace. Files
+    missing from it are included whole as new. If stats is a dict it receives
+    "files", "size", "unchanged", "truncated", "errors" and "commit" ({root
+    name: commit} for a Workspace). Raises GitError if the revision can't be
+    resolved.
+    """
+    paths = list(paths)
+    if repository is None:
+        if isinstance(root, Workspace):
+            repository = WorkspaceRepository(root)
+        else:
+            repository = GitRepository(root)
+    commit = repository.resolve(revision)
+    stats = {} if stats is None else stats
+    stats.update(files=0, size=0, unchanged=0, errors=[], commit=commit)
+    return limit_chunks(
+        _git_diff_chunks(
+            paths, root, revision, repository, commit, stats, context, workers, cache
+        ),
+        max_size,
+        stats,
+    )
+
+
+def _git_diff_chunks(
+    paths, root, revision, repository, commit, stats, context, workers, cache
+):
+    blobs = repository.blob_ids(commit, paths)
+    cache = ContentCache() if cache is None else cache
+    results = read_files(
+        (full_path(root, path) for path in paths), workers, cache=cache
+    )
+    try:
+        for path, result in zip(paths, results):
+            if result.error is not None:
+                stats["errors"].append((path, result.error))
+                continue
+            blob = blobs.get(path)
+            if blob is None:
+                yield _chunk(stats, path, ADDED, result.content)
+                continue
+            try:
+                old = decode_text(repository.read_object(blob)[1])
+            except (GitError, UnicodeDecodeError) as e:
+                stats["errors"].append((path, f"{revision}: {e}"))
+                continue
+            if old is None:
+                stats["errors"].append((path, f"binary file in {revision}"))
+                continue
+            old = old.strip()
+            if old == result.content:
+                stats["unchanged"] += 1
+                continue
+            diff = difflib.unified_diff(
+                old.splitlines(),
+                result.content.splitlines(),
+                f"a/{path}",
+                f"b/{path}",
+                n=context,
+                lineterm="",
+            )
+            yield _chunk(stats, path, f"diff against {revision}", "\n".join(diff))
+    finally:
+        results.close()
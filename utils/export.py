@@ -0,0 +1,155 @@
+"""Getting a bundle out: whole, in parts, or into a file or named pipe.
+
+Large bundles are slow or impossible to push through the clipboard in one
+go (pyperclip shells out to xclip or xsel on Linux), so a bundle can be
+split into ordered parts that each stay under a size or token limit and are
+copied one at a time, or written to a file, a temporary file or a named
+pipe instead. Nothing here imports Qt; the GUI runs these off its thread.
+"""
+
+import errno
+import os
+import re
+import stat
+import tempfile
+import time
+
+from utils.tokens import TokenCounter
+
+# Where the bundle goes on Submit
+SINKS = {
+    "clipboard": "Clipboard",
+    "parts": "Clipboard in parts",
+    "file": "File or pipe…",
+    "temp": "Temporary file",
+}
+
+# What the part size of "Clipboard in parts" is measured in
+PART_UNITS = {
+    "tokens": "tokens",
+    "chars": "characters",
+}
+
+# Starts every part when a bundle is split, so the parts can be told apart
+PART_HEADER = "[Part {number} of {total}]\n\n"
+
+# Room kept in each part for its header
+_HEADER_ROOM = PART_HEADER.format(number=99_999, total=99_999)
+
+# Before a file header, or a comment that looks like one, after a blank line
+_FILE_START = re.compile(r"(?<=\n\n)(?=# )")
+
+# How often a named pipe is checked for a reader, in seconds
+PIPE_POLL_INTERVAL = 0.1
+
+
+def _units(text, limit, measure):
+    """Yield (piece, size) pairs of text, each within limit: whole files, else lines, else slices of a line."""
+    for block in _FILE_START.split(text):
+        size = measure(block)
+        if size <= limit:
+            yield block, size
+            continue
+        for line in block.splitlines(keepends=True):
+            size = measure(line)
+            if size <= limit:
+                yield line, size
+                continue
+            per_unit = max(1, len(line) // size)
+            while line:
+                # Cut roughly what fits, then shrink until it really does
+                piece = line[: limit * per_unit]
+                size = measure(piece)
+                while size > limit and len(piece) > 1:
+                    piece = piece[: max(1, len(piece) * limit // (size + 1))]
+                    size = measure(piece)
+                yield piece, size
+                line = line[len(piece) :]
+
+
+def split_bundle(text, limit, unit="chars", counter=None):
+    """Split a bundle into ordered parts of at most limit characters or tokens (unit is a PART_UNITS key).
+
+    Parts break between files where they can, else between lines; only a
+    line longer than a whole part is cut. Each part starts with PART_HEADER,
+    which counts towards its size, followed by its text verbatim, so the
+    parts without their headers join back into the bundle. A bundle that
+    fits in one part is returned whole, without a header. Token counts add up the counts of the
+    pieces, which is exact for the default tokenizer and close for tiktoken.
+    """
+    if unit == "tokens":
+        measure = (counter or TokenCounter()).count
+    else:
+        measure = len
+    if not text or not limit or measure(text) <= limit:
+        return [text]
+
+    limit = max(1, limit - measure(_HEADER_ROOM))
+    parts, current, used = [], [], 0
+    for piece, size in _units(text, limit, measure):
+        if current and used + size > limit:
+            parts.append("".join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += size
+    if current:
+        parts.append("".join(current))
+
+    return [
+        PART_HEADER.format(number=number, total=len(parts)) + part
+        for number, part in enumerate(parts, 1)
+    ]
+
+
+def part_path(path, number):
+    """Return the file name of part number of a bundle written to path: bundle.txt -> bundle.part2.txt."""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.part{number}{extension}"
+
+
+def _is_pipe(path):
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def open_sink(path, should_stop=None):
+    """Open a file or named pipe for writing a bundle into.
+
+    Opening a named pipe blocks until something reads from it; with
+    should_stop it is polled instead, and None is returned once
+    should_stop() is true with still no reader.
+    """
+    if should_stop is None or not _is_pipe(path):
+        return open(path, "w", encoding="utf-8")
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # ENXIO: no reader yet
+                raise
+        if should_stop():
+            return None
+        time.sleep(PIPE_POLL_INTERVAL)
+    os.set_blocking(fd, True)
+    return open(fd, "w", encoding="utf-8")
+
+
+def write_text(path, text, should_stop=None):
+    """Write text to a file or named pipe; return False if should_stop() ended the wait for a reader."""
+    out = open_sink(path, should_stop)
+    if out is None:
+        return False
+    with out:
+        out.write(text)
+    return True
+
+
+def write_temporary(text):
+    """Write text to a new temporary file and return its path; the file is left for the user."""
+    fd, path = tempfile.mkstemp(prefix="bundle-", suffix=".txt")
+    with open(fd, "w", encoding="utf-8") as out:
+        out.write(text)
+    return path
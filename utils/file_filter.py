@@ -0,0 +1,131 @@
+import re
+
+from utils.gitignore import IgnoreMatcher
+from utils.scanner import file_suffix
+
+# A single-suffix term such as ".py" picks a whole suffix bucket of the index
+_SUFFIX_TERM = re.compile(r"\.[^./\\*?\[\]]+")
+# A pattern whose last segment is "*.ext" or "*_test.ext" is only tried on files in that bucket
+# (so files inside a folder named like "x.ext" are not picked up by it)
+_GLOB_SUFFIX = re.compile(r"(?:.*/)?\*[^/\\*?\[\]]*?(\.[^./\\*?\[\]]+)")
+
+
+def glob_matcher(patterns):
+    """Return a predicate for relative file paths matching any of the .gitignore-style patterns."""
+    matcher = IgnoreMatcher(patterns)
+
+    def matches(path):
+        # As in .gitignore, a folder pattern like "tests/" covers everything below it
+        parts = path.split("/")
+        for i in range(1, len(parts)):
+            if matcher.match("/".join(parts[:i]), True):
+                return True
+        return bool(matcher.match(path, False))
+
+    return matches
+
+
+class FileFilter:
+    """A parsed filter expression such as ".py,.pyi,.toml" or "src/**/*.ts !*.d.ts".
+
+    Terms are separated by commas or whitespace: ".ext" terms take whole suffix
+    buckets of the index, "re:" terms are regular expressions searched in the
+    relative path, and anything else is a .gitignore-style pattern. A file
+    passes if it matches any term and none of the terms starting with "!";
+    with only "!" terms every other file passes. Raises ValueError for a bad
+    regular expression.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.suffixes = set()
+        self.glob_suffixes = set()  # Buckets the include patterns can match in
+        self.scan_all = False  # Some term can match a file of any suffix
+        self.include_res, self.exclude_res = [], []
+        include_globs, exclude_globs = [], []
+        for term in re.split(r"[,\s]+", text.strip()):
+            negated = term.startswith("!")
+            term = term[1:] if negated else term
+            if not term:
+                continue
+            if term.startswith("re:"):
+                try:
+                    pattern = re.compile(term[3:])
+                except re.error as e:
+                    raise ValueError(f"bad regular expression {term[3:]!r}: {e}")
+                (self.exclude_res if negated else self.include_res).append(pattern)
+                self.scan_all = self.scan_all or not negated
+                continue
+            if term.startswith(".") and not any(c in term for c in "/*?[\\"):
+                if not negated and _SUFFIX_TERM.fullmatch(term):
+                    self.suffixes.add(term)
+                    continue
+                term = "*" + term  # ".tar.gz" or "!.pyc" as a name pattern
+            if negated:
+                exclude_globs.append(term)
+                continue
+            include_globs.append(term)
+            match = _GLOB_SUFFIX.fullmatch(term)
+            if match and not term.endswith("/"):
+                self.glob_suffixes.add(match.group(1))
+            else:
+                self.scan_all = True
+        self.include_glob = glob_matcher(include_globs) if include_globs else None
+        self.exclude_glob = glob_matcher(exclude_globs) if exclude_globs else None
+        self.includes = bool(self.suffixes or include_globs or self.include_res)
+        self.excludes = bool(exclude_globs or self.exclude_res)
+        if not self.includes:
+            self.scan_all = True  # Nothing to include means everything not excluded
+
+    def matches(self, path):
+        """Return whether a relative file path passes the filter."""
+        if self.excludes and (
+            (self.exclude_glob is not None and self.exclude_glob(path))
+            or any(r.search(path) for r in self.exclude_res)
+        ):
+            return False
+        if not self.includes:
+            return True
+        return (
+            file_suffix(path) in self.suffixes
+            or (self.include_glob is not None and self.include_glob(path))
+            or any(r.search(path) for r in self.include_res)
+        )
+
+    def select(self, index):
+        """Return the FileEntry records of a ProjectIndex passing the filter."""
+        if self.scan_all:
+            buckets = list(index.by_suffix)
+        else:
+            buckets = self.suffixes | self.glob_suffixes
+        selected = []
+        for suffix in buckets:
+            entries = index.by_suffix.get(suffix)
+            if not entries:
+                continue
+            if suffix in self.suffixes and not self.excludes:
+                selected.extend(
+                    entries.values()
+                )  # The whole bucket, no matching needed
+            else:
+                matches = self.matches
+                selected.extend(e for path, e in entries.items() if matches(path))
+        return selected
+
+
+def select_paths(index, extensions=(), globs=(), selection=None, file_filter=None):
+    """Return the sorted relative paths in a ProjectIndex passing every given filter."""
+    if extensions:
+        paths = [p for ext in set(extensions) for p in index.by_suffix.get(ext, ())]
+        if file_filter is not None:
+            paths = [p for p in paths if file_filter.matches(p)]
+    elif file_filter is not None:
+        paths = [e.path for e in file_filter.select(index)]
+    else:
+        paths = [p for entries in index.by_suffix.values() for p in entries]
+    if globs:
+        matches = glob_matcher(globs)
+        paths = [p for p in paths if matches(p)]
+    if selection is not None:
+        paths = [p for p in paths if p in selection]
+    return sorted(paths)
@@ -1,84 +1,112 @@
 import os
-import pickle
-import tempfile
-from pathlib import Path
-import pyperclip
-
-# Use a more descriptive name for the pickle file
-PICKLE_FILE = os.path.join(tempfile.gettempdir(), "spoon_app_state.pickle")
-IGNORE_FILE = ".gitignore"
-
-
-def get_ignored_patterns():
-    """Reads the .gitignore file and returns a list of ignored patterns."""
-    ignore_patterns = []
-    if Path(IGNORE_FILE).exists():
-        with open(IGNORE_FILE, "r") as f:
-            ignore_patterns = [
-                line.strip() for line in f if line.strip() and not line.startswith("#")
-            ]
-    return ignore_patterns
-
-
-def is_ignored(file_path, ignore_patterns):
-    """Checks if a file matches any of the ignore patterns."""
-    for pattern in ignore_patterns:
-        if file_path.match(pattern) or file_path.is_relative_to(pattern):
-            return True
-    return False
-
-
-def find_python_files():
-    """Find all Python files in the project, excluding ignored files and directories."""
-    ignore_patterns = get_ignored_patterns()
-    python_files = []
-    for root, _, files in os.walk("."):
-        if is_ignored(Path(root), ignore_patterns):
-            continue
-        for file in files:
-            file_path = Path(root) / file
-            if file_path.suffix == ".py" and not is_ignored(file_path, ignore_patterns):
-                python_files.append(file_path)
-    return python_files
-
-
-def load_app_state():
-    """Loads the last application state from a pickle file."""
-    if Path(PICKLE_FILE).exists():
-        with open(PICKLE_FILE, "rb") as f:
-            return pickle.load(f)
-    return {"selected_files": set(), "select_all_state": False, "file_extension": ".py"}
-
-
-def save_app_state(selected_files, select_all_state, file_extension):
-    """Saves the application state to a pickle file."""
-    app_state = {
-        "selected_files": selected_files,
-        "select_all_state": select_all_state,
-        "file_extension": file_extension,
-    }
-    with open(PICKLE_FILE, "wb") as f:
-        pickle.dump(app_state, f)
-
-
-def collect_file_data(selected_files):
-    """Collect data from the specified files and return a dictionary with titles and contents."""
+import sqlite3
+import sys
+from utils.diff_bundle import SubmittedFile
+from utils.file_reader import DEFAULT_READ_WORKERS, read_files
+from utils.profiling import count, profiled
+from utils.scanner import scan_workspace
+from utils.state_store import DEFAULT_STATE, StateStore, StateStoreError
+
+# Opened on first use and shared by every load and save in the process
+_state_store = None
+
+
+def find_python_files(root="."):
+    """Find all Python files in the project or Workspace, excluding ignored files and directories."""
+    return scan_workspace(root).files(".py")
+
+
+def get_state_store():
+    """Return the shared StateStore, or None if the state database can't be opened."""
+    global _state_store
+    if _state_store is None:
+        try:
+            _state_store = StateStore()
+        except (sqlite3.Error, StateStoreError) as e:
+            print(f"Application state is not available: {e}", file=sys.stderr)
+            return None
+    return _state_store
+
+
+def load_app_state(root="."):
+    """Loads the last application state saved for the project at root."""
+    store = get_state_store()
+    if store is not None:
+        try:
+            return store.load(root)
+        except sqlite3.Error as e:
+            print(f"Failed to load application state: {e}", file=sys.stderr)
+    return {**DEFAULT_STATE, "selected_files": set()}
+
+
+def save_app_state(root, selected_files, select_all_state, file_extension):
+    """Saves the application state of the project at root; selected_files are relative paths."""
+    store = get_state_store()
+    if store is None:
+        return
+    try:
+        store.save(root, selected_files, select_all_state, file_extension)
+    except sqlite3.Error as e:
+        print(f"Failed to save application state: {e}", file=sys.stderr)
+
+
+def load_submitted_files(root="."):
+    """Return {path: SubmittedFile} for the last submit of the project at root."""
+    store = get_state_store()
+    if store is not None:
+        try:
+            return {
+                path: SubmittedFile(*record)
+                for path, record in store.load_submitted(root).items()
+            }
+        except sqlite3.Error as e:
+            print(f"Failed to load the last submit: {e}", file=sys.stderr)
+    return {}
+
+
+def save_submitted_files(root, records):
+    """Remember {path: SubmittedFile} as the last submit of the project at root."""
+    store = get_state_store()
+    if store is None:
+        return
+    try:
+        store.save_submitted(root, records)
+    except sqlite3.Error as e:
+        print(f"Failed to save the last submit: {e}", file=sys.stderr)
+
+
+@profiled("collect file data")
+def collect_file_data(
+    selected_files, workers=DEFAULT_READ_WORKERS, errors=None, cache=None, root=None
+):
+    """Collect data from the specified files and return a dictionary with titles and contents.
+
+    Titles are the paths relative to root, or the paths as given without it,
+    so same-named files in different folders don't overwrite each other.
+    Files are read concurrently; the dictionary keeps the order of selected_files.
+    Binary and unreadable files are skipped, and if errors is a dict it receives
+    their paths mapped to the reason. Pass a ContentCache to avoid re-reading
+    files that have not changed since the last call.
+    """
     file_data = {}
-    for file_path in selected_files:
-        if os.path.isfile(file_path):
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    file_title = os.path.basename(file_path)
-                    file_contents = f.read()
-                    file_data[file_title] = file_contents.strip()
-            except Exception as e:
-                print(f"Error reading file {file_path}: {e}")
+    for result in read_files(selected_files, workers, cache=cache, strip=True):
+        if result.error is None:
+            file_title = result.path
+            if root is not None:
+                file_title = os.path.relpath(result.path, root).replace(os.sep, "/")
+            file_data[file_title] = result.content
+        elif errors is not None:
+            errors[result.path] = result.error
+    count(files=len(file_data))
     return file_data
 
 
+@profiled("clipboard")
 def copy_to_clipboard(text):
     """Copies text to the clipboard as plaintext."""
-    if isinstance(text, str):
-        pyperclip.copy(text)
-    else:
-        pyperclip.copy(str(text))
+    import pyperclip  # Only needed here, so headless runs don't pay for it
+
+    if not isinstance(text, str):
+        text = str(text)
+    pyperclip.copy(text)
+    count(chars=len(text))
@@ -0,0 +1,290 @@
+import codecs
+import hashlib
+import mmap
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Reads are latency bound (network mounts, cold caches), so more threads than cores pay off
+DEFAULT_READ_WORKERS = 8
+
+# Each worker may have this many files read ahead of the consumer
+READ_AHEAD = 4
+
+# A NUL byte in the first block marks a file as binary, as git does
+SNIFF_SIZE = 8000
+BINARY_FILE = "binary file"
+
+# Files at least this big are memory-mapped when the output can take bytes,
+# and written out in slices instead of being decoded into one string
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# Mapped files are checked and written this many bytes at a time
+MMAP_BLOCK = 1024 * 1024
+
+# The ASCII characters str.strip() removes; bytes.strip() misses \x1c-\x1f
+_ASCII_WHITESPACE = frozenset(b"\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f ")
+
+# content is the decoded text, or None when error says why the file was skipped
+FileReadResult = namedtuple("FileReadResult", "path content error")
+
+
+def looks_binary(block):
+    """Cheap binary sniff: text files don't contain NUL bytes."""
+    return b"\0" in block
+
+
+def _normalize_newlines(text):
+    """Translate CRLF and CR line endings to LF, as reading in text mode would."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _strip_bounds(data):
+    """Return (start, end) of data without its surrounding ASCII whitespace."""
+    start, end = 0, len(data)
+    while start < end and data[start] in _ASCII_WHITESPACE:
+        start += 1
+    while end > start and data[end - 1] in _ASCII_WHITESPACE:
+        end -= 1
+    return start, end
+
+
+def decode_text(data):
+    """Decode a whole file's bytes the way read_text_file does; None for binary data.
+
+    Raises UnicodeDecodeError for bytes that aren't UTF-8.
+    """
+    if looks_binary(data[:SNIFF_SIZE]):
+        return None
+    return _normalize_newlines(data.decode("utf-8"))
+
+
+def read_text_file(path, max_chars=None, strip=False):
+    """Read a UTF-8 text file into a FileReadResult, never raising.
+
+    With max_chars only enough of the file is read to return at most
+    max_chars + 1 characters, so callers can tell the file went on. strip
+    returns files as str.strip() would, but only the stripped bytes are
+    decoded, so the text isn't copied a second time; a partial read is then
+    the start of the stripped text, the same whichever way the file is read.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_SIZE)
+            if looks_binary(head):
+                return FileReadResult(path, None, BINARY_FILE)
+            if max_chars is None:
+                f.seek(0)  # Reading whole saves copying head onto the rest
+                data = f.read()
+                if not strip:
+                    text = _normalize_newlines(data.decode("utf-8"))
+                    return FileReadResult(path, text, None)
+                start, end = _strip_bounds(data)
+                with memoryview(data) as view:
+                    text = str(view[start:end], "utf-8")
+                # Only non-ASCII whitespace is left to strip, and usually nothing is
+                return FileReadResult(path, _normalize_newlines(text).strip(), None)
+
+            if strip:
+                # Skip the leading whitespace, however long, before counting
+                start = _strip_bounds(head)[0]
+                while start == len(head) and head:
+                    head = f.read(SNIFF_SIZE)
+                    start = _strip_bounds(head)[0]
+                head = head[start:]
+            # UTF-8 needs at most 4 bytes per character
+            max_bytes = 4 * (max_chars + 1)
+            data = head[:max_bytes] + f.read(max(0, max_bytes - len(head)))
+            at_eof = len(data) < max_bytes
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            text = _normalize_newlines(decoder.decode(data, final=at_eof))
+            if strip:
+                text = text.strip() if at_eof else text.lstrip()
+                if len(text) <= max_chars and not at_eof:
+                    # Non-ASCII whitespace ate into what was read ahead
+                    result = read_text_file(path, strip=True)
+                    if result.error is not None:
+                        return result
+                    text = result.content
+            return FileReadResult(path, text[: max_chars + 1], None)
+    except (OSError, UnicodeDecodeError) as e:
+        return FileReadResult(path, None, str(e))
+
+
+class MappedText:
+    """The stripped text of a large UTF-8 file, memory-mapped instead of read.
+
+    len() is its length in characters, and digest the BLAKE2b digest of its
+    UTF-8 text taken while checking it, the same utils.tokens.content_hash()
+    gives for the text as a string. Pages are dropped from the process as soon as
+    they have been checked or written, so a mapped file never counts whole
+    against its memory. Call close() when done.
+    """
+
+    def __init__(self, path, mm, start, end):
+        self.path = path
+        self._mm = mm
+        self.start = start
+        self.end = end
+        self.chars = 0
+        self.digest = None
+
+    def __len__(self):
+        return self.chars
+
+    def _ranges(self):
+        """Split start..end into blocks of about MMAP_BLOCK bytes ending on character boundaries."""
+        mm, start = self._mm, self.start
+        while start < self.end:
+            end = block_end = min(start + MMAP_BLOCK, self.end)
+            # A continuation byte: back up to where its character starts, at most
+            # 3 bytes; longer runs aren't UTF-8 and fail to decode at the cut
+            while end < self.end and mm[end] & 0xC0 == 0x80 and block_end - end < 3:
+                end -= 1
+            if end < self.end and mm[end] & 0xC0 == 0x80:
+                end = block_end
+            yield start, end
+            start = end
+
+    def _release(self, start, end):
+        if hasattr(mmap, "MADV_DONTNEED"):
+            low, high = start - start % mmap.PAGESIZE, end - end % mmap.PAGESIZE
+            if high > low:
+                self._mm.madvise(mmap.MADV_DONTNEED, low, high - low)
+
+    def check(self):
+        """Count the characters; return False if CR line endings need translating.
+
+        Raises UnicodeDecodeError if the text isn't UTF-8.
+        """
+        chars, digest = 0, hashlib.blake2b(digest_size=16)
+        with memoryview(self._mm) as view:
+            for start, end in self._ranges():
+                if self._mm.find(b"\r", start, end) != -1:
+                    return False
+                try:
+                    chars += len(str(view[start:end], "utf-8"))
+                except UnicodeDecodeError as e:
+                    e.start, e.end = e.start + start, e.end + start  # Within the file
+                    raise
+                digest.update(view[start:end])
+                self._release(start, end)
+        self.chars = chars
+        self.digest = digest.digest()
+        return True
+
+    def blocks(self, max_chars=None):
+        """Yield the text as UTF-8 memoryview slices, at most max_chars characters of it.
+
+        Each slice is released once the consumer asks for the next one.
+        """
+        left = max_chars if max_chars is not None and max_chars < self.chars else None
+        with memoryview(self._mm) as view:
+            for start, end in self._ranges():
+                if left is not None:
+                    text = str(view[start:end], "utf-8")
+                    if len(text) >= left:
+                        yield text[:left].encode("utf-8")
+                        return
+                    left -= len(text)
+                with view[start:end] as block:
+                    yield block
+                self._release(start, end)
+
+    def close(self):
+        self._mm.close()
+
+
+def _space_at_edges(data, start, end):
+    """Whether data[start:end] starts or ends with non-ASCII whitespace, like U+00A0."""
+    if start == end or (data[start] < 0x80 and data[end - 1] < 0x80):
+        return False
+    first = str(data[start : start + 4], "utf-8", "ignore")[:1]
+    last = str(data[max(start, end - 4) : end], "utf-8", "ignore")[-1:]
+    return first.isspace() or last.isspace()
+
+
+def map_text_file(path, max_chars=None):
+    """Memory-map a large text file into a FileReadResult whose content is a MappedText.
+
+    Returns None for files that are better read into a string: those under
+    MMAP_THRESHOLD, those with CR line endings to translate, those with
+    non-ASCII whitespace to strip, and those too big for a max_chars read.
+    The whole file is checked to be UTF-8, a block at a time.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_THRESHOLD:
+                return None
+            if max_chars is not None and size > 4 * (max_chars + 1):
+                return None  # Reading the start of it is cheaper
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        return FileReadResult(path, None, str(e))
+
+    if mm.find(b"\0", 0, SNIFF_SIZE) != -1:
+        mm.close()
+        return FileReadResult(path, None, BINARY_FILE)
+    start, end = _strip_bounds(mm)
+    if _space_at_edges(mm, start, end):
+        mm.close()
+        return None
+    text = MappedText(path, mm, start, end)
+    try:
+        if text.check():
+            return FileReadResult(path, text, None)
+    except UnicodeDecodeError as e:
+        text.close()
+        return FileReadResult(path, None, str(e))
+    text.close()
+    return None
+
+
+def read_files(
+    paths,
+    workers=DEFAULT_READ_WORKERS,
+    max_chars=None,
+    cache=None,
+    strip=False,
+    mapped=False,
+):
+    """Read files concurrently, yielding FileReadResults in the order of paths.
+
+    At most workers * READ_AHEAD files are in flight or waiting to be consumed,
+    and closing the generator early cancels the reads not yet started. With a
+    ContentCache, unchanged files are served from it (already stripped), and
+    strip strips whole files without it. With mapped, files of MMAP_THRESHOLD
+    bytes or more come back stripped as MappedText, bypassing the cache; the
+    consumer closes them.
+    """
+    if cache is not None:
+        read = cache.read
+    else:
+        read = partial(read_text_file, strip=strip)
+    if mapped:
+        read_string = read
+
+        def read(path, max_chars):
+            return map_text_file(path, max_chars) or read_string(path, max_chars)
+
+    if workers <= 1:
+        for path in paths:
+            yield read(path, max_chars)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        try:
+            for path in paths:
+                window.append(pool.submit(read, path, max_chars))
+                if len(window) >= workers * READ_AHEAD:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
@@ -0,0 +1,390 @@
+"""Read-only access to a local git repository's objects, without running git.
+
+Enough of the object store is understood to resolve a revision and read the
+blobs of a commit's tree: loose objects, version 2 pack indexes and packs
+with their offset and reference deltas. Only SHA-1 repositories are supported.
+"""
+
+import os
+import re
+import zlib
+from bisect import bisect_left
+
+# Pack object types; 5 is reserved
+COMMIT, TREE, BLOB, TAG, OFS_DELTA, REF_DELTA = 1, 2, 3, 4, 6, 7
+TYPE_NAMES = {COMMIT: "commit", TREE: "tree", BLOB: "blob", TAG: "tag"}
+
+# Decompressed objects kept for reuse, mostly delta bases
+OBJECT_CACHE_SIZE = 256
+
+_HEX = re.compile(r"[0-9a-f]{4,40}")
+_OBJECT_NAME = re.compile(r"[0-9a-f]{40}")
+_REVISION = re.compile(r"(.+?)((?:[~^]\d*)*)")
+
+
+class GitError(Exception):
+    """The repository or a revision can't be read."""
+
+
+def find_repository(path):
+    """Return (git dir, work tree) of the repository holding path, or None outside one."""
+    folder = os.path.realpath(path)
+    while True:
+        dot_git = os.path.join(folder, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git, folder
+        if os.path.isfile(dot_git):
+            # Worktrees and submodules point to their git dir from a .git file
+            with open(dot_git, encoding="utf-8") as f:
+                line = f.readline().strip()
+            if line.startswith("gitdir:"):
+                git_dir = os.path.join(folder, line[len("gitdir:") :].strip())
+                return os.path.normpath(git_dir), folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+def _read_varint(data, pos):
+    """Read a little-endian base-128 size as used in delta headers."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def apply_delta(base, delta):
+    """Rebuild an object from its delta base and a git delta."""
+    _, pos = _read_varint(delta, 0)  # Size of the base
+    size, pos = _read_varint(delta, pos)
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            # Copy from the base: bits 0-3 say which offset bytes follow, 4-6 which size bytes
+            offset = length = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    length |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset : offset + (length or 0x10000)]
+        elif op:
+            out += delta[pos : pos + op]  # Insert the next op bytes
+            pos += op
+        else:
+            raise GitError("corrupt delta")
+    if len(out) != size:
+        raise GitError("delta produced the wrong size")
+    return bytes(out)
+
+
+class PackIndex:
+    """A version 2 .idx file: the sorted object names of a pack and their offsets."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != b"\377tOc" or int.from_bytes(data[4:8], "big") != 2:
+            raise GitError(f"{path}: only version 2 pack indexes are supported")
+        self.count = int.from_bytes(data[8 + 255 * 4 : 8 + 256 * 4], "big")
+        names_at = 8 + 256 * 4
+        self.names = [
+            data[names_at + 20 * i : names_at + 20 * (i + 1)] for i in range(self.count)
+        ]
+        self._offsets_at = names_at + 24 * self.count  # After the names and CRCs
+        self._large_at = self._offsets_at + 4 * self.count
+        self._data = data
+
+    def offset(self, name):
+        """Return the pack offset of a binary object name, or None if it isn't in the pack."""
+        i = bisect_left(self.names, name)
+        if i == self.count or self.names[i] != name:
+            return None
+        at = self._offsets_at + 4 * i
+        offset = int.from_bytes(self._data[at : at + 4], "big")
+        if offset & 0x80000000:
+            # Packs over 2 GB keep big offsets in a separate table
+            at = self._large_at + 8 * (offset & 0x7FFFFFFF)
+            offset = int.from_bytes(self._data[at : at + 8], "big")
+        return offset
+
+    def matching(self, prefix):
+        """Return the hex names in the pack starting with a hex prefix."""
+        low = bytes.fromhex(prefix.ljust(40, "0"))
+        i = bisect_left(self.names, low)
+        found = []
+        while i < self.count and self.names[i].hex().startswith(prefix):
+            found.append(self.names[i].hex())
+            i += 1
+        return found
+
+
+class GitRepository:
+    """The objects and refs of the repository holding path."""
+
+    def __init__(self, path="."):
+        found = find_repository(path)
+        if found is None:
+            raise GitError(f"{path} is not inside a git repository")
+        self.git_dir, self.work_tree = found
+        # Linked worktrees share objects and most refs with the main repository
+        self.common_dir = self.git_dir
+        commondir = os.path.join(self.git_dir, "commondir")
+        if os.path.isfile(commondir):
+            with open(commondir, encoding="utf-8") as f:
+                self.common_dir = os.path.normpath(
+                    os.path.join(self.git_dir, f.read().strip())
+                )
+        self.objects_dir = os.path.join(self.common_dir, "objects")
+
+        # Paths are looked up relative to the folder the repository was opened for
+        prefix = os.path.relpath(os.path.realpath(path), self.work_tree)
+        self.prefix = "" if prefix == "." else prefix.replace(os.sep, "/") + "/"
+        self._packs = None  # [(PackIndex, pack path)], loaded on first use
+        self._cache = {}
+        self._trees = {}
+
+    # Refs and revisions
+
+    def _read_ref(self, name, depth=0):
+        if depth > 10:
+            raise GitError(f"symbolic ref loop at {name}")
+        for folder in (self.git_dir, self.common_dir):
+            path = os.path.join(folder, *name.split("/"))
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8") as f:
+                    value = f.read().strip()
+                if value.startswith("ref:"):
+                    return self._read_ref(value[4:].strip(), depth + 1)
+                if _OBJECT_NAME.fullmatch(value):
+                    return value
+        packed = os.path.join(self.common_dir, "packed-refs")
+        if os.path.isfile(packed):
+            with open(packed, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == name:
+                        return parts[0]
+        return None
+
+    def _resolve_name(self, name):
+        if name == "HEAD" or name.startswith("refs/"):
+            candidates = [name]
+        else:
+            candidates = [
+                name,
+                f"refs/{name}",
+                f"refs/tags/{name}",
+                f"refs/heads/{name}",
+                f"refs/remotes/{name}",
+                f"refs/remotes/{name}/HEAD",
+            ]
+        for candidate in candidates:
+            value = self._read_ref(candidate)
+            if value is not None:
+                return value
+        if _HEX.fullmatch(name):
+            matches = self._objects_matching(name)
+            if len(matches) == 1:
+                return matches.pop()
+            if matches:
+                raise GitError(f"short object name {name} is ambiguous")
+        raise GitError(f"unknown revision {name}")
+
+    def resolve(self, revision):
+        """Return the commit id for a revision: a ref, an object name, and ~N or ^ suffixes."""
+        match = _REVISION.fullmatch(revision.strip())
+        if match is None:
+            raise GitError(f"bad revision {revision!r}")
+        commit = self._peel(self._resolve_name(match.group(1)))
+        for step in re.findall(r"[~^]\d*", match.group(2)):
+            count = int(step[1:] or 1)
+            if step[0] == "^":
+                # ^N picks the Nth parent, ~N follows the first parent N times
+                commit = self._parent(commit, count)
+            else:
+                for _ in range(count):
+                    commit = self._parent(commit, 1)
+        return commit
+
+    def _peel(self, name):
+        """Follow annotated tags down to the commit they point to."""
+        kind, data = self.read_object(name)
+        while kind == "tag":
+            name = data.split(b"\n", 1)[0].split()[1].decode()
+            kind, data = self.read_object(name)
+        if kind != "commit":
+            raise GitError(f"{name} is a {kind}, not a commit")
+        return name
+
+    def _parent(self, commit, number):
+        _, data = self.read_object(commit)
+        parents = [
+            line.split()[1].decode()
+            for line in data.split(b"\n\n", 1)[0].split(b"\n")
+            if line.startswith(b"parent ")
+        ]
+        if number > len(parents):
+            raise GitError(f"{commit} has no parent {number}")
+        return parents[number - 1]
+
+    # Objects
+
+    def _pack_list(self):
+        if self._packs is None:
+            self._packs = []
+            pack_dir = os.path.join(self.objects_dir, "pack")
+            if os.path.isdir(pack_dir):
+                for name in sorted(os.listdir(pack_dir)):
+                    if name.endswith(".idx"):
+                        pack = os.path.join(pack_dir, name[:-4] + ".pack")
+                        if os.path.isfile(pack):
+                            self._packs.append(
+                                (PackIndex(os.path.join(pack_dir, name)), pack)
+                            )
+        return self._packs
+
+    def _objects_matching(self, prefix):
+        found = set()
+        folder = os.path.join(self.objects_dir, prefix[:2])
+        if os.path.isdir(folder):
+            found.update(
+                prefix[:2] + name
+                for name in os.listdir(folder)
+                if (prefix[:2] + name).startswith(prefix)
+            )
+        for index, _ in self._pack_list():
+            found.update(index.matching(prefix))
+        return found
+
+    def _remember(self, key, value):
+        if len(self._cache) >= OBJECT_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = value
+        return value
+
+    def read_object(self, name):
+        """Return (type name, contents) of an object given its hex name."""
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+
+        loose = os.path.join(self.objects_dir, name[:2], name[2:])
+        if os.path.isfile(loose):
+            with open(loose, "rb") as f:
+                try:
+                    raw = zlib.decompress(f.read())
+                except zlib.error as e:
+                    raise GitError(f"object {name} is corrupt: {e}")
+            header, _, data = raw.partition(b"\0")
+            return self._remember(name, (header.split()[0].decode(), data))
+
+        binary = bytes.fromhex(name)
+        for index, pack in self._pack_list():
+            offset = index.offset(binary)
+            if offset is not None:
+                return self._remember(name, self._read_packed(pack, offset))
+        raise GitError(f"object {name} not found")
+
+    def _read_packed(self, pack, offset):
+        """Return (type name, contents) of the pack entry at offset, resolving deltas."""
+        cached = self._cache.get((pack, offset))
+        if cached is not None:
+            return cached
+
+        with open(pack, "rb") as f:
+            f.seek(offset)
+            header = f.read(32)
+            byte = header[0]
+            kind = (byte >> 4) & 7
+            pos = 1
+            while byte & 0x80:  # The size is not needed, zlib finds the end
+                byte = header[pos]
+                pos += 1
+
+            base = None
+            if kind == OFS_DELTA:
+                byte = header[pos]
+                pos += 1
+                distance = byte & 0x7F
+                while byte & 0x80:
+                    byte = header[pos]
+                    pos += 1
+                    distance = ((distance + 1) << 7) | (byte & 0x7F)
+                base = self._read_packed(pack, offset - distance)
+            elif kind == REF_DELTA:
+                base = self.read_object(header[pos : pos + 20].hex())
+                pos += 20
+            elif kind not in TYPE_NAMES:
+                raise GitError(f"{pack}: unknown object type {kind} at {offset}")
+
+            f.seek(offset + pos)
+            decompressor = zlib.decompressobj()
+            parts = []
+            while not decompressor.eof:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    raise GitError(f"{pack} is truncated")
+                try:
+                    parts.append(decompressor.decompress(chunk))
+                except zlib.error as e:
+                    raise GitError(f"{pack} is corrupt at {offset}: {e}")
+            data = b"".join(parts)
+
+        if base is not None:
+            result = base[0], apply_delta(base[1], data)
+        else:
+            result = TYPE_NAMES[kind], data
+        # Delta bases are usually needed again for the objects built on them
+        return self._remember((pack, offset), result)
+
+    # Trees
+
+    def tree_entries(self, tree):
+        """Return {name: (mode, object name)} for a tree object."""
+        entries = self._trees.get(tree)
+        if entries is None:
+            kind, data = self.read_object(tree)
+            if kind != "tree":
+                raise GitError(f"{tree} is a {kind}, not a tree")
+            entries = {}
+            pos = 0
+            while pos < len(data):
+                space = data.index(b" ", pos)
+                nul = data.index(b"\0", space)
+                name = data[space + 1 : nul].decode("utf-8", "surrogateescape")
+                entries[name] = (
+                    data[pos:space].decode(),
+                    data[nul + 1 : nul + 21].hex(),
+                )
+                pos = nul + 21
+            self._trees[tree] = entries
+        return entries
+
+    def blob_ids(self, commit, paths):
+        """Return {path: blob name} for the paths (relative to the opened folder) present in a commit."""
+        _, data = self.read_object(commit)
+        root = data.split(b"\n", 1)[0].split()[1].decode()  # The "tree" header
+        found = {}
+        for path in paths:
+            tree, parts = root, (self.prefix + path).split("/")
+            for part in parts[:-1]:
+                entry = self.tree_entries(tree).get(part)
+                if entry is None or entry[0] != "40000":
+                    break
+                tree = entry[1]
+            else:
+                entry = self.tree_entries(tree).get(parts[-1])
+                if entry is not None and entry[0].startswith("100"):
+                    found[path] = entry[1]  # Regular files, not links or submodules
+        return found
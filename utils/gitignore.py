@@ -0,0 +1,316 @@
+import os
+import re
+from collections import namedtuple
+
+IGNORE_FILE = ".gitignore"
+
+# Directories git itself never descends into, regardless of ignore rules
+ALWAYS_IGNORED_DIRS = frozenset({".git"})
+
+# Number of rule groups sharing one combined pre-check in IgnoreMatcher
+GROUPS_PER_BLOCK = 16
+
+ParsedPattern = namedtuple("ParsedPattern", "body regex negated dir_only anchored")
+
+
+def _translate_class(pattern, i):
+    """Translate a [...] character class starting at pattern[i]; return (regex, next index)."""
+    j = i + 1
+    if j < len(pattern) and pattern[j] in "!^":
+        j += 1
+    if j < len(pattern) and pattern[j] == "]":
+        j += 1
+    while j < len(pattern) and pattern[j] != "]":
+        j += 1
+    if j >= len(pattern):
+        return re.escape("["), i + 1  # Unterminated class is a literal bracket
+
+    body = pattern[i + 1 : j]
+    if body[:1] in ("!", "^"):
+        body = "^" + body[1:].replace("\\", "\\\\")
+    else:
+        body = body.replace("\\", "\\\\")
+    return f"[{body}]", j + 1
+
+
+def _translate(pattern):
+    """Translate the body of a gitignore pattern into a regular expression."""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        parts.append(".*")  # Trailing "/**": everything inside
+                        i += 2
+                    else:
+                        parts.append("(?:.*/)?")  # "**/": zero or more directories
+                        i += 3
+                    continue
+            while i < n and pattern[i] == "*":
+                i += 1
+            parts.append("[^/]*")
+            continue
+        if c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            regex, i = _translate_class(pattern, i)
+            parts.append(regex)
+            continue
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+def parse_pattern(line):
+    """Parse one .gitignore line, or return None for blanks and comments.
+
+    The body is the pattern with negation, anchoring and trailing slash removed.
+    """
+    line = line.rstrip("\n").rstrip("\r")
+
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory;
+    # without one the pattern is matched against the name at any depth
+    anchored = "/" in line
+    line = line.lstrip("/")
+    return ParsedPattern(line, _translate(line), negated, dir_only, anchored)
+
+
+def _is_literal(body):
+    return not any(c in body for c in "*?[\\")
+
+
+def _name_suffixes(name):
+    """Return every dotted suffix of name: "a.tar.gz" gives ".tar.gz" and ".gz"."""
+    suffixes = []
+    i = name.find(".")
+    while i != -1:
+        suffixes.append(name[i:])
+        i = name.find(".", i + 1)
+    return suffixes
+
+
+class _RuleGroup:
+    """Consecutive rules sharing the same effect, compiled into set lookups and two alternations."""
+
+    __slots__ = (
+        "negated",
+        "dir_only",
+        "names",
+        "suffixes",
+        "name_regexes",
+        "path_regexes",
+    )
+
+    def __init__(self, negated, dir_only):
+        self.negated = negated
+        self.dir_only = dir_only
+        self.names = set()
+        self.suffixes = set()
+        self.name_regexes = []
+        self.path_regexes = []
+
+    def merge(self, other):
+        """Add the (not yet compiled) rules of other to this group."""
+        self.names |= other.names
+        self.suffixes |= other.suffixes
+        self.name_regexes += other.name_regexes
+        self.path_regexes += other.path_regexes
+
+    def compile(self):
+        self.name_regexes = _combine(self.name_regexes)
+        self.path_regexes = _combine(self.path_regexes)
+
+    def match(self, rel_path, name, suffixes):
+        return (
+            name in self.names
+            or not self.suffixes.isdisjoint(suffixes)
+            or (self.name_regexes is not None and self.name_regexes.match(name))
+            or (self.path_regexes is not None and self.path_regexes.match(rel_path))
+        )
+
+
+def _combine(regexes):
+    if not regexes:
+        return None
+    return re.compile("(?:" + "|".join(regexes) + r")\Z", re.S)
+
+
+class IgnoreMatcher:
+    """The compiled rules of a single .gitignore file, matched against paths relative to its directory."""
+
+    def __init__(self, lines, base=""):
+        self.base = base.strip("/")
+        self.prefix = f"{self.base}/" if self.base else ""
+        self.patterns = []
+
+        # Consecutive rules with the same effect are merged into one group.
+        # Since the last matching rule wins, scanning the groups backwards and
+        # stopping at the first hit gives the same answer as checking every rule.
+        groups = []
+        for line in lines:
+            parsed = parse_pattern(line)
+            if parsed is None:
+                continue
+            self.patterns.append(line.strip())
+            if not groups or (groups[-1].negated, groups[-1].dir_only) != (
+                parsed.negated,
+                parsed.dir_only,
+            ):
+                groups.append(_RuleGroup(parsed.negated, parsed.dir_only))
+            group = groups[-1]
+
+            # Plain names and "*.ext" patterns become set lookups instead of regexes
+            body = parsed.body
+            if parsed.anchored:
+                group.path_regexes.append(parsed.regex)
+            elif _is_literal(body):
+                group.names.add(body)
+            elif body.startswith("*.") and _is_literal(body[1:]):
+                group.suffixes.add(body[1:])
+            else:
+                group.name_regexes.append(parsed.regex)
+
+        # Most paths match no rule at all and are rejected by one combined check.
+        # Negations can split a file into many groups, so blocks of groups also
+        # share a combined check to skip whole runs of rules at once.
+        self._any = _RuleGroup(False, False)
+        self._blocks = []
+        for start in range(0, len(groups), GROUPS_PER_BLOCK):
+            block = groups[start : start + GROUPS_PER_BLOCK]
+            combined = _RuleGroup(False, False)
+            for group in block:
+                combined.merge(group)
+                group.compile()
+            self._any.merge(combined)
+            combined.compile()
+            self._blocks.append((combined, block[::-1]))
+        self._any.compile()
+        self._blocks.reverse()
+
+    def __bool__(self):
+        return bool(self._blocks)
+
+    @classmethod
+    def from_file(cls, path, base=""):
+        """Compile the rules of the ignore file at path, or return None if it can't be read."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(f.readlines(), base)
+        except OSError:
+            return None
+
+    def match(self, rel_path, is_dir):
+        """Return True if ignored, False if re-included by a negation, None if no rule applies."""
+        if self.prefix:
+            if not rel_path.startswith(self.prefix):
+                return None
+            rel_path = rel_path[len(self.prefix) :]
+        name = rel_path.rpartition("/")[2]
+        suffixes = _name_suffixes(name)
+        if not self._any.match(rel_path, name, suffixes):
+            return None
+        for combined, groups in self._blocks:
+            if not combined.match(rel_path, name, suffixes):
+                continue
+            for group in groups:
+                if group.dir_only and not is_dir:
+                    continue
+                if group.match(rel_path, name, suffixes):
+                    return not group.negated
+        return None
+
+
+class GitIgnore:
+    """Ignore rules for a project tree, honouring nested .gitignore files per directory."""
+
+    def __init__(self, root=".", ignore_file=IGNORE_FILE):
+        self.root = root
+        self.ignore_file = ignore_file
+        self._chains = {"": self._extend((), "")}
+
+    def _extend(self, chain, rel_dir):
+        """Return chain with the ignore file of rel_dir appended, if it has one."""
+        path = os.path.join(self.root, rel_dir, self.ignore_file)
+        if not os.path.isfile(path):
+            return chain
+        matcher = IgnoreMatcher.from_file(path, rel_dir)
+        return chain + (matcher,) if matcher else chain
+
+    def chain_for(self, rel_dir, has_ignore_file=None):
+        """Return the matchers that apply inside rel_dir, deepest last."""
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            parent = rel_dir.rpartition("/")[0]
+            chain = self.chain_for(parent)
+            if has_ignore_file is not False:
+                chain = self._extend(chain, rel_dir)
+            self._chains[rel_dir] = chain
+        return chain
+
+    def is_ignored(self, rel_path, is_dir=False, chain=None):
+        """Check a single path (relative, "/"-separated) against the applicable rules."""
+        if is_dir and rel_path.rpartition("/")[2] in ALWAYS_IGNORED_DIRS:
+            return True
+        if chain is None:
+            chain = self.chain_for(rel_path.rpartition("/")[0])
+        # Deeper .gitignore files take precedence over the ones above them
+        for matcher in reversed(chain):
+            result = matcher.match(rel_path, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def is_path_ignored(self, rel_path, is_dir=False):
+        """Check a path and all of its parent directories, as git does for paths outside a walk."""
+        parts = rel_path.strip("/").split("/")
+        for i in range(1, len(parts)):
+            if self.is_ignored("/".join(parts[:i]), is_dir=True):
+                return True
+        return self.is_ignored("/".join(parts), is_dir)
+
+    def walk(self, top=None):
+        """Like os.walk, but prunes ignored directories in place and drops ignored files.
+
+        Yields (rel_dir, dirs, files) where rel_dir is "/"-separated and relative to the root.
+        """
+        top = self.root if top is None else top
+        for dirpath, dirs, files in os.walk(top):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            if rel_dir == ".":
+                rel_dir = ""
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            chain = self.chain_for(rel_dir, has_ignore_file=self.ignore_file in files)
+
+            # Pruning dirs in place stops os.walk from ever listing ignored directories
+            dirs[:] = [d for d in dirs if not self.is_ignored(prefix + d, True, chain)]
+            files = [f for f in files if not self.is_ignored(prefix + f, False, chain)]
+            yield rel_dir, dirs, files
@@ -0,0 +1,305 @@
+"""Outlines of source files: their classes, signatures and docstrings without the bodies.
+
+An outline stands in for a file that is too big to send whole. The extractor
+is picked by extension from OUTLINERS. Large batches are outlined in a
+process pool, since parsing holds the GIL, and every outline is remembered by
+the hash of the content it came from, so a resubmit only parses edited files.
+"""
+
+import ast
+import io
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from utils.bundle import FILE_SEPARATOR, limit_chunks
+from utils.file_reader import DEFAULT_READ_WORKERS, read_files
+from utils.profiling import count, profiled
+from utils.tokens import content_hash
+from utils.workspace import full_path
+
+OUTLINE = "outline"
+
+# Outlines remembered by Outliner before the oldest are dropped
+OUTLINE_CACHE_SIZE = 50_000
+
+# Fewer files than this are outlined in this process; starting workers costs more
+POOL_MIN_FILES = 64
+
+# Files read and outlined together by iter_outline_bundle
+OUTLINE_BATCH = 512
+
+# Module-level assignments to names like this are kept in Python outlines
+_CONSTANT = re.compile(r"[A-Z][A-Z0-9_]*$")
+
+# Longest value kept for such a constant; longer ones are shown as ...
+MAX_CONSTANT_LENGTH = 80
+
+# Lines kept when a file is reduced to its signatures: decorators and the
+# definition keywords of common languages
+_SIGNATURE = re.compile(
+    r"\s*(?:@\w|(?:export\s+)?(?:default\s+)?(?:async\s+)?"
+    r"(?:def|class|function|interface|struct|enum|trait|impl|fn|func|type)\s)"
+)
+
+
+def signature_outline(content):
+    """Reduce source code to its definition lines (decorators, def/class/function ...)."""
+    return "\n".join(
+        line.rstrip() for line in content.splitlines() if _SIGNATURE.match(line)
+    )
+
+
+def markdown_outline(content):
+    """Reduce a Markdown document to its headings, skipping fenced code."""
+    lines = []
+    fenced = False
+    for line in content.splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            fenced = not fenced
+        elif not fenced and line.startswith("#"):
+            lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def _docstring(node, indent):
+    doc = ast.get_docstring(node)
+    if not doc:
+        return []
+    quoted = '"""' + doc.replace('"""', '\\"\\"\\"') + '"""'
+    return [indent + line if line else "" for line in quoted.splitlines()]
+
+
+def _decorators(node, indent):
+    return [f"{indent}@{ast.unparse(d)}" for d in node.decorator_list]
+
+
+def _python_lines(body, indent, lines):
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if not indent and lines:
+                lines.append("")
+            keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            lines.extend(_decorators(node, indent))
+            lines.append(
+                f"{indent}{keyword} {node.name}({ast.unparse(node.args)}){returns}:"
+            )
+            lines.extend(_docstring(node, indent + "    ") or [indent + "    ..."])
+        elif isinstance(node, ast.ClassDef):
+            if not indent and lines:
+                lines.append("")
+            bases = [ast.unparse(base) for base in node.bases + node.keywords]
+            lines.extend(_decorators(node, indent))
+            lines.append(
+                f"{indent}class {node.name}"
+                + (f"({', '.join(bases)}):" if bases else ":")
+            )
+            start = len(lines)
+            lines.extend(_docstring(node, indent + "    "))
+            _python_lines(node.body, indent + "    ", lines)
+            if len(lines) == start:
+                lines.append(indent + "    ...")
+        elif not indent and isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if node.value is None or not all(
+                isinstance(t, ast.Name) and _CONSTANT.match(t.id) for t in targets
+            ):
+                continue
+            value = ast.unparse(node.value)
+            if len(value) > MAX_CONSTANT_LENGTH or "\n" in value:
+                value = "..."
+            names = " = ".join(t.id for t in targets)
+            lines.append(f"{names} = {value}")
+
+
+def python_outline(content):
+    """Reduce Python source to its docstrings, constants, classes and function signatures.
+
+    Falls back to signature_outline() for code that doesn't parse.
+    """
+    if not hasattr(ast, "unparse"):
+        return signature_outline(content)  # Python 3.8
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return signature_outline(content)
+    lines = _docstring(tree, "")
+    _python_lines(tree.body, "", lines)
+    return "\n".join(lines)
+
+
+# Outline extractors by file extension; anything else gets signature_outline().
+# An extractor takes the text and returns the outline; it must be a module-level
+# function so the process pool can send it to its workers.
+OUTLINERS = {
+    ".py": python_outline,
+    ".pyi": python_outline,
+    ".pyw": python_outline,
+    ".md": markdown_outline,
+    ".markdown": markdown_outline,
+}
+
+
+def outliner_for(path):
+    """Return the extractor for a file by its extension."""
+    return OUTLINERS.get(os.path.splitext(path)[1].lower(), signature_outline)
+
+
+def _apply(extractor, content):
+    return extractor(content)
+
+
+class Outliner:
+    """Outlines files with the extractor for their extension, remembering results by content hash.
+
+    Batches of POOL_MIN_FILES or more unseen files are spread over a process
+    pool, started on first use and kept until close(). Identical contents are
+    outlined once.
+    """
+
+    def __init__(self, workers=None, max_entries=OUTLINE_CACHE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_entries = max_entries
+        self._outlines = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def outline(self, path, content):
+        """Return the outline of one file's contents."""
+        return self.outline_many([(path, content)])[0]
+
+    def outline_many(self, files):
+        """Return the outlines of (path, content) pairs, in order."""
+        outlines = [None] * len(files)
+        missing = {}  # (extractor, hash) -> (content, positions in files)
+        with self._lock:
+            for i, (path, content) in enumerate(files):
+                key = (outliner_for(path), content_hash(content))
+                outline = self._outlines.get(key)
+                if outline is not None:
+                    self._outlines.move_to_end(key)
+                    outlines[i] = outline
+                else:
+                    missing.setdefault(key, (content, []))[1].append(i)
+
+        keys = list(missing)
+        extractors = [extractor for extractor, _ in keys]
+        contents = [missing[key][0] for key in keys]
+        for key, outline in zip(keys, self._run(extractors, contents)):
+            for i in missing[key][1]:
+                outlines[i] = outline
+            with self._lock:
+                self._outlines[key] = outline
+                if len(self._outlines) > self.max_entries:
+                    self._outlines.popitem(last=False)
+        return outlines
+
+    @profiled("outline")
+    def _run(self, extractors, contents):
+        count(files=len(contents))
+        if len(contents) >= POOL_MIN_FILES and self.workers > 1:
+            try:
+                if self._pool is None:
+                    # Spawned, not forked: the GUI process has threads running
+                    self._pool = ProcessPoolExecutor(
+                        self.workers, mp_context=get_context("spawn")
+                    )
+                chunksize = max(1, len(contents) // (self.workers * 4))
+                return list(
+                    self._pool.map(_apply, extractors, contents, chunksize=chunksize)
+                )
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Failed to outline in worker processes: {e}", file=sys.stderr)
+                self.close()
+                self.workers = 1  # Don't try again
+        return list(map(_apply, extractors, contents))
+
+    def close(self):
+        """Stop the worker processes, if any were started."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def iter_outline_bundle(
+    paths,
+    root=".",
+    focus=None,
+    outliner=None,
+    max_size=None,
+    stats=None,
+    workers=DEFAULT_READ_WORKERS,
+    cache=None,
+):
+    """Yield a bundle in which every file is outlined, except the focus files, which go whole.
+
+    focus is a predicate on relative paths, like FileFilter.matches. Outlines
+    are labelled "(outline)". If stats is a dict it receives "files", "size",
+    "outlined", "saved" (characters the outlines left out), "truncated" and
+    "errors".
+    """
+    paths = list(paths)
+    stats = {} if stats is None else stats
+    stats.update(files=0, size=0, outlined=0, saved=0, errors=[])
+    own_outliner = outliner is None
+    outliner = Outliner() if own_outliner else outliner
+    chunks = _outline_chunks(paths, root, focus, outliner, stats, workers, cache)
+    try:
+        yield from limit_chunks(chunks, max_size, stats)
+    finally:
+        if own_outliner:
+            outliner.close()
+
+
+def _outline_chunks(paths, root, focus, outliner, stats, workers, cache):
+    results = read_files(
+        (full_path(root, path) for path in paths), workers, cache=cache, strip=True
+    )
+    try:
+        batch = []
+        for path, result in zip(paths, results):
+            if result.error is not None:
+                stats["errors"].append((path, result.error))
+                continue
+            batch.append((path, result.content))
+            if len(batch) >= OUTLINE_BATCH:
+                yield from _outline_batch(batch, focus, outliner, stats)
+                batch = []
+        yield from _outline_batch(batch, focus, outliner, stats)
+    finally:
+        results.close()
+
+
+def _outline_batch(batch, focus, outliner, stats):
+    outlined = [
+        (path, content) for path, content in batch if not (focus and focus(path))
+    ]
+    outlines = dict(
+        zip((path for path, _ in outlined), outliner.outline_many(outlined))
+    )
+    for path, content in batch:
+        header = f"# {path}"
+        if path in outlines:
+            header += f" ({OUTLINE})"
+            stats["outlined"] += 1
+            stats["saved"] += len(content) - len(outlines[path])
+            content = outlines[path]
+        chunk = (FILE_SEPARATOR if stats["files"] else "") + header + "\n" + content
+        stats["files"] += 1
+        stats["size"] += len(chunk)
+        yield chunk
+
+
+def build_outline_bundle(paths, root=".", focus=None, **kwargs):
+    """Return the outline bundle as one string along with its stats dict."""
+    stats = {}
+    buffer = io.StringIO()
+    for chunk in iter_outline_bundle(paths, root, focus, stats=stats, **kwargs):
+        buffer.write(chunk)
+    return buffer.getvalue(), stats
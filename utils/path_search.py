@@ -0,0 +1,119 @@
+"""Substring and fuzzy search over the relative paths of a project.
+
+The paths are lowercased and joined into one newline-separated text, so a
+query is a handful of str.find or regex calls over a single string, run in C.
+That costs about a byte per character of the paths, where a trigram index
+would need a set entry per character, and is fast enough at 500k paths.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+# The search box waits this long after the last keystroke before searching
+SEARCH_DELAY = 0.15
+
+# Searches stop after this many matches; the tree only opens folders for these
+MAX_MATCHES = 500
+
+SUBSTRING, FUZZY = "substring", "fuzzy"
+
+
+def fuzzy_pattern(word):
+    """Compile a regex finding word's characters in order within one path ("fsui" in "file_selector_ui")."""
+    return re.compile("[^\n]*?".join(re.escape(c) for c in word))
+
+
+class PathSearch:
+    """A search over a fixed list of relative paths; build a new one when the paths change."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.text = "\n".join(self.paths).lower()
+        # Offset of each path in text, for mapping a hit back to its path
+        self.starts = list(accumulate((len(p) + 1 for p in self.paths), initial=0))
+        self._last = None  # (query, mode, path numbers, complete) of the last search
+
+    def __len__(self):
+        return len(self.paths)
+
+    def reset(self):
+        """Forget the previous query, so the next search scans every path."""
+        self._last = None
+
+    def search(self, query, limit=MAX_MATCHES):
+        """Return (sorted matching paths, whether that is all of them) for a query.
+
+        Every space-separated word of the query must appear in a path. If no
+        path contains them as substrings, the words are matched fuzzily: their
+        characters in order, with anything in between. A query that extends
+        the previous one is answered from the previous matches when those
+        were complete and can't have missed a match: substring matches are
+        fuzzy matches too, so fuzzy ones narrow both passes, substring ones
+        only the first.
+        """
+        words = query.lower().split()
+        if not words:
+            self.reset()
+            return [], True
+
+        last = self._last
+        reuse = last is not None and last[3] and query.startswith(last[0])
+        complete = True
+        mode = SUBSTRING
+        if reuse:
+            found = self._filter(last[2], words, mode, limit)
+        else:
+            found, complete = self._scan(words, mode, limit)
+        if not found:
+            mode = FUZZY
+            if reuse and last[1] == FUZZY:
+                found = self._filter(last[2], words, mode, limit)
+            else:
+                found, complete = self._scan(words, mode, limit)
+        complete = complete and len(found) < limit
+
+        self._last = (query, mode, found, complete)
+        return sorted(self.paths[i] for i in found), complete
+
+    def _matcher(self, words, mode):
+        """Return a predicate for a lowercased path containing every word."""
+        if mode == SUBSTRING:
+            return lambda path: all(word in path for word in words)
+        patterns = [fuzzy_pattern(word) for word in words]
+        return lambda path: all(p.search(path) for p in patterns)
+
+    def _path_text(self, i):
+        return self.text[self.starts[i] : self.starts[i + 1] - 1]
+
+    def _filter(self, candidates, words, mode, limit):
+        matches = self._matcher(words, mode)
+        return [i for i in candidates if matches(self._path_text(i))][:limit]
+
+    def _scan(self, words, mode, limit):
+        """Find paths through the text, returning (path numbers, whether the text was exhausted)."""
+        # The longest word is likely the rarest, so it drives the scan
+        words = sorted(words, key=len, reverse=True)
+        first, rest = words[0], words[1:]
+        matches = self._matcher(rest, mode) if rest else None
+        text, starts = self.text, self.starts
+        if mode == SUBSTRING:
+            find = text.find
+        else:
+            pattern = fuzzy_pattern(first)
+
+            def find(_, pos):
+                match = pattern.search(text, pos)
+                return match.start() if match else -1
+
+        found, pos = [], 0
+        while True:
+            hit = find(first, pos)
+            if hit == -1:
+                return found, True
+            i = bisect_right(starts, hit) - 1
+            pos = starts[i + 1]  # Each path is reported once
+            if matches is None or matches(self._path_text(i)):
+                found.append(i)
+                if len(found) >= limit:
+                    return found, False
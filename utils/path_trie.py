@@ -0,0 +1,222 @@
+import sys
+
+# Check states, numerically equal to Qt.CheckState so the model can pass them through
+UNCHECKED, PARTIALLY_CHECKED, CHECKED = 0, 1, 2
+
+
+class TrieNode:
+    """One path segment. Folders keep an ordered list of children, files have None.
+
+    checked and total count the checked and all files at or below the node, so a
+    folder's tri-state is a constant-time read and a toggle only walks the ancestors.
+    tokens and checked_tokens aggregate estimated token counts the same way.
+    """
+
+    __slots__ = (
+        "name",
+        "parent",
+        "children",
+        "lookup",
+        "row",
+        "fetched",
+        "checked",
+        "total",
+        "tokens",
+        "checked_tokens",
+    )
+
+    def __init__(self, name, parent=None, is_folder=False):
+        self.name = sys.intern(name)  # Repeated names like "src" share one string
+        self.parent = parent
+        self.children = [] if is_folder else None
+        self.lookup = {} if is_folder else None  # name -> child
+        self.row = 0  # Position in parent.children
+        self.fetched = 0  # Number of children exposed to a view so far
+        self.checked = 0
+        self.total = 0 if is_folder else 1
+        self.tokens = 0
+        self.checked_tokens = 0
+
+    @property
+    def is_folder(self):
+        return self.children is not None
+
+    @property
+    def state(self):
+        if self.checked == 0:
+            return UNCHECKED
+        return CHECKED if self.checked == self.total else PARTIALLY_CHECKED
+
+    def path(self):
+        """Return the "/"-separated path of this node from the trie root."""
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return "/".join(reversed(parts))
+
+    def add_child(self, name, is_folder):
+        child = TrieNode(name, self, is_folder)
+        child.row = len(self.children)
+        self.children.append(child)
+        self.lookup[child.name] = child
+        return child
+
+
+class PathTrie:
+    """A compact tree of relative file paths, one node per path segment."""
+
+    def __init__(self):
+        self.root = TrieNode("", is_folder=True)
+        self.file_count = 0
+
+    def insert(self, path, state=UNCHECKED, grown=None, tokens=0):
+        """Add a "/"-separated file path with its token estimate and return its node.
+
+        If grown is a dict, every folder that gains a child is recorded in it
+        mapped to its child count before this insert, unless already present.
+        """
+        node = self.root
+        parts = path.split("/")
+        for i, part in enumerate(parts):
+            child = node.lookup.get(part)
+            if child is None:
+                if grown is not None and node not in grown:
+                    grown[node] = len(node.children)
+                child = node.add_child(part, is_folder=i < len(parts) - 1)
+                if child.children is None:
+                    self.file_count += 1
+                    checked = 1 if state == CHECKED else 0
+                    child.checked = checked
+                    child.tokens = tokens
+                    child.checked_tokens = tokens * checked
+                    self._add_to_ancestors(child, 1, checked, tokens, tokens * checked)
+            node = child
+        return node
+
+    def _add_to_ancestors(self, node, total, checked, tokens, checked_tokens):
+        parent = node.parent
+        while parent is not None:
+            parent.total += total
+            parent.checked += checked
+            parent.tokens += tokens
+            parent.checked_tokens += checked_tokens
+            parent = parent.parent
+
+    def set_tokens(self, node, tokens):
+        """Replace a file's token estimate (e.g. with a real count) and update its ancestors."""
+        delta = tokens - node.tokens
+        if not delta:
+            return
+        checked_delta = delta if node.checked else 0
+        node.tokens = tokens
+        node.checked_tokens += checked_delta
+        self._add_to_ancestors(node, 0, 0, delta, checked_delta)
+
+    def remove(self, paths):
+        """Remove files by path, along with the folders they leave empty.
+
+        Ancestor counters are updated and the nodes are dropped from their
+        parents' lookups, but not yet from the children lists, so the caller
+        can announce the row removals. Returns {folder: set of removed children}.
+        """
+        removed = {}
+        for path in paths:
+            node = self.find(path)
+            if node is None or node.children is not None:
+                continue
+            self.file_count -= 1
+            self._add_to_ancestors(
+                node, -1, -node.checked, -node.tokens, -node.checked_tokens
+            )
+            while node.parent is not None:
+                parent = node.parent
+                del parent.lookup[node.name]
+                removed.setdefault(parent, set()).add(node)
+                if parent.total or parent.parent is None:
+                    break
+                node = parent
+        return removed
+
+    def find(self, path):
+        """Return the node for a "/"-separated path, or None."""
+        node = self.root
+        for part in path.split("/"):
+            if node.lookup is None:
+                return None
+            node = node.lookup.get(part)
+            if node is None:
+                return None
+        return node
+
+    def iter_files(self, node=None):
+        """Yield the file nodes below node (default: the whole trie), depth first."""
+        stack = [node or self.root]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+    def set_state(self, node, state):
+        """Check or uncheck node with its whole subtree and update the ancestor counters.
+
+        Returns the ancestors whose state changed, nearest first.
+        """
+        checked = state == CHECKED
+        delta = (node.total if checked else 0) - node.checked
+        if not delta:
+            return []
+        tokens_delta = (node.tokens if checked else 0) - node.checked_tokens
+
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current.checked = current.total if checked else 0
+            current.checked_tokens = current.tokens if checked else 0
+            if current.children:
+                stack.extend(
+                    c
+                    for c in current.children
+                    if c.checked != (c.total if checked else 0)
+                )
+
+        changed = []
+        parent = node.parent
+        while parent is not None:
+            before = parent.state
+            parent.checked += delta
+            parent.checked_tokens += tokens_delta
+            if parent.parent is not None and parent.state != before:
+                changed.append(parent)
+            parent = parent.parent
+        return changed
+
+    def iter_checked_files(self, node=None):
+        """Yield the checked file nodes, skipping unchecked folders entirely."""
+        stack = [node or self.root]
+        while stack:
+            node = stack.pop()
+            if not node.checked:
+                continue
+            if node.children is None:
+                yield node
+            else:
+                stack.extend(reversed(node.children))
+
+    def sort(self, key=None, folders=None):
+        """Sort children (folders first, then by name) and renumber rows.
+
+        With folders, only those folders are sorted; otherwise the whole trie is.
+        """
+        key = key or (lambda node: (node.children is None, node.name.lower()))
+        stack = [self.root] if folders is None else list(folders)
+        while stack:
+            node = stack.pop()
+            node.children.sort(key=key)
+            for row, child in enumerate(node.children):
+                child.row = row
+                if child.children is not None and folders is None:
+                    stack.append(child)
@@ -0,0 +1,215 @@
+"""Timing instrumentation: named spans around the stages of a scan, tree build and submit.
+
+Stages are wrapped in span() or decorated with profiled(), and report what
+they handled with count(), e.g. count(files=n). Nothing is recorded until a
+Profiler is enabled, and until then each of these costs one global lookup.
+A Profiler keeps per-stage totals for the debug panel and the spans
+themselves for a trace file in the Chrome trace event format, which
+chrome://tracing and https://ui.perfetto.dev open.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Spans kept for the trace file; totals keep counting past this
+MAX_EVENTS = 200_000
+
+_profiler = None  # The enabled Profiler, if any
+_local = threading.local()  # Stack of open spans per thread
+
+
+class Profiler:
+    """Records finished spans and keeps per-name totals."""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.started = time.perf_counter()
+        self.events = deque(maxlen=max_events)
+        self.totals = {}  # name -> [calls, seconds, longest, {count: sum}]
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end, counts):
+        with self._lock:
+            self.events.append((name, start, end, threading.get_ident(), counts))
+            total = self.totals.get(name)
+            if total is None:
+                total = self.totals[name] = [0, 0.0, 0.0, {}]
+            total[0] += 1
+            total[1] += end - start
+            total[2] = max(total[2], end - start)
+            for key, value in counts.items():
+                total[3][key] = total[3].get(key, 0) + value
+
+    def summary(self):
+        """Return (name, calls, seconds, longest, counts) per stage, slowest first."""
+        with self._lock:
+            rows = [
+                (name, *total[:3], dict(total[3]))
+                for name, total in self.totals.items()
+            ]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.totals.clear()
+
+    def trace(self):
+        """Return the recorded spans as a Chrome trace (a dict ready for json.dump)."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": round((start - self.started) * 1e6, 1),
+                    "dur": round((end - start) * 1e6, 1),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": counts,
+                }
+                for name, start, end, tid, counts in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f)
+
+
+class Span:
+    """One timed stage; counts added while it is the innermost open span are kept with it."""
+
+    __slots__ = ("profiler", "name", "counts", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.counts = {}
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        _local.stack.pop()
+        self.profiler.record(self.name, self.start, end, self.counts)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing a stage under name, when a Profiler is enabled."""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_SPAN
+    return Span(profiler, name)
+
+
+def profiled(name):
+    """Decorator timing every call of a function as a span called name."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return function(*args, **kwargs)
+            with Span(_profiler, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def count(**counts):
+    """Add to the counts of the innermost open span on this thread, e.g. count(files=120)."""
+    if _profiler is None:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        span_counts = stack[-1].counts
+        for key, value in counts.items():
+            span_counts[key] = span_counts.get(key, 0) + value
+
+
+def enable(profiler=None):
+    """Start recording into profiler (a new one by default) and return it."""
+    global _profiler
+    _profiler = profiler or Profiler()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def active_profiler():
+    """Return the enabled Profiler, or None."""
+    return _profiler
+
+
+def format_summary(rows):
+    """Format Profiler.summary() rows as a text table."""
+    lines = [f"{'stage':<24} {'calls':>7} {'total ms':>10} {'max ms':>9}  counts"]
+    for name, calls, seconds, longest, counts in rows:
+        counted = ", ".join(f"{key} {value:,}" for key, value in counts.items())
+        lines.append(
+            f"{name:<24} {calls:>7,} {seconds * 1000:>10.1f} {longest * 1000:>9.1f}  {counted}".rstrip()
+        )
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiling_session(trace_path=None, profile_path=None):
+    """Record spans into a trace file and/or run cProfile over the block.
+
+    Yields the enabled Profiler, or None without trace_path. cProfile only
+    sees the calling thread; its stats are written to profile_path for
+    pstats or snakeviz.
+    """
+    profiler = enable() if trace_path else None
+    python_profiler = cProfile.Profile() if profile_path else None
+    if python_profiler is not None:
+        python_profiler.enable()
+    try:
+        yield profiler
+    finally:
+        if python_profiler is not None:
+            python_profiler.disable()
+            try:
+                python_profiler.dump_stats(profile_path)
+            except OSError as e:
+                print(f"Failed to write the profile: {e}", file=sys.stderr)
+        if profiler is not None:
+            disable()
+            try:
+                profiler.write_trace(trace_path)
+            except OSError as e:
+                print(f"Failed to write the trace: {e}", file=sys.stderr)
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+
+from utils.scanner import FileEntry, scan_directory
+from utils.state_store import StateStoreError, open_database, project_key
+
+SCAN_CACHE_FILE = os.path.join(tempfile.gettempdir(), "spoon_scan_cache.sqlite3")
+
+MIGRATIONS = {
+    1: [
+        """CREATE TABLE projects (
+            id INTEGER PRIMARY KEY,
+            root TEXT NOT NULL UNIQUE
+        )""",
+        # One row per folder: its mtime when listed, the (mtime, size) of the
+        # ignore file it holds, and its non-ignored files and subfolders as JSON
+        """CREATE TABLE folders (
+            project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            path TEXT NOT NULL,
+            mtime INTEGER NOT NULL,
+            ignore_signature TEXT,
+            files TEXT NOT NULL,
+            subfolders TEXT NOT NULL,
+            PRIMARY KEY (project_id, path)
+        ) WITHOUT ROWID""",
+    ],
+}
+
+# files and subfolders are kept as loaded (JSON) until the folder is visited
+FolderRecord = namedtuple("FolderRecord", "mtime ignore_signature files subfolders")
+
+
+def _ignore_signature(folder_path, ignore_file):
+    """Return "mtime:size" of the folder's ignore file, or None if it has none."""
+    try:
+        stat = os.stat(os.path.join(folder_path, ignore_file))
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ScanCache:
+    """Folder listings of one project from its last scan, reused while folder mtimes stand still.
+
+    Adding, removing or renaming an entry changes its folder's mtime, so a
+    folder whose mtime matches the cache is not listed again. Editing a file
+    does not, so cached sizes and mtimes of edited files can be stale until
+    the folder changes; the watcher and content cache stat files themselves.
+    A changed, new or deleted ignore file can change what is visible anywhere
+    below its folder, so the whole subtree is listed again.
+    """
+
+    def __init__(self, root, path=SCAN_CACHE_FILE):
+        self.root = root
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._key = project_key(root)
+        self._visited = {}  # folder -> FolderRecord seen or listed by this scan
+        self._listed = set()  # Folders whose record changed and must be written
+        self._lock = threading.Lock()
+        self._db = open_database(path, MIGRATIONS, check_same_thread=False)
+        self._records = self._load()
+
+    def _load(self):
+        row = self._db.execute(
+            "SELECT id FROM projects WHERE root = ?", (self._key,)
+        ).fetchone()
+        if row is None:
+            return {}
+        return {
+            path: FolderRecord(mtime, signature, files, subfolders)
+            for path, mtime, signature, files, subfolders in self._db.execute(
+                "SELECT path, mtime, ignore_signature, files, subfolders"
+                " FROM folders WHERE project_id = ?",
+                row,
+            )
+        }
+
+    def __len__(self):
+        return len(self._records)
+
+    def close(self):
+        self._db.close()
+
+    def visit(self, ignore, rel_dir, stale=False):
+        """List one folder like scan_directory, from the cache when it is unchanged.
+
+        Returns (files, subfolders, stale); the returned stale flag must be
+        passed on when visiting the subfolders.
+        """
+        folder_path = os.path.join(self.root, rel_dir)
+        try:
+            mtime = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return [], [], stale
+
+        record = None if stale else self._records.get(rel_dir)
+        if record is not None and record.mtime == mtime:
+            signature = record.ignore_signature
+            if signature is None or signature == _ignore_signature(
+                folder_path, ignore.ignore_file
+            ):
+                prefix = f"{rel_dir}/" if rel_dir else ""
+                files = [
+                    FileEntry(prefix + name, size, file_mtime)
+                    for name, size, file_mtime in json.loads(record.files)
+                ]
+                subfolders = [prefix + name for name in json.loads(record.subfolders)]
+                with self._lock:
+                    self.hits += 1
+                    self._visited[rel_dir] = record
+                return files, subfolders, False
+
+        files, subfolders = scan_directory(self.root, ignore, rel_dir)
+        signature = _ignore_signature(folder_path, ignore.ignore_file)
+        # Cached listings below were filtered by ignore rules that may be gone
+        stale = stale or record is None or record.ignore_signature != signature
+        start = len(rel_dir) + 1 if rel_dir else 0
+        record = FolderRecord(
+            mtime,
+            signature,
+            json.dumps([(e.path[start:], e.size, e.mtime) for e in files]),
+            json.dumps([d[start:] for d in subfolders]),
+        )
+        with self._lock:
+            self.misses += 1
+            self._visited[rel_dir] = record
+            self._listed.add(rel_dir)
+        return files, subfolders, stale
+
+    def save(self):
+        """Write the folders listed by this scan and forget the ones it didn't reach."""
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO projects (root) VALUES (?)", (self._key,)
+                )
+                (project_id,) = self._db.execute(
+                    "SELECT id FROM projects WHERE root = ?", (self._key,)
+                ).fetchone()
+                self._db.executemany(
+                    "DELETE FROM folders WHERE project_id = ? AND path = ?",
+                    (
+                        (project_id, path)
+                        for path in self._records.keys() - self._visited
+                    ),
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO folders"
+                    " (project_id, path, mtime, ignore_signature, files, subfolders)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    ((project_id, path, *self._visited[path]) for path in self._listed),
+                )
+        except sqlite3.Error as e:
+            # The next scan is just slower
+            print(f"Failed to save scan cache: {e}", file=sys.stderr)
+        self._records = self._visited
+        self._visited, self._listed = {}, set()
+
+
+def open_scan_cache(root, path=SCAN_CACHE_FILE):
+    """Return the ScanCache of root, or None if the cache database can't be used."""
+    try:
+        return ScanCache(root, path)
+    except (sqlite3.Error, StateStoreError) as e:
+        print(f"Scan cache is not available: {e}", file=sys.stderr)
+        return None
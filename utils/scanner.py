@@ -0,0 +1,271 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from utils.gitignore import GitIgnore
+from utils.profiling import count, profiled
+from utils.workspace import Workspace, full_path
+
+# Same default as ThreadPoolExecutor: directory listing is I/O bound
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Streaming scans hand files over once this many are found or this many
+# seconds have passed, whichever comes first
+BATCH_SIZE = 2000
+BATCH_INTERVAL = 0.1
+
+# path is relative to the scanned root (qualified by root name in a Workspace)
+# and "/"-separated; size and mtime come from the DirEntry stat cache so no
+# further stat calls are needed
+FileEntry = namedtuple("FileEntry", "path size mtime")
+
+
+def file_suffix(name):
+    """Return the suffix of a file name the way Path.suffix does (".py", or "" for ".bashrc")."""
+    # Same result as os.path.splitext for "/"-separated paths, without its overhead
+    name = name[name.rfind("/") + 1 :]
+    dot = name.rfind(".")
+    if dot <= 0 or not name[:dot].lstrip("."):
+        return ""
+    return name[dot:]
+
+
+class ProjectIndex:
+    """Every non-ignored file of a project, bucketed by suffix for instant extension switches."""
+
+    def __init__(self, root="."):
+        self.root = root
+        self.by_suffix = {}  # suffix -> {path: FileEntry}
+        self.by_folder = {}  # folder -> set of file names directly in it
+        self._sorted = {}  # suffix -> sorted list of Paths, built on first use
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.by_suffix.values())
+
+    def add(self, entries):
+        """Add FileEntry records to the index, replacing any with the same path."""
+        by_suffix, by_folder = self.by_suffix, self.by_folder
+        suffixes = set()
+        for entry in entries:
+            folder, _, name = entry.path.rpartition("/")
+            suffix = file_suffix(name)
+            suffixes.add(suffix)
+            files = by_suffix.get(suffix)
+            if files is None:
+                files = by_suffix[suffix] = {}
+            files[entry.path] = entry
+            names = by_folder.get(folder)
+            if names is None:
+                names = by_folder[folder] = set()
+            names.add(name)
+        for suffix in suffixes:
+            self._sorted.pop(suffix, None)
+
+    def remove(self, paths):
+        """Remove files by relative path and return the FileEntry records that were removed."""
+        removed = []
+        for path in paths:
+            suffix = file_suffix(path)
+            entry = self.by_suffix.get(suffix, {}).pop(path, None)
+            if entry is None:
+                continue
+            removed.append(entry)
+            folder, _, name = path.rpartition("/")
+            names = self.by_folder[folder]
+            names.discard(name)
+            if not names:
+                del self.by_folder[folder]
+            self._sorted.pop(suffix, None)
+        return removed
+
+    def get(self, path):
+        """Return the FileEntry for a relative path, or None."""
+        return self.by_suffix.get(file_suffix(path), {}).get(path)
+
+    def suffixes(self):
+        """Return the suffixes present in the project, most common first."""
+        return sorted(self.by_suffix, key=lambda s: -len(self.by_suffix[s]))
+
+    def entries(self, extension=None):
+        """Return the FileEntry records with the given suffix, or all of them."""
+        if extension is None:
+            return [e for entries in self.by_suffix.values() for e in entries.values()]
+        return list(self.by_suffix.get(extension, {}).values())
+
+    def files(self, extension):
+        """Return the sorted relative Paths of the files with the given suffix."""
+        files = self._sorted.get(extension)
+        if files is None:
+            files = sorted(Path(p) for p in self.by_suffix.get(extension, ()))
+            self._sorted[extension] = files
+        return files
+
+
+def scan_directory(root, ignore, rel_dir):
+    """List one directory; return (FileEntry records, relative subdirectories to scan)."""
+    try:
+        with os.scandir(full_path(root, rel_dir)) as it:
+            entries = list(it)
+    except OSError:
+        return [], []
+
+    has_ignore_file = any(entry.name == ignore.ignore_file for entry in entries)
+    chain = ignore.chain_for(rel_dir, has_ignore_file)
+    prefix = f"{rel_dir}/" if rel_dir else ""
+
+    files, dirs = [], []
+    for entry in entries:
+        rel_path = prefix + entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not ignore.is_ignored(rel_path, True, chain):
+                    dirs.append(rel_path)
+            elif entry.is_file() and not ignore.is_ignored(rel_path, False, chain):
+                stat = entry.stat()
+                files.append(FileEntry(rel_path, stat.st_size, stat.st_mtime))
+        except OSError:
+            continue  # Vanished or unreadable while we were listing
+    return files, dirs
+
+
+class _Batcher:
+    """Buffers scan results for on_batch, flushing by size or elapsed time."""
+
+    def __init__(self, on_batch):
+        self.on_batch = on_batch
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def add(self, files):
+        self.buffer.extend(files)
+        now = time.monotonic()
+        if len(self.buffer) >= BATCH_SIZE or now - self.last_flush >= BATCH_INTERVAL:
+            self.flush(now)
+
+    def flush(self, now=None):
+        if self.buffer:
+            self.on_batch(self.buffer)
+            self.buffer = []
+        self.last_flush = now or time.monotonic()
+
+
+@profiled("scan")
+def scan_project(
+    root=".",
+    workers=DEFAULT_WORKERS,
+    ignore=None,
+    on_batch=None,
+    should_stop=None,
+    cache=None,
+):
+    """Collect every non-ignored file under root into a ProjectIndex in a single pass.
+
+    Subdirectories are fanned out over a thread pool of the given size;
+    workers=1 scans on the calling thread. If on_batch is given it is called
+    with lists of FileEntry records as they are found. If should_stop returns
+    True the scan ends early and returns what was found so far. With a
+    ScanCache, folders unchanged since the last scan are not listed again, and
+    the cache is saved once a complete scan is done.
+    """
+    ignore = ignore or GitIgnore(root)
+    index = ProjectIndex(root)
+    batcher = _Batcher(on_batch) if on_batch else None
+    should_stop = should_stop or (lambda: False)
+
+    if cache is None:
+
+        def visit(rel_dir, stale):
+            return (*scan_directory(root, ignore, rel_dir), stale)
+
+    else:
+
+        def visit(rel_dir, stale):
+            return cache.visit(ignore, rel_dir, stale)
+
+    def collect(files):
+        index.add(files)
+        if batcher:
+            batcher.add(files)
+
+    if workers <= 1:
+        pending = [("", False)]
+        while pending and not should_stop():
+            files, dirs, stale = visit(*pending.pop())
+            collect(files)
+            pending.extend((d, stale) for d in dirs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(visit, "", False)}
+            while pending:
+                if should_stop():
+                    for future in pending:
+                        future.cancel()
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, dirs, stale = future.result()
+                    collect(files)
+                    pending.update(pool.submit(visit, d, stale) for d in dirs)
+
+    if not should_stop():
+        if batcher:
+            batcher.flush()
+        if cache is not None:
+            cache.save()
+    count(files=len(index))
+    return index
+
+
+def _scan_root(root, workers, on_batch, should_stop, open_cache):
+    # Opened on the scanning thread, since a SQLite connection belongs to the
+    # thread using it
+    cache = open_cache(root) if open_cache is not None else None
+    try:
+        return scan_project(
+            root, workers, on_batch=on_batch, should_stop=should_stop, cache=cache
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def _qualified(name, entries):
+    prefix = f"{name}/"
+    return [FileEntry(prefix + path, size, mtime) for path, size, mtime in entries]
+
+
+def scan_workspace(
+    root=".", workers=DEFAULT_WORKERS, on_batch=None, should_stop=None, open_cache=None
+):
+    """Scan a project root, or every root of a Workspace, into one ProjectIndex.
+
+    The roots of a Workspace are scanned at the same time, each with its own
+    ignore rules, index and scan cache, and the workers are shared out between
+    them; their files are merged under the root names into an index whose root
+    is the Workspace. open_cache(folder) returns the ScanCache of a root, or
+    None; without it nothing is cached. on_batch works as for scan_project(),
+    but may be called from several threads at once.
+    """
+    if not isinstance(root, Workspace):
+        return _scan_root(root, workers, on_batch, should_stop, open_cache)
+
+    def scan(name, folder):
+        batch = None
+        if on_batch is not None:
+            batch = lambda entries: on_batch(_qualified(name, entries))
+        index = _scan_root(folder, share, batch, should_stop, open_cache)
+        return _qualified(name, index.entries())
+
+    index = ProjectIndex(root)
+    share = max(1, workers // len(root))
+    if workers <= 1:
+        for name, folder in root.roots.items():
+            index.add(scan(name, folder))
+    else:
+        with ThreadPoolExecutor(max_workers=len(root)) as pool:
+            futures = [pool.submit(scan, *item) for item in root.roots.items()]
+            for future in futures:
+                index.add(future.result())
+    return index
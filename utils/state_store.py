@@ -0,0 +1,368 @@
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from utils.workspace import Workspace
+
+STATE_FILE = os.path.join(tempfile.gettempdir(), "spoon_state.sqlite3")
+
+# Where versions before the database kept a single state for every project
+LEGACY_STATE_FILE = os.path.join(tempfile.gettempdir(), "spoon_app_state.pickle")
+
+DEFAULT_STATE = {
+    "selected_files": set(),
+    "select_all_state": False,
+    "file_extension": ".py",
+}
+
+# When the schema changes, add the statements that upgrade the previous
+# version to MIGRATIONS under the next number
+MIGRATIONS = {
+    1: [
+        """CREATE TABLE projects (
+            id INTEGER PRIMARY KEY,
+            root TEXT NOT NULL UNIQUE,
+            select_all INTEGER NOT NULL DEFAULT 0,
+            extension TEXT NOT NULL DEFAULT '.py',
+            updated REAL NOT NULL DEFAULT 0
+        )""",
+        # Selected paths are stored prefix-compressed: each folder once, and
+        # each file as a (folder, name) row
+        """CREATE TABLE folders (
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            path TEXT NOT NULL,
+            UNIQUE (project_id, path)
+        )""",
+        """CREATE TABLE selected (
+            folder_id INTEGER NOT NULL REFERENCES folders(id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            PRIMARY KEY (folder_id, name)
+        ) WITHOUT ROWID""",
+    ],
+    2: [
+        # Every file of the last submit with a hash of its contents and its
+        # (mtime, size) signature, so the next submit can send only changes
+        """CREATE TABLE submitted (
+            project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            path TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (project_id, path)
+        ) WITHOUT ROWID""",
+    ],
+}
+
+
+class StateStoreError(Exception):
+    """The state database can't be used, e.g. it was written by a newer version."""
+
+
+def open_database(path, migrations, check_same_thread=True):
+    """Open a SQLite database and bring its schema up to date.
+
+    migrations maps each schema version to the statements that create it from
+    the previous one; PRAGMA user_version records the version reached.
+    """
+    db = sqlite3.connect(path, check_same_thread=check_same_thread)
+    try:
+        db.execute("PRAGMA foreign_keys = ON")
+        db.execute("PRAGMA journal_mode = WAL")
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        latest = max(migrations)
+        if version > latest:
+            raise StateStoreError(
+                f"{path} has schema version {version}, "
+                f"this version only understands up to {latest}"
+            )
+        with db:
+            for target in range(version + 1, latest + 1):
+                for statement in migrations[target]:
+                    db.execute(statement)
+                db.execute(f"PRAGMA user_version = {target}")
+    except Exception:
+        db.close()
+        raise
+    return db
+
+
+def project_key(root):
+    """Normalize a project root so the same folder always maps to the same state.
+
+    A Workspace is keyed by its folders in order, since that fixes its root names.
+    """
+    if isinstance(root, Workspace):
+        return "\n".join(project_key(folder) for folder in root.roots.values())
+    return os.path.normcase(os.path.realpath(root))
+
+
+def split_path(path):
+    """Split a "/"-separated relative path into (folder, name); folder is "" at the top."""
+    folder, _, name = path.rpartition("/")
+    return folder, name
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Unpickles the old state file without running anything it names.
+
+    Only the containers and paths the old versions wrote are allowed.
+    """
+
+    ALLOWED = {
+        ("builtins", "set"),
+        ("builtins", "frozenset"),
+        ("__builtin__", "set"),  # As protocols 0-2 name them
+        ("__builtin__", "frozenset"),
+        ("pathlib", "Path"),
+        ("pathlib", "PosixPath"),
+        ("pathlib", "WindowsPath"),
+        ("pathlib", "PurePosixPath"),
+        ("pathlib", "PureWindowsPath"),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed")
+        return super().find_class(module, name)
+
+
+def _legacy_path(entry):
+    """Turn a selected file of the old state, a path or a (folder, name) pair, into a relative "/" path."""
+    if isinstance(entry, tuple):
+        entry = os.path.join(*map(str, entry))
+    path = os.path.normpath(str(entry))
+    if os.path.isabs(path) or path == os.pardir or path.startswith(os.pardir + os.sep):
+        return None
+    return path.replace(os.sep, "/")
+
+
+def read_legacy_state(path=LEGACY_STATE_FILE):
+    """Return the state of the old pickle file with relative selected paths, or None if there is none."""
+    try:
+        with open(path, "rb") as f:
+            state = _LegacyUnpickler(f).load()
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError) as e:
+        raise StateStoreError(f"{path} can't be imported: {e}") from e
+    if not isinstance(state, dict):
+        raise StateStoreError(f"{path} can't be imported: not a saved state")
+    selected = {_legacy_path(entry) for entry in state.get("selected_files") or ()}
+    selected.discard(None)
+    return {
+        "selected_files": selected,
+        "select_all_state": bool(state.get("select_all_state", False)),
+        "file_extension": str(state.get("file_extension", ".py")),
+    }
+
+
+class StateStore:
+    """Per-project application state in one SQLite database.
+
+    Saving a selection writes only the paths added to or removed from what is
+    stored, in a single transaction, so a crash never leaves half-written
+    state behind. The state of the old pickle file is imported once, into
+    the first project it matches.
+    """
+
+    def __init__(self, path=STATE_FILE, legacy_path=LEGACY_STATE_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._db = open_database(path, MIGRATIONS, check_same_thread=False)
+
+    def close(self):
+        self._db.close()
+
+    def load(self, root):
+        """Return the state saved for root, or the defaults for a new project."""
+        key = project_key(root)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, select_all, extension FROM projects WHERE root = ?", (key,)
+            ).fetchone()
+            if row is None:
+                legacy = self._legacy_state(root)
+                if legacy is not None:
+                    return legacy
+                return {**DEFAULT_STATE, "selected_files": set()}
+
+            project_id, select_all, extension = row
+            selected = self._stored_paths(project_id)
+        return {
+            "selected_files": selected,
+            "select_all_state": bool(select_all),
+            "file_extension": extension,
+        }
+
+    def save(self, root, selected_files, select_all_state, file_extension):
+        """Save the state of root; selected_files are relative "/"-separated paths."""
+        key = project_key(root)
+        selected_files = set(selected_files)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO projects (root, select_all, extension, updated)"
+                " VALUES (?, ?, ?, ?) ON CONFLICT (root) DO UPDATE SET"
+                " select_all = excluded.select_all,"
+                " extension = excluded.extension,"
+                " updated = excluded.updated",
+                (key, int(select_all_state), file_extension, time.time()),
+            )
+            project_id = self._db.execute(
+                "SELECT id FROM projects WHERE root = ?", (key,)
+            ).fetchone()[0]
+
+            # Read within the write transaction, so another store's save in
+            # between can't leave rows behind
+            stored = self._stored_paths(project_id)
+            self._remove_paths(project_id, stored - selected_files)
+            self._add_paths(project_id, selected_files - stored)
+
+    def _stored_paths(self, project_id):
+        return {
+            f"{folder}/{name}" if folder else name
+            for folder, name in self._db.execute(
+                "SELECT folders.path, selected.name FROM selected"
+                " JOIN folders ON folders.id = selected.folder_id"
+                " WHERE folders.project_id = ?",
+                (project_id,),
+            )
+        }
+
+    def _legacy_state(self, root):
+        """Import the old pickle state into root if it has files there, and remove the pickle.
+
+        Call with the lock held; returns the imported state, or None.
+        """
+        if self.legacy_path is None or isinstance(root, Workspace):
+            return None
+        try:
+            state = read_legacy_state(self.legacy_path)
+        except StateStoreError as e:
+            print(f"Failed to import the old application state: {e}", file=sys.stderr)
+            self.legacy_path = None  # Said once is enough
+            return None
+        if state is None:
+            return None
+        # The old state was kept for whatever folder the app ran in last
+        if not any(
+            os.path.isfile(os.path.join(root, path)) for path in state["selected_files"]
+        ):
+            return None
+        key = project_key(root)
+        with self._db:
+            self._db.execute(
+                "INSERT INTO projects (root, select_all, extension, updated)"
+                " VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    int(state["select_all_state"]),
+                    state["file_extension"],
+                    time.time(),
+                ),
+            )
+            self._add_paths(self._project_id(key), state["selected_files"])
+        try:
+            os.remove(self.legacy_path)
+        except OSError:
+            pass
+        return state
+
+    def _project_id(self, key):
+        self._db.execute(
+            "INSERT OR IGNORE INTO projects (root, updated) VALUES (?, ?)",
+            (key, time.time()),
+        )
+        return self._db.execute(
+            "SELECT id FROM projects WHERE root = ?", (key,)
+        ).fetchone()[0]
+
+    def load_submitted(self, root):
+        """Return {path: (hash, mtime_ns, size)} for the files of root's last submit."""
+        key = project_key(root)
+        with self._lock:
+            records = {
+                path: (digest, mtime_ns, size)
+                for path, digest, mtime_ns, size in self._db.execute(
+                    "SELECT path, hash, mtime_ns, size FROM submitted"
+                    " JOIN projects ON projects.id = submitted.project_id"
+                    " WHERE projects.root = ?",
+                    (key,),
+                )
+            }
+        return records
+
+    def save_submitted(self, root, records):
+        """Replace root's last submit with {path: (hash, mtime_ns, size)} records.
+
+        Like save(), only the records that differ from the stored ones are
+        written.
+        """
+        key = project_key(root)
+        records = {path: tuple(record) for path, record in records.items()}
+        with self._lock, self._db:
+            project_id = self._project_id(key)
+            previous = {
+                path: (digest, mtime_ns, size)
+                for path, digest, mtime_ns, size in self._db.execute(
+                    "SELECT path, hash, mtime_ns, size FROM submitted"
+                    " WHERE project_id = ?",
+                    (project_id,),
+                )
+            }
+            self._db.executemany(
+                "DELETE FROM submitted WHERE project_id = ? AND path = ?",
+                ((project_id, path) for path in previous.keys() - records.keys()),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO submitted"
+                " (project_id, path, hash, mtime_ns, size) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (project_id, path, *record)
+                    for path, record in records.items()
+                    if previous.get(path) != record
+                ),
+            )
+
+    def _folder_ids(self, project_id, folders, create):
+        ids = {}
+        for folder in folders:
+            if create:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO folders (project_id, path) VALUES (?, ?)",
+                    (project_id, folder),
+                )
+            row = self._db.execute(
+                "SELECT id FROM folders WHERE project_id = ? AND path = ?",
+                (project_id, folder),
+            ).fetchone()
+            if row is not None:
+                ids[folder] = row[0]
+        return ids
+
+    def _add_paths(self, project_id, paths):
+        pairs = [split_path(path) for path in paths]
+        ids = self._folder_ids(project_id, {folder for folder, _ in pairs}, True)
+        self._db.executemany(
+            "INSERT OR IGNORE INTO selected (folder_id, name) VALUES (?, ?)",
+            ((ids[folder], name) for folder, name in pairs),
+        )
+
+    def _remove_paths(self, project_id, paths):
+        pairs = [split_path(path) for path in paths]
+        ids = self._folder_ids(project_id, {folder for folder, _ in pairs}, False)
+        self._db.executemany(
+            "DELETE FROM selected WHERE folder_id = ? AND name = ?",
+            ((ids[folder], name) for folder, name in pairs if folder in ids),
+        )
+        # Drop folders that no longer hold any selected file
+        self._db.executemany(
+            "DELETE FROM folders WHERE id = ? AND NOT EXISTS"
+            " (SELECT 1 FROM selected WHERE folder_id = ?)",
+            ((folder_id, folder_id) for folder_id in ids.values()),
+        )
@@ -0,0 +1,215 @@
+import io
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.bundle import FILE_SEPARATOR, content_key, duplicate_header
+from utils.content_cache import ContentCache
+from utils.file_reader import DEFAULT_READ_WORKERS
+from utils.outline import OUTLINE, Outliner
+from utils.profiling import count
+from utils.tokens import CHARS_PER_TOKEN, TokenCounter
+from utils.workspace import full_path
+
+# How files compete for the budget; the output itself keeps the selection order
+PRIORITIES = {
+    "order": "Tree order",
+    "size": "Smallest first",
+    "recency": "Most recent first",
+}
+
+FULL, TRUNCATED = "full", "truncated"
+
+# A file is only cut down if at least this many tokens of it would fit
+MIN_TRUNCATED_TOKENS = 64
+
+FileCost = namedtuple("FileCost", "path full_path tokens mtime")
+
+# Outlines files one at a time as the budget reaches them, so it never needs
+# worker processes; shared so its cache lasts between bundles
+_DEFAULT_OUTLINER = Outliner(workers=1)
+
+
+def _prioritize(costs, priority, focus=None):
+    if priority == "size":
+        costs = sorted(costs, key=lambda cost: cost.tokens)
+    elif priority == "recency":
+        costs = sorted(costs, key=lambda cost: -cost.mtime)
+    if focus is not None:
+        costs = sorted(costs, key=lambda cost: not focus(cost.path))
+    return list(costs)
+
+
+def plan_budget(
+    costs, budget, priority, counter, cache, summarize=True, outliner=None, focus=None
+):
+    """Decide how each file is rendered so the whole bundle fits in budget tokens.
+
+    Returns {path: (mode, content or None, tokens)}; files missing from the
+    result are left out. Full files carry no content, it is read again when
+    rendering. Files focus() accepts claim the budget first. A file is only
+    outlined once it is reached with enough budget left for a truncated
+    copy, so a tight budget outlines next to nothing. Outlines come from
+    outliner, by default the shared in-process one.
+    """
+    costs = _prioritize(costs, priority, focus)
+    overheads = [
+        counter.count(FILE_SEPARATOR + f"# {cost.path} ({TRUNCATED})\n")
+        for cost in costs
+    ]
+    outliner = _DEFAULT_OUTLINER if outliner is None else outliner
+
+    plan = {}
+    remaining = budget
+    for cost, overhead in zip(costs, overheads):
+        if cost.tokens + overhead <= remaining:
+            plan[cost.path] = (FULL, None, cost.tokens)
+            remaining -= cost.tokens + overhead
+            continue
+        if not summarize or remaining - overhead < MIN_TRUNCATED_TOKENS:
+            continue
+
+        content = cache.entry(cost.full_path).content or ""
+        outline = outliner.outline(cost.path, content)
+        outline_tokens = counter.count(outline) if outline else None
+        if outline_tokens is not None and outline_tokens + overhead <= remaining:
+            plan[cost.path] = (OUTLINE, outline, outline_tokens)
+            remaining -= outline_tokens + overhead
+            continue
+
+        # Cut the file down to roughly what fits, then shrink until it really does
+        allowed = remaining - overhead
+        truncated = content[: allowed * CHARS_PER_TOKEN]
+        tokens = counter.count(truncated)
+        while tokens > allowed and truncated:
+            truncated = truncated[: len(truncated) * allowed // (tokens + 1)]
+            tokens = counter.count(truncated)
+        if tokens >= MIN_TRUNCATED_TOKENS:
+            plan[cost.path] = (TRUNCATED, truncated, tokens)
+            remaining -= tokens + overhead
+    return plan
+
+
+def iter_budget_bundle(
+    paths,
+    root=".",
+    budget=None,
+    priority="order",
+    counter=None,
+    cache=None,
+    stats=None,
+    workers=DEFAULT_READ_WORKERS,
+    dedupe=True,
+    outliner=None,
+    focus=None,
+):
+    """Yield a bundle of the given relative paths that fits in budget tokens.
+
+    Every file is counted first (through the content cache, so unchanged files
+    cost nothing on a resubmit); files then claim the budget in priority order,
+    after the ones focus() accepts, and those that don't fit whole are outlined
+    (see utils/outline.py) or truncated. The output keeps the order of paths.
+    With dedupe, later copies of the same contents are only referenced by a
+    "(same as ...)" header, which is charged to the first copy, and go out
+    only if it goes out whole. If stats is a
+    dict it receives "files", "tokens", "modes" ({mode: count}), "left_out",
+    "errors", "duplicates", "saved_tokens" and "token_counts" ({path: tokens}
+    for every readable file).
+    """
+    paths = list(paths)
+    counter = counter or TokenCounter()
+    cache = ContentCache() if cache is None else cache
+    stats = {} if stats is None else stats
+    stats.update(
+        files=0,
+        tokens=0,
+        modes={FULL: 0, OUTLINE: 0, TRUNCATED: 0},
+        left_out=[],
+        errors=[],
+        duplicates=0,
+        saved_tokens=0,
+        token_counts={},
+    )
+
+    def measure(path):
+        file_path = full_path(root, path)
+        entry = cache.entry(file_path)
+        if entry.content is None:
+            return path, entry.error, None
+        tokens = counter.count_entry(entry)
+        cost = FileCost(path, file_path, tokens, entry.signature[0])
+        return cost, None, content_key(entry.content)
+
+    costs = []
+    keys = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for result, error, key in pool.map(measure, paths):
+            if error is not None:
+                stats["errors"].append((result, error))  # result is the path here
+            else:
+                costs.append(result)
+                keys[result.path] = key
+                stats["token_counts"][result.path] = result.tokens
+
+    # {path: (first copy, tokens saved)} for later copies of the same contents
+    duplicates = {}
+    references = {}  # First copy -> tokens of the references to it
+    first_copies = {}
+    for cost in costs:
+        first = first_copies.setdefault(keys[cost.path], cost.path)
+        if not dedupe or first == cost.path:
+            continue
+        reference = counter.count(FILE_SEPARATOR + duplicate_header(cost.path, first))
+        whole = counter.count(FILE_SEPARATOR + f"# {cost.path}\n") + cost.tokens
+        if reference < whole:
+            duplicates[cost.path] = (first, whole - reference)
+            references[first] = references.get(first, 0) + reference
+    planned = [
+        cost._replace(tokens=cost.tokens + references.get(cost.path, 0))
+        for cost in costs
+        if cost.path not in duplicates
+    ]
+
+    if budget is None:
+        plan = {cost.path: (FULL, None, cost.tokens) for cost in planned}
+    else:
+        plan = plan_budget(
+            planned, budget, priority, counter, cache, outliner=outliner, focus=focus
+        )
+
+    for cost in costs:
+        if cost.path in duplicates:
+            first, saved = duplicates[cost.path]
+            if plan.get(first, (None,))[0] != FULL:
+                stats["left_out"].append(cost.path)
+                continue
+            stats["files"] += 1
+            stats["duplicates"] += 1
+            stats["saved_tokens"] += saved
+            # Its tokens were counted with the first copy's
+            yield FILE_SEPARATOR + duplicate_header(cost.path, first)
+            continue
+        if cost.path not in plan:
+            stats["left_out"].append(cost.path)
+            continue
+        mode, content, tokens = plan[cost.path]
+        label = cost.path if mode == FULL else f"{cost.path} ({mode})"
+        if content is None:
+            content = cache.entry(cost.full_path).content or ""
+        header = (FILE_SEPARATOR if stats["files"] else "") + f"# {label}\n"
+
+        stats["files"] += 1
+        stats["modes"][mode] += 1
+        stats["tokens"] += counter.count(header) + tokens
+        yield header + content.strip()
+    count(files=stats["files"], tokens=stats["tokens"])
+
+
+def build_budget_bundle(paths, root=".", budget=None, priority="order", **kwargs):
+    """Return the budgeted bundle as one string along with its stats dict."""
+    stats = {}
+    buffer = io.StringIO()
+    for chunk in iter_budget_bundle(
+        paths, root, budget, priority, stats=stats, **kwargs
+    ):
+        buffer.write(chunk)
+    return buffer.getvalue(), stats
@@ -0,0 +1,115 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+# Rule of thumb for BPE tokenizers on source code and English text
+CHARS_PER_TOKEN = 4
+
+# Words are split into pieces of up to four characters, punctuation counts
+# one token per character, and every line break is a token
+_PIECE = re.compile(r"\w{1,4}|[^\w\s]|\n")
+
+# Content hashes remembered by TokenCounter before the oldest are dropped
+TOKEN_CACHE_SIZE = 200_000
+
+
+def estimate_tokens_for_size(size):
+    """Instant estimate from a byte count, used before a file has been read."""
+    return (size + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_token_count(tokens):
+    """Format a token count compactly: 950, 12.3k, 4.1M."""
+    if tokens < 1000:
+        return str(tokens)
+    if tokens < 1_000_000:
+        return f"{tokens / 1000:.1f}k"
+    return f"{tokens / 1_000_000:.1f}M"
+
+
+class CharTokenizer:
+    """Fastest estimate: a fixed number of characters per token."""
+
+    name = "chars"
+
+    def count(self, text):
+        return estimate_tokens_for_size(len(text))
+
+
+class HeuristicTokenizer:
+    """Offline approximation of a BPE tokenizer from words, punctuation and line breaks."""
+
+    name = "heuristic"
+
+    def count(self, text):
+        return len(_PIECE.findall(text))
+
+
+class TiktokenTokenizer:
+    """Exact counts with OpenAI's tiktoken, if it is installed."""
+
+    def __init__(self, encoding="cl100k_base"):
+        import tiktoken  # Optional dependency, only needed for this tokenizer
+
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text):
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+TOKENIZERS = {
+    "chars": CharTokenizer,
+    "heuristic": HeuristicTokenizer,
+    "tiktoken": TiktokenTokenizer,
+}
+DEFAULT_TOKENIZER = "heuristic"
+
+
+def get_tokenizer(name=DEFAULT_TOKENIZER):
+    """Return a tokenizer by name, falling back to the heuristic if it can't be loaded."""
+    try:
+        return TOKENIZERS[name]()
+    except (KeyError, ImportError):
+        return HeuristicTokenizer()
+
+
+def content_hash(text):
+    """Fast 128-bit digest of a string, used to share counts between identical files."""
+    return hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+class TokenCounter:
+    """Counts tokens with a tokenizer, remembering results by content hash."""
+
+    def __init__(self, tokenizer=None, max_entries=TOKEN_CACHE_SIZE):
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text):
+        """Return the token count of text, computing it only for content not seen before."""
+        key = content_hash(text)
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+        count = self.tokenizer.count(text)
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def count_entry(self, entry):
+        """Return the token count of a ContentCache entry, stored on the entry itself."""
+        count = entry.derived.get(self.tokenizer.name)
+        if count is None:
+            count = self.count(entry.content) if entry.content else 0
+            entry.derived[self.tokenizer.name] = count
+        return count
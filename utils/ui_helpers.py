@@ -1,23 +1,13 @@
-from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QPushButton, QCheckBox
 from PySide6.QtGui import QFont
 
 
 def toggle_all_tree_items(tree_widget, select_all):
     """Toggle the selection state of all items in a tree view."""
-    root = tree_widget.invisibleRootItem()
-    _select_all_recursive(root, select_all)
+    tree_widget.set_all_checked(select_all)
     refresh_tree_view(tree_widget)
 
 
-def _select_all_recursive(item, select):
-    """Recursively select/deselect all children of an item."""
-    for i in range(item.childCount()):
-        child = item.child(i)
-        child.setCheckState(0, Qt.Checked if select else Qt.Unchecked)
-        _select_all_recursive(child, select)
-
-
 def refresh_tree_view(tree_widget):
     """Force the tree view to refresh and repaint."""
     tree_widget.viewport().update()  # Update the visible portion of the widget
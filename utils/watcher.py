@@ -0,0 +1,153 @@
+import os
+from collections import namedtuple
+
+from utils.profiling import count, profiled
+from utils.scanner import scan_directory
+from utils.workspace import Workspace, full_path, ignore_rules
+
+# Quiet time after the last change before a burst is applied, and the longest
+# a steady stream of changes can hold it back
+DEBOUNCE_DELAY = 0.3
+MAX_DEBOUNCE_DELAY = 2.0
+
+# How often folders that can't be watched natively are stat-ed for changes
+POLL_INTERVAL = 2.0
+
+# added holds new or modified FileEntry records and removed the relative paths
+# of files that went away; new_folders and gone_folders are the folders to
+# start and stop watching. rescan is set when an ignore file changed, since
+# only a full scan can tell what that made visible
+FolderChanges = namedtuple(
+    "FolderChanges", "added removed new_folders gone_folders rescan"
+)
+
+
+def parent_folders(paths):
+    """Return every folder holding one of the "/"-separated paths, including "" for the root."""
+    folders = {""}
+    for path in paths:
+        folder = path.rpartition("/")[0]
+        while folder not in folders:
+            folders.add(folder)
+            folder = folder.rpartition("/")[0]
+    return folders
+
+
+def project_folders(index):
+    """Return the folders of a ProjectIndex to watch: every folder holding a file, and their parents.
+
+    The top level of a Workspace is left out, as it is not a folder on disk.
+    """
+    folders = parent_folders(
+        path for entries in index.by_suffix.values() for path in entries
+    )
+    if isinstance(index.root, Workspace):
+        folders.discard("")
+    return folders
+
+
+def _join(folder, name):
+    return f"{folder}/{name}" if folder else name
+
+
+def _is_within(folder, roots):
+    """Return True if folder is one of roots or lies below one of them."""
+    while True:
+        if folder in roots:
+            return True
+        if not folder:
+            return False
+        folder = folder.rpartition("/")[0]
+
+
+@profiled("rescan")
+def rescan_folders(index, folders, known_folders, ignore=None):
+    """Compare the listed folders on disk with a ProjectIndex and return FolderChanges.
+
+    Only the given folders are listed, plus any subfolders that appeared since
+    (recursively, they are new). Folders that no longer exist take everything
+    indexed below them with them. The index itself is not modified.
+    """
+    ignore = ignore or ignore_rules(index.root)
+    known_children = {}
+    for known in known_folders:
+        if known:
+            known_children.setdefault(known.rpartition("/")[0], set()).add(known)
+    added, removed = [], []
+    new_folders, gone_folders = set(), set()
+    rescan = False
+
+    pending = list(folders)
+    while pending:
+        folder = pending.pop()
+        if not os.path.isdir(full_path(index.root, folder)):
+            gone_folders.add(folder)
+            continue
+
+        files, subfolders = scan_directory(index.root, ignore, folder)
+        names = set()
+        for entry in files:
+            name = entry.path.rpartition("/")[2]
+            names.add(name)
+            old = index.get(entry.path)
+            if old is None or (old.size, old.mtime) != (entry.size, entry.mtime):
+                added.append(entry)
+                rescan = rescan or name == ignore.ignore_file
+        for name in index.by_folder.get(folder, ()):
+            if name not in names:
+                removed.append(_join(folder, name))
+                rescan = rescan or name == ignore.ignore_file
+
+        listed = set(subfolders)
+        for subfolder in listed:
+            if subfolder not in known_folders and subfolder not in new_folders:
+                new_folders.add(subfolder)
+                pending.append(subfolder)
+        # Known subfolders that were deleted, renamed or are now ignored
+        gone_folders.update(known_children.get(folder, set()) - listed)
+
+    # Everything indexed below a folder that is gone goes with it
+    if gone_folders:
+        for folder, names in index.by_folder.items():
+            if _is_within(folder, gone_folders):
+                removed.extend(_join(folder, name) for name in names)
+        gone_folders = {f for f in known_folders if _is_within(f, gone_folders)}
+    count(folders=len(folders), files=len(added) + len(removed))
+    return FolderChanges(added, removed, new_folders, gone_folders, rescan)
+
+
+def folder_mtime(path):
+    """Return the mtime of a folder, which changes when entries are added, removed or renamed."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class FolderPoller:
+    """Fallback change detection: remembers folder mtimes and reports the folders that changed."""
+
+    def __init__(self, root):
+        self.root = root
+        self.mtimes = {}
+
+    def __len__(self):
+        return len(self.mtimes)
+
+    def track(self, folders):
+        for folder in folders:
+            self.mtimes[folder] = folder_mtime(full_path(self.root, folder))
+
+    def untrack(self, folders):
+        for folder in folders:
+            self.mtimes.pop(folder, None)
+
+    def poll(self):
+        """Return the tracked folders whose mtime changed since the last poll."""
+        changed = []
+        for folder, mtime in self.mtimes.items():
+            current = folder_mtime(full_path(self.root, folder))
+            if current != mtime:
+                self.mtimes[folder] = current
+                changed.append(folder)
+        return changed
@@ -0,0 +1,136 @@
+"""Workspaces: several project roots bundled together as one tree.
+
+Every root keeps its own ignore rules, scan cache and git repository. Its
+files appear under a top-level folder named after it, so "api/app/main.py"
+is app/main.py in the root named api. Anything that takes a project root
+also takes a Workspace, and turns such paths back into file system paths
+with full_path().
+"""
+
+import os
+
+from utils.git_objects import GitError, GitRepository
+from utils.gitignore import IGNORE_FILE, GitIgnore
+
+
+class Workspace:
+    """Project roots by name, in the order given; a root is named after its folder, made unique."""
+
+    def __init__(self, folders):
+        self.roots = {}  # name -> folder
+        for folder in folders:
+            name = os.path.basename(os.path.abspath(folder)) or "root"
+            unique, number = name, 1
+            while unique in self.roots:
+                number += 1
+                unique = f"{name}-{number}"
+            self.roots[unique] = folder
+
+    def __len__(self):
+        return len(self.roots)
+
+    def __str__(self):
+        return ", ".join(self.roots.values())
+
+    def __repr__(self):
+        return f"Workspace({list(self.roots.values())!r})"
+
+    @staticmethod
+    def qualify(name, path):
+        """Return the workspace path of a path relative to the root called name."""
+        return f"{name}/{path}" if path else name
+
+    def split(self, path):
+        """Return (root folder, path relative to it) for a workspace path."""
+        name, _, rest = path.partition("/")
+        folder = self.roots.get(name)
+        if folder is None:
+            raise ValueError(f"{path!r} is not in any root of the workspace")
+        return folder, rest
+
+
+def workspace_root(folders):
+    """Return the root to scan for the given folders: the folder itself, or a Workspace of several."""
+    folders = list(dict.fromkeys(folders)) or ["."]
+    return folders[0] if len(folders) == 1 else Workspace(folders)
+
+
+def full_path(root, path):
+    """Return the file system path of a "/"-separated path relative to root, a folder or a Workspace."""
+    if isinstance(root, Workspace):
+        root, path = root.split(path)
+    return os.path.join(root, path)
+
+
+class WorkspaceIgnore:
+    """GitIgnore for workspace paths, applying the rules of each root to the paths within it."""
+
+    def __init__(self, workspace, ignore_file=IGNORE_FILE):
+        self.ignore_file = ignore_file
+        self.ignores = {
+            name: GitIgnore(folder, ignore_file)
+            for name, folder in workspace.roots.items()
+        }
+
+    def chain_for(self, rel_dir, has_ignore_file=None):
+        """Return the root's GitIgnore along with the matchers that apply inside rel_dir."""
+        name, _, rest = rel_dir.partition("/")
+        ignore = self.ignores[name]
+        return ignore, ignore.chain_for(rest, has_ignore_file)
+
+    def is_ignored(self, rel_path, is_dir=False, chain=None):
+        name, _, rest = rel_path.partition("/")
+        if chain is None:
+            return self.ignores[name].is_ignored(rest, is_dir)
+        ignore, chain = chain
+        return ignore.is_ignored(rest, is_dir, chain)
+
+
+def ignore_rules(root):
+    """Return the ignore rules for a folder (GitIgnore) or a Workspace (WorkspaceIgnore)."""
+    if isinstance(root, Workspace):
+        return WorkspaceIgnore(root)
+    return GitIgnore(root)
+
+
+class WorkspaceRepository:
+    """GitRepository for workspace paths: a revision is read from the repository of each root.
+
+    resolve() returns {root name: commit} and blob_ids() (root name, blob)
+    pairs, which read_object() takes back; these are only meant to be passed
+    between its own methods, as diff_bundle does.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.repositories = {}
+        for name, folder in workspace.roots.items():
+            try:
+                self.repositories[name] = GitRepository(folder)
+            except GitError as e:
+                raise GitError(f"{name}: {e}") from e
+
+    def resolve(self, revision):
+        commits = {}
+        for name, repository in self.repositories.items():
+            try:
+                commits[name] = repository.resolve(revision)
+            except GitError as e:
+                raise GitError(f"{name}: {e}") from e
+        return commits
+
+    def blob_ids(self, commits, paths):
+        by_root = {}
+        for path in paths:
+            name, _, rest = path.partition("/")
+            by_root.setdefault(name, []).append(rest)
+        found = {}
+        for name, rests in by_root.items():
+            blobs = self.repositories[name].blob_ids(commits[name], rests)
+            for rest, blob in blobs.items():
+                found[Workspace.qualify(name, rest)] = (name, blob)
+        return found
+
+    def read_object(self, blob):
+        name, blob = blob
+        return self.repositories[name].read_object(blob)